@@ -1,20 +1,55 @@
-import pandas as pd
-from preprocessing import MovieLensDataset
+import numpy as np
+from .instrumentation import instrumented
+from .preprocessing import MovieLensDataset
+from .rating_stats import RatingStatistics
+from typing import Optional, Sequence
 
 
 class BaselinePredictor:
     """Baseline predictor for the Movie Lens dataset."""
 
     _dataset: MovieLensDataset
+    _statistics: RatingStatistics
 
     def __init__(self) -> None:
         self._dataset = None
+        self._statistics = None
     
+    @instrumented('baseline.fit')
     def fit(self, dataset: MovieLensDataset) -> None:
         """Fits the predictor to the data."""
         if not isinstance(dataset, MovieLensDataset):
             raise ValueError(f'Parameter of fit method should be of type MovieLensDataset.')
+        if self._dataset is not None:
+            self._dataset.remove_ratings_listener(self._on_rating_changed)
         self._dataset = dataset
+        dataset.add_ratings_listener(self._on_rating_changed)
+        self._statistics = RatingStatistics.from_store(dataset.get_ratings_store())
+
+    def _on_rating_changed(self, user_id: int, movie_id: int, previous: Optional[float], rating: Optional[float]) -> None:
+        """Patches the statistics after a rating of the dataset has been added, changed or removed."""
+        self._statistics.update(int(user_id), int(movie_id), previous, rating)
+
+    @classmethod
+    def from_statistics(cls, statistics: RatingStatistics) -> "BaselinePredictor":
+        """
+        Creates a fitted predictor from precomputed rating statistics
+        (e.g. of the training part of a fold). The predictor is not
+        attached to any dataset.
+
+        Parameters
+        ----------
+        statistics : RatingStatistics
+            Statistics of the ratings the predictor is fitted to.
+
+        Returns
+        -------
+        BaselinePredictor
+            Fitted predictor.
+        """
+        predictor = cls()
+        predictor._statistics = statistics
+        return predictor
     
     def predict(self, user_id: int, movie_id: int) -> float:
         """
@@ -33,8 +68,25 @@ class BaselinePredictor:
         float
             Prediction of the rating (not rounded).
         """
-        ratings = self._dataset.get_ratings()
-        movie_avg = ratings[ratings.index.get_level_values('movieId') == movie_id]['rating'].mean()
-        if pd.isna(movie_avg):
-            movie_avg = 3.5
-        return movie_avg
+        return float(self.predict_many([user_id], [movie_id])[0])
+
+    @instrumented('baseline.predict_many', rows=len)
+    def predict_many(self, user_ids: Sequence[int], movie_ids: Sequence[int]) -> np.ndarray:
+        """
+        Computes the baseline predictions for many user-movie pairs at once.
+
+        Parameters
+        ----------
+        user_ids : Sequence[int]
+            Ids of the users in the Movie Lens dataset.
+
+        movie_ids : Sequence[int]
+            Ids of the movies in the Movie Lens dataset (one for each user id).
+
+        Returns
+        -------
+        numpy.ndarray
+            Predictions of the ratings (not rounded), in the order of the pairs.
+        """
+        movie_avg = self._statistics.movie_mean(np.asarray(movie_ids, dtype=np.int64).reshape(-1))
+        return np.where(np.isnan(movie_avg), 3.5, movie_avg)
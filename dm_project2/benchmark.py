@@ -0,0 +1,335 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+from .dataset import PREDICTION_COLUMNS, MovieLensDataset
+from .preprocessing import MovieLensDatasetPreprocessor
+from .predict import Predictor
+from .synthetic import generate_dataset
+from .test import evaluate
+from typing import Callable, Dict, List, Optional
+
+
+BENCHMARK_FORMAT_VERSION = 1
+"""Version of the layout of the results; results of different versions are not compared."""
+
+STAGES = (
+    'load_csv', 'load_cache_build', 'load_cache', 'load_prediction_columns', 'preprocess_ratings', 'preprocess_ratings_packed',
+    'fit', 'predict', 'predict_many', 'evaluation'
+)
+"""Benchmarked stages, in the order in which they are run."""
+
+
+def measure(func: Callable[[], object], setup: Optional[Callable[[], None]] = None, repeat: int = 1, memory: bool = True) -> Dict[str, float]:
+    """
+    Measures the wall time and the peak memory allocated by a function.
+
+    The function is timed `repeat` times, and then (if `memory` is set)
+    run once more with `tracemalloc` tracing the allocations, so that the
+    overhead of tracing does not distort the timings.
+
+    Parameters
+    ----------
+    func : Callable[[], object]
+        Measured function.
+
+    setup : Callable[[], None], optional
+        Function called (and not measured) before each run.
+
+    repeat : int, optional
+        Number of timed runs (default 1).
+
+    memory : bool, optional
+        Whether the peak allocated memory should be measured (default `True`).
+
+    Returns
+    -------
+    Dict[str, float]
+        Minimal and median wall times of the runs in seconds (`seconds`,
+        `seconds_median`) and the peak size of the memory allocated by the
+        function in bytes (`peak_bytes`, if measured).
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    result = {'seconds': min(times), 'seconds_median': statistics.median(times)}
+    if memory:
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        try:
+            func()
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def benchmark_dataset(
+    data_dir: str,
+    stages: List[str],
+    repeat: int = 1,
+    memory: bool = True,
+    n_predictions: int = 1000,
+    sample_size: int = 1000
+) -> Dict[str, Dict[str, float]]:
+    """
+    Benchmarks the stages of the pipeline on a dataset.
+
+    Parameters
+    ----------
+    data_dir : str
+        Directory containing the CSV files of the dataset.
+
+    stages : List[str]
+        Names of the benchmarked stages (see `STAGES`).
+
+    repeat : int, optional
+        Number of timed runs of each stage (default 1).
+
+    memory : bool, optional
+        Whether the peak allocated memory of the stages should be measured (default `True`).
+
+    n_predictions : int, optional
+        Number of predicted pairs (the single predictions are limited to
+        a tenth of them), sampled from the ratings (default 1000).
+
+    sample_size : int, optional
+        Number of held-out ratings of the evaluation (default 1000).
+
+    Returns
+    -------
+    Dict[str, Dict[str, float]]
+        Measurements of each stage (see `measure`), with the number of
+        processed rows (`rows`) and, for the evaluation, its errors.
+    """
+    cache_dir = os.path.join(data_dir, 'cache')
+
+    def load(use_cache: bool = True, **options) -> MovieLensDataset:
+        return MovieLensDataset(os.path.basename(os.path.normpath(data_dir)), use_cache=use_cache, data_dir=data_dir, **options)
+
+    def load_tables(use_cache: bool = True, prediction: bool = False) -> MovieLensDataset:
+        # Tables are loaded lazily, so all of them (or only the data used by the predictors:
+        # the movies and the store of the ratings) are accessed.
+        if prediction:
+            dataset = load(use_cache, columns=PREDICTION_COLUMNS, categorical=True)
+            dataset.get_movies(copy=False)
+            dataset.get_ratings_store()
+        else:
+            dataset = load(use_cache)
+            for get_table in (dataset.get_links, dataset.get_movies, dataset.get_ratings, dataset.get_tags):
+                get_table(copy=False)
+        return dataset
+
+    dataset = load()
+    store = dataset.get_ratings_store()
+    n_ratings = len(store)
+    preprocessor = MovieLensDatasetPreprocessor().fit_transform(dataset)
+    predictor = Predictor()
+    predictor.fit(preprocessor)
+    user_ids, movie_ids = store.get_pairs(np.random.default_rng(0).integers(n_ratings, size=n_predictions))
+    n_single = max(n_predictions // 10, 1)
+
+    def predict_single() -> None:
+        for user_id, movie_id in zip(user_ids[:n_single].tolist(), movie_ids[:n_single].tolist()):
+            predictor.predict(user_id, movie_id)
+
+    errors = {}
+
+    def evaluation() -> None:
+        errors.update(evaluate(load(columns=PREDICTION_COLUMNS, categorical=True), sample_size))
+
+    stage_runs = {
+        'load_csv': (lambda: load_tables(use_cache=False), None, n_ratings),
+        'load_cache_build': (load_tables, lambda: shutil.rmtree(cache_dir, ignore_errors=True), n_ratings),
+        'load_cache': (load_tables, None, n_ratings),
+        'load_prediction_columns': (lambda: load_tables(prediction=True), None, n_ratings),
+        'preprocess_ratings': (preprocessor.preprocess_ratings, None, n_ratings),
+        'preprocess_ratings_packed': (preprocessor.preprocess_ratings_packed, None, n_ratings),
+        'fit': (lambda: Predictor().fit(preprocessor), None, n_ratings),
+        # Rules are mined anew in each run instead of being taken from the cache.
+        'predict': (predict_single, predictor.get_rule_cache().clear, n_single),
+        'predict_many': (lambda: predictor.predict_many(user_ids, movie_ids), predictor.get_rule_cache().clear, n_predictions),
+        'evaluation': (evaluation, None, sample_size)
+    }
+    results = {}
+    for stage in stages:
+        func, setup, rows = stage_runs[stage]
+        results[stage] = dict(measure(func, setup, repeat, memory), rows=rows)
+        if stage == 'evaluation':
+            results[stage].update(errors)
+    return results
+
+
+def run_benchmarks(
+    scales: List[int],
+    root_dir: str,
+    stages: List[str],
+    seed: int = 0,
+    **kwargs
+) -> dict:
+    """
+    Benchmarks the pipeline on synthetic datasets of several scales,
+    generating the datasets which do not exist yet.
+
+    Parameters
+    ----------
+    scales : List[int]
+        Numbers of ratings of the datasets.
+
+    root_dir : str
+        Directory in which the datasets are stored (each one in a subdirectory
+        named after its scale and seed).
+
+    stages : List[str]
+        Names of the benchmarked stages (see `STAGES`).
+
+    seed : int, optional
+        Seed of the generated datasets (default 0).
+
+    **kwargs
+        Options of `benchmark_dataset`.
+
+    Returns
+    -------
+    dict
+        Results of the benchmarks, with the description of the environment.
+    """
+    results = []
+    for scale in scales:
+        data_dir = os.path.join(root_dir, f'ratings-{scale}-seed-{seed}')
+        if not os.path.exists(os.path.join(data_dir, 'ratings.csv')):
+            generate_dataset(data_dir, scale, seed)
+        results.append({'scale': scale, 'seed': seed, 'stages': benchmark_dataset(data_dir, stages, **kwargs)})
+    return {
+        'format_version': BENCHMARK_FORMAT_VERSION,
+        'commit': _git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'results': results
+    }
+
+
+def compare_results(baseline: dict, current: dict) -> List[Dict[str, float]]:
+    """
+    Compares the results of two runs of the benchmarks (e.g. of two commits).
+
+    Parameters
+    ----------
+    baseline : dict
+        Results of the reference run.
+
+    current : dict
+        Results of the compared run.
+
+    Returns
+    -------
+    List[Dict[str, float]]
+        For each stage of each scale present in both runs: the scale, the
+        stage, the times of both runs and the ratio of the current time to
+        the reference one (`speedup` is its inverse), and the ratio of the
+        peak memory if it was measured in both runs.
+
+    Raises
+    ------
+    ValueError
+        When the results have different format versions.
+    """
+    if baseline.get('format_version') != current.get('format_version'):
+        raise ValueError('Results of different format versions cannot be compared.')
+    reference = {(result['scale'], result['seed']): result['stages'] for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        reference_stages = reference.get((result['scale'], result['seed']), {})
+        for stage, measurement in result['stages'].items():
+            if stage not in reference_stages:
+                continue
+            previous = reference_stages[stage]
+            row = {
+                'scale': result['scale'],
+                'stage': stage,
+                'baseline_seconds': previous['seconds'],
+                'seconds': measurement['seconds'],
+                'time_ratio': measurement['seconds'] / previous['seconds'] if previous['seconds'] > 0 else float('nan'),
+            }
+            row['speedup'] = 1 / row['time_ratio'] if row['time_ratio'] > 0 else float('nan')
+            if 'peak_bytes' in previous and 'peak_bytes' in measurement and previous['peak_bytes'] > 0:
+                row['memory_ratio'] = measurement['peak_bytes'] / previous['peak_bytes']
+            rows.append(row)
+    return rows
+
+
+def _git_commit() -> Optional[str]:
+    """Provides the hash of the checked out commit (if the code is in a git repository)."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args: List[str]) -> None:
+
+    parser = argparse.ArgumentParser(description='Benchmarks the pipeline on synthetic datasets in the Movie Lens format.')
+    parser.add_argument(
+        '--scales', nargs='+', type=lambda value: int(float(value)), default=[10 ** 5, 10 ** 6],
+        help='numbers of ratings of the datasets (default 1e5 1e6)'
+    )
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES), help='benchmarked stages (default all)')
+    parser.add_argument(
+        '--data-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/synthetic'),
+        help='directory of the generated datasets (default data/synthetic)'
+    )
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated datasets (default 0)')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs of each stage (default 3)')
+    parser.add_argument('--no-memory', action='store_true', help='do not measure the peak allocated memory')
+    parser.add_argument('--predictions', type=int, default=1000, help='number of predicted pairs (default 1000)')
+    parser.add_argument('--sample-size', type=int, default=1000, help='number of held-out ratings of the evaluation (default 1000)')
+    parser.add_argument('--output', help='file to which the results are written as JSON')
+    parser.add_argument('--compare', help='file with results (e.g. of another commit) to compare the results with')
+    args = parser.parse_args(args)
+
+    results = run_benchmarks(
+        args.scales, args.data_dir, args.stages, args.seed,
+        repeat=args.repeat, memory=not args.no_memory, n_predictions=args.predictions, sample_size=args.sample_size
+    )
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    print(f'{"scale" : >10} {"stage" : <26} {"rows" : >10} {"seconds" : >10} {"peak MiB" : >10}')
+    for result in results['results']:
+        for stage, measurement in result['stages'].items():
+            peak = f'{measurement["peak_bytes"] / 2 ** 20 : >10.1f}' if 'peak_bytes' in measurement else f'{"-" : >10}'
+            print(f'{result["scale"] : >10} {stage : <26} {measurement["rows"] : >10} {measurement["seconds"] : >10.4f} {peak}')
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        print()
+        print(f'{"scale" : >10} {"stage" : <26} {"baseline" : >10} {"current" : >10} {"speedup" : >8} {"memory" : >8}')
+        for row in compare_results(baseline, results):
+            memory = f'{row["memory_ratio"] : >8.2f}' if 'memory_ratio' in row else f'{"-" : >8}'
+            print(f'{row["scale"] : >10} {row["stage"] : <26} {row["baseline_seconds"] : >10.4f} {row["seconds"] : >10.4f} {row["speedup"] : >8.2f} {memory}')
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
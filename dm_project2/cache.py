@@ -0,0 +1,434 @@
+import csv
+import json
+import os
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Callable, Collection, Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+CACHE_FORMAT_VERSION = 2
+"""Version of the on-disk cache layout; bumping it invalidates all caches."""
+
+
+def read_csv_columns(
+    source_path: str,
+    dtype: Optional[Dict[str, str]] = None,
+    columns: Optional[Sequence[str]] = None,
+    categorical: Collection[str] = ()
+) -> pd.DataFrame:
+    """
+    Parses (selected columns of) a CSV file directly, without the cache
+    (see `TableCache.load` for the meaning of the parameters).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Loaded table (with a default index).
+    """
+    if dtype is not None and columns is not None:
+        dtype = {name: column_dtype for name, column_dtype in dtype.items() if name in columns}
+    df = pd.read_csv(source_path, dtype=dtype, usecols=columns)
+    for name in categorical:
+        if name in df.columns:
+            # Categories are ordered by their first occurrence, as in the cache.
+            df[name] = pd.Categorical(df[name], categories=pd.unique(df[name].dropna()))
+    return df
+
+
+def chunk_rows(source_path: str, chunk_bytes: int) -> int:
+    """
+    Estimates the number of rows of a CSV file which can be parsed at
+    once within a memory budget, from the average length of its first
+    lines (the parsed chunk is assumed to take up to 4 times as much
+    memory as its text).
+
+    Parameters
+    ----------
+    source_path : str
+        Path to the CSV file.
+
+    chunk_bytes : int
+        Approximate memory budget for parsing a single chunk.
+
+    Returns
+    -------
+    int
+        Number of rows of a chunk (at least 1000).
+    """
+    with open(source_path, 'rb') as file:
+        sample = file.read(2 ** 20)
+    line_bytes = len(sample) / max(sample.count(b'\n'), 1)
+    return max(int(chunk_bytes / (4 * line_bytes)), 1000)
+
+
+def read_csv_chunks(
+    source_path: str,
+    dtype: Optional[Dict[str, str]] = None,
+    columns: Optional[Sequence[str]] = None,
+    chunk_bytes: int = 64 * 2 ** 20
+) -> Iterator[pd.DataFrame]:
+    """
+    Parses (selected columns of) a CSV file in chunks of a bounded size
+    (see `chunk_rows`), so that the memory needed for parsing does not
+    grow with the size of the file.
+
+    Returns
+    -------
+    Iterator[pandas.DataFrame]
+        Consecutive chunks of the table (with default indices).
+    """
+    if dtype is not None and columns is not None:
+        dtype = {name: column_dtype for name, column_dtype in dtype.items() if name in columns}
+    with pd.read_csv(source_path, dtype=dtype, usecols=columns, chunksize=chunk_rows(source_path, chunk_bytes)) as chunks:
+        yield from chunks
+
+
+class TableCache:
+    """
+    On-disk cache of the tables of the Movie Lens dataset.
+
+    Each table is converted once from its source CSV file into a binary
+    columnar format - a directory containing one `.npy` file per column
+    and a `meta.json` file describing it. Numeric columns are stored with
+    the (narrow) dtypes requested by the caller, while text columns are
+    dictionary-encoded into `int32` codes and a UTF-8 blob of distinct values.
+
+    Columns with a requested dtype are numeric, all the other columns are
+    text, regardless of the values of the first chunk (e.g. a text column
+    whose first values are all missing). A cached table is valid as long
+    as the size and the modification time of its source file, its columns
+    and the requested dtypes have not changed; otherwise it is rebuilt
+    from the CSV file on the next load. If the table cannot be written
+    to the cache, it is parsed from the CSV file as if there was no cache.
+
+    Each version of a cached table (or of cached arrays) is stored in its
+    own directory named after its fingerprint. A version is written into
+    a temporary sibling directory and then renamed into place atomically,
+    so it is never seen partially written and is never changed once it
+    is in place. Other processes (e.g. workers which have memory-mapped
+    the cached arrays) can keep reading an older version while a new one
+    is written, as versions for earlier states of the source file are not
+    deleted; they are removed only when the cache is cleared.
+
+    The CSV file is converted in a streaming fashion: it is parsed in
+    chunks of a bounded size, whose columns are appended to the cached
+    files, so that the memory needed for parsing does not grow with the
+    size of the file (only the loaded table itself has to fit in memory).
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory in which the cached tables are stored.
+
+    chunk_bytes : int, optional
+        Approximate memory budget for parsing a single chunk of a CSV file
+        (default 64 MiB).
+    """
+
+    _cache_dir: str
+    _chunk_bytes: int
+
+    def __init__(self, cache_dir: str, chunk_bytes: int = 64 * 2 ** 20) -> None:
+        self._cache_dir = cache_dir
+        self._chunk_bytes = chunk_bytes
+
+    def get_cache_dir(self) -> str:
+        """
+        Returns
+        -------
+        str
+            Directory in which the cached tables are stored.
+        """
+        return self._cache_dir
+
+    def load(
+        self,
+        name: str,
+        source_path: str,
+        dtype: Optional[Dict[str, str]] = None,
+        columns: Optional[Sequence[str]] = None,
+        categorical: Collection[str] = ()
+    ) -> pd.DataFrame:
+        """
+        Loads a table, either from the cache (if it is up to date)
+        or from its source CSV file (in which case the cache is rebuilt).
+        The cache always contains all columns of the table, while only the
+        selected ones are read from it.
+
+        Parameters
+        ----------
+        name : str
+            Name of the table (e.g. `ratings`).
+
+        source_path : str
+            Path to the CSV file from which the table originates.
+
+        dtype : Dict[str, str], optional
+            Dtypes of the numeric columns that should be used when parsing
+            the CSV file (the other columns are text).
+
+        columns : Sequence[str], optional
+            Columns which should be loaded (all by default); they are
+            loaded in the order of the source file.
+
+        categorical : Collection[str], optional
+            Text columns which should be loaded as `pandas.Categorical`
+            (directly from their dictionary encoding, without materializing
+            a string for each row).
+
+        Returns
+        -------
+        pandas.DataFrame
+            Loaded table (with a default index).
+        """
+        dtype = dict(dtype or {})
+        header = self._header(source_path)
+        fingerprint = self._fingerprint(source_path, dtype=dtype, columns=header)
+        table_dir = self._version_dir(name, fingerprint)
+        if self._read_meta(table_dir) == fingerprint:
+            try:
+                return self._read(table_dir, columns, categorical)
+            except (OSError, ValueError, KeyError):
+                pass
+        kinds = [
+            {'name': column, 'kind': 'numeric', 'dtype': dtype[column]} if column in dtype else {'name': column, 'kind': 'text'}
+            for column in header
+        ]
+        try:
+            parsed_dtype = {column['name']: column.get('dtype', object) for column in kinds}
+            with pd.read_csv(source_path, dtype=parsed_dtype, chunksize=self._chunk_rows(source_path)) as chunks:
+                self._publish(table_dir, fingerprint, lambda tmp_dir: self._write(tmp_dir, chunks, fingerprint, kinds))
+            return self._read(table_dir, columns, categorical)
+        except (OSError, ValueError):
+            # A table which cannot be cached is a cache miss.
+            return read_csv_columns(source_path, dtype, columns, categorical)
+
+    def load_arrays(
+        self,
+        name: str,
+        source_path: str,
+        build: Callable[[], Dict[str, np.ndarray]],
+        mmap: bool = True,
+        params: Optional[dict] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Loads a set of arrays derived from a source file, either from the
+        cache (if it is up to date) or by building them anew (in which case
+        they are stored in the cache).
+
+        Parameters
+        ----------
+        name : str
+            Name under which the arrays are cached (e.g. `ratings_store`).
+
+        source_path : str
+            Path to the file from which the arrays are derived.
+
+        build : Callable[[], Dict[str, numpy.ndarray]]
+            Function computing the arrays when the cache is not up to date.
+
+        mmap : bool, optional
+            Whether the cached arrays should be memory-mapped (read-only)
+            instead of being read into memory (default `True`).
+
+        params : dict, optional
+            Parameters of building the arrays (JSON-serializable, e.g. the
+            dtypes of the source columns); cached arrays built with other
+            parameters are rebuilt.
+
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Loaded arrays.
+        """
+        fingerprint = self._fingerprint(source_path, params=params or {})
+        arrays_dir = self._version_dir(name, fingerprint)
+        if self._read_meta(arrays_dir) == fingerprint:
+            try:
+                return self._read_arrays(arrays_dir, mmap)
+            except (OSError, ValueError, KeyError):
+                pass
+        arrays = build()
+        try:
+            self._publish(arrays_dir, fingerprint, lambda tmp_dir: self._write_arrays(tmp_dir, arrays, fingerprint))
+        except OSError:
+            return arrays
+        return self._read_arrays(arrays_dir, mmap)
+
+    def clear(self) -> None:
+        """Removes all cached tables (including the versions which may still be in use by other processes)."""
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+
+    def _version_dir(self, name: str, fingerprint: dict) -> str:
+        """Provides the directory of the version of a cached entry (a table or a set of arrays) with a fingerprint."""
+        key = hashlib.sha1(json.dumps(fingerprint, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self._cache_dir, name, key)
+
+    @staticmethod
+    def _publish(version_dir: str, fingerprint: dict, write: Callable[[str], None]) -> None:
+        """
+        Writes a version of a cached entry into a temporary sibling of its
+        directory and renames it into place atomically. The version is
+        left as it is if another process has published it in the meantime,
+        and an invalid directory in its place (e.g. damaged on disk) is
+        moved aside rather than deleted, as it may still be in use.
+        """
+        parent = os.path.dirname(version_dir)
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+        try:
+            write(tmp_dir)
+            if os.path.exists(version_dir) and TableCache._read_meta(version_dir) != fingerprint:
+                os.replace(version_dir, tempfile.mkdtemp(prefix='.invalid-', dir=parent))
+            try:
+                os.replace(tmp_dir, version_dir)
+            except OSError:
+                # The directory of a version can only be replaced while it is empty.
+                if TableCache._read_meta(version_dir) != fingerprint:
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _chunk_rows(self, source_path: str) -> int:
+        """Estimates the number of rows of a CSV file which can be parsed at once within the memory budget."""
+        return chunk_rows(source_path, self._chunk_bytes)
+
+    @staticmethod
+    def _fingerprint(source_path: str, **params) -> dict:
+        """
+        Describes the state of the source file the cache is valid for,
+        together with the parameters of the conversion (e.g. the dtypes
+        and the columns of the table).
+        """
+        stat = os.stat(source_path)
+        return {
+            'version': CACHE_FORMAT_VERSION,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            **params
+        }
+
+    @staticmethod
+    def _header(source_path: str) -> List[str]:
+        """Reads the names of the columns of a CSV file from its first line."""
+        with open(source_path, 'r', encoding='utf-8', newline='') as file:
+            return next(csv.reader(file), [])
+
+    @staticmethod
+    def _read_meta(table_dir: str) -> Optional[dict]:
+        """Reads the fingerprint of a cached table (`None` if there is none)."""
+        try:
+            with open(os.path.join(table_dir, 'meta.json'), 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return meta.get('source')
+
+    @staticmethod
+    def _read(table_dir: str, selected: Optional[Sequence[str]] = None, categorical: Collection[str] = ()) -> pd.DataFrame:
+        """Reads (selected columns of) a cached table from its directory."""
+        with open(os.path.join(table_dir, 'meta.json'), 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        names = [column['name'] for column in meta['columns']]
+        if selected is not None:
+            missing = set(selected) - set(names)
+            if missing:
+                raise KeyError(f'Unknown columns: {", ".join(sorted(missing))}.')
+        columns = {}
+        for column in meta['columns']:
+            if selected is not None and column['name'] not in selected:
+                continue
+            path = os.path.join(table_dir, f"{column['name']}.npy")
+            if column['kind'] == 'text':
+                codes = np.load(path)
+                blob = np.load(os.path.join(table_dir, f"{column['name']}.blob.npy")).tobytes()
+                offsets = np.load(os.path.join(table_dir, f"{column['name']}.offsets.npy")).tolist()
+                values = [blob[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+                if column['name'] in categorical:
+                    # Missing values are encoded as -1, which is also their code in a categorical.
+                    columns[column['name']] = pd.Categorical.from_codes(codes, categories=pd.Index(values, dtype=object))
+                    continue
+                lookup = np.empty(len(offsets), dtype=object)
+                lookup[:-1] = values
+                lookup[-1] = np.nan
+                columns[column['name']] = lookup[codes]
+            else:
+                columns[column['name']] = np.load(path)
+        df = pd.DataFrame(columns, columns=[name for name in names if name in columns])
+        if len(df) != meta['rows']:
+            raise ValueError('Cached table is truncated.')
+        return df
+
+    @staticmethod
+    def _write(table_dir: str, chunks: Iterable[pd.DataFrame], fingerprint: dict, columns: List[dict]) -> None:
+        """
+        Writes a table chunk by chunk into an empty directory (see
+        `_publish`). Columns (described by their names, kinds and dtypes)
+        are appended to raw files, which are converted into `.npy` files
+        once the number of rows is known.
+        """
+        files = {}
+        dictionaries = {column['name']: {} for column in columns if column['kind'] == 'text'}
+        rows = 0
+        try:
+            files = {column['name']: open(os.path.join(table_dir, f"{column['name']}.raw"), 'wb') for column in columns}
+            for chunk in chunks:
+                for column in columns:
+                    name = column['name']
+                    if column['kind'] == 'text':
+                        # Dictionary encoding shared by all chunks (missing values are encoded as -1).
+                        codes, values = pd.factorize(chunk[name])
+                        dictionary = dictionaries[name]
+                        mapping = np.array([dictionary.setdefault(value, len(dictionary)) for value in values] + [-1], dtype=np.int32)
+                        files[name].write(mapping[codes].tobytes())
+                    else:
+                        files[name].write(chunk[name].to_numpy().astype(column['dtype'], copy=False).tobytes())
+                rows += len(chunk)
+        finally:
+            for file in files.values():
+                file.close()
+
+        for column in columns:
+            name = column['name']
+            raw_path = os.path.join(table_dir, f'{name}.raw')
+            dtype = np.dtype(np.int32 if column['kind'] == 'text' else column['dtype'])
+            if rows:
+                np.save(os.path.join(table_dir, f'{name}.npy'), np.memmap(raw_path, dtype=dtype, mode='r', shape=(rows,)))
+            else:
+                np.save(os.path.join(table_dir, f'{name}.npy'), np.empty(0, dtype=dtype))
+            os.remove(raw_path)
+            if column['kind'] == 'text':
+                encoded = [value.encode('utf-8') for value in dictionaries[name]]
+                offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+                offsets[1:] = np.cumsum(np.array([len(value) for value in encoded], dtype=np.int64))
+                np.save(os.path.join(table_dir, f'{name}.blob.npy'), np.frombuffer(b''.join(encoded), dtype=np.uint8))
+                np.save(os.path.join(table_dir, f'{name}.offsets.npy'), offsets)
+        TableCache._write_meta(table_dir, {'source': fingerprint, 'rows': rows, 'columns': columns})
+
+    @staticmethod
+    def _read_arrays(arrays_dir: str, mmap: bool) -> Dict[str, np.ndarray]:
+        """Reads cached arrays from their directory."""
+        with open(os.path.join(arrays_dir, 'meta.json'), 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        return {
+            name: np.load(os.path.join(arrays_dir, f'{name}.npy'), mmap_mode='r' if mmap else None)
+            for name in meta['arrays']
+        }
+
+    @staticmethod
+    def _write_arrays(arrays_dir: str, arrays: Dict[str, np.ndarray], fingerprint: dict) -> None:
+        """Writes arrays into an empty directory (see `_publish`)."""
+        for name, array in arrays.items():
+            np.save(os.path.join(arrays_dir, f'{name}.npy'), array)
+        TableCache._write_meta(arrays_dir, {'source': fingerprint, 'arrays': list(arrays)})
+
+    @staticmethod
+    def _write_meta(directory: str, meta: dict) -> None:
+        """Atomically writes the `meta.json` file of a cached entry."""
+        tmp_path = os.path.join(directory, 'meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+        os.replace(tmp_path, os.path.join(directory, 'meta.json'))
@@ -0,0 +1,100 @@
+import sys
+import json
+import argparse
+from http.client import HTTPConnection
+from urllib.parse import urlencode
+from typing import Dict, List
+
+
+class PredictionClient:
+    """
+    Client of the local prediction server (see `serve.py`), keeping
+    a persistent connection to it.
+
+    Parameters
+    ----------
+    host : str, optional
+        Host of the server (default `127.0.0.1`).
+
+    port : int, optional
+        Port of the server (default 8000).
+
+    timeout : float, optional
+        Timeout of requests in seconds (default 10).
+    """
+
+    _connection: HTTPConnection
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8000, timeout: float = 10.0) -> None:
+        self._connection = HTTPConnection(host, port, timeout=timeout)
+
+    def _get(self, path: str) -> dict:
+        """Sends a GET request and decodes the JSON response."""
+        self._connection.request('GET', path)
+        response = self._connection.getresponse()
+        body = json.loads(response.read().decode('utf-8'))
+        if response.status != 200:
+            raise ValueError(body.get('error', f'Request failed with status {response.status}.'))
+        return body
+
+    def predict(self, user_id: int, movie_id: int) -> float:
+        """
+        Requests a prediction of a rating.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user in the Movie Lens dataset.
+
+        movie_id : int
+            Id of the movie in the Movie Lens dataset.
+
+        Returns
+        -------
+        float
+            Prediction of the rating (not rounded).
+
+        Raises
+        ------
+        ValueError
+            When the server rejects the request (e.g. for a nonexistent movie).
+        """
+        return self._get(f"/predict?{urlencode({'user_id': user_id, 'movie_id': movie_id})}")['prediction']
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Requests the counters of the server.
+
+        Returns
+        -------
+        Dict[str, float]
+            Counters of the server (see `serve.LatencyStats.snapshot`).
+        """
+        return self._get('/stats')
+
+    def close(self) -> None:
+        """Closes the connection."""
+        self._connection.close()
+
+
+def main(args: List[str]) -> None:
+
+    parser = argparse.ArgumentParser(description='Requests a prediction from the local prediction server.')
+    parser.add_argument('user_id', type=int, help='id of the user')
+    parser.add_argument('movie_id', type=int, help='id of the movie')
+    parser.add_argument('--host', default='127.0.0.1', help='host of the server (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='port of the server (default 8000)')
+    args = parser.parse_args(args)
+
+    client = PredictionClient(args.host, args.port)
+    try:
+        print(client.predict(args.user_id, args.movie_id))
+    except ValueError as error:
+        print(error)
+        sys.exit(1)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,270 @@
+import os
+import sys
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from .dataset import PREDICTION_COLUMNS, MovieLensDataset
+from .preprocessing import MovieLensDatasetPreprocessor
+from .predict import Predictor
+from .baseline import BaselinePredictor
+from .rating_stats import RatingStatistics
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+
+_worker_state: Dict[str, np.ndarray] = None
+"""Shared state of the cross-validation in a worker process (loaded by `_init_worker`)."""
+
+
+def assign_folds(n_ratings: int, n_folds: int, sample_size: Optional[int] = None, seed: Optional[int] = 42) -> np.ndarray:
+    """
+    Randomly assigns ratings to folds of equal sizes (differing by at most one).
+
+    Parameters
+    ----------
+    n_ratings : int
+        Number of ratings.
+
+    n_folds : int
+        Number of folds (at least 2).
+
+    sample_size : int, optional
+        Number of ratings drawn at random to be split into the folds (all
+        ratings by default); the remaining ratings are always used for training.
+
+    seed : int, optional
+        Seed of the random number generator.
+
+    Returns
+    -------
+    numpy.ndarray
+        Fold of each rating (-1 for ratings which are never held out).
+
+    Raises
+    ------
+    ValueError
+        When the number of folds or the sample size is invalid.
+    """
+    if n_folds < 2:
+        raise ValueError('n_folds should be an integer greater than 1.')
+    sample_size = n_ratings if sample_size is None else sample_size
+    if not n_folds <= sample_size <= n_ratings:
+        raise ValueError(f'sample_size should be a number from the interval [{n_folds}, {n_ratings}].')
+    rng = np.random.default_rng(seed)
+    folds = np.full(n_ratings, -1, dtype=np.int8 if n_folds < 128 else np.int32)
+    folds[rng.choice(n_ratings, size=sample_size, replace=False)] = np.arange(sample_size) % n_folds
+    return folds
+
+
+def encode(dataset: MovieLensDataset) -> Dict[str, np.ndarray]:
+    """
+    Encodes a dataset once for all the folds: fits the predictor to all
+    ratings and keeps its state together with the values of the ratings
+    and the rated movies (all in the order of the ratings store).
+
+    Parameters
+    ----------
+    dataset : MovieLensDataset
+        Dataset.
+
+    Returns
+    -------
+    Dict[str, numpy.ndarray]
+        Arrays of the fitted state of the predictor (see
+        `Predictor.to_arrays`) and the arrays `cv_ratings`,
+        `cv_rated_movies` (dense indices of the movies in the store) and
+        `cv_movie_ids` (ids of the rated movies by their dense indices).
+    """
+    predictor = Predictor()
+    predictor.fit(MovieLensDatasetPreprocessor().fit_transform(dataset))
+    store = dataset.get_ratings_store()
+    state = predictor.to_arrays()
+    state.update({
+        'cv_ratings': store.get_ratings(),
+        'cv_rated_movies': store.get_rated_movies(),
+        'cv_movie_ids': store.get_movie_ids()
+    })
+    return state
+
+
+def fold_state(state: Dict[str, np.ndarray], folds: np.ndarray, fold: int) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Derives the state of the predictor fitted to the training part of a
+    fold from the state fitted to all ratings (see `encode`): the held-out
+    rows are removed from the packed ratings, and their contribution is
+    subtracted from the counts and sums of the ratings of each user and
+    movie, instead of recomputing the statistics.
+
+    Parameters
+    ----------
+    state : Dict[str, numpy.ndarray]
+        State of the cross-validation (as returned by `encode`).
+
+    folds : numpy.ndarray
+        Fold of each rating (see `assign_folds`).
+
+    fold : int
+        Fold whose ratings are held out.
+
+    Returns
+    -------
+    Tuple[Dict[str, numpy.ndarray], numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Fitted state of the predictor (see `Predictor.from_arrays`) and
+        the user ids, movie ids and values of the held-out ratings.
+    """
+    held_out = folds == fold
+    offsets = state['packed_user_offsets']
+    n_users = len(offsets) - 1
+    users = np.repeat(np.arange(n_users), np.diff(offsets))[held_out]
+    movies = state['cv_rated_movies'][held_out]
+    ratings = state['cv_ratings'][held_out].astype(np.float64)
+
+    arrays = {name: array for name, array in state.items() if not name.startswith('cv_')}
+    removed = np.bincount(users, minlength=n_users)
+    arrays['packed_masks'] = state['packed_masks'][~held_out]
+    arrays['packed_user_offsets'] = offsets - np.append(0, np.cumsum(removed)).astype(offsets.dtype)
+
+    # Ratings are multiples of a half, so the subtracted sums are exact.
+    n_movies = len(state['statistics_movie_count'])
+    for kind, index, size in (('user', users, n_users), ('movie', movies, n_movies)):
+        counts, sums = state[f'statistics_{kind}_count'], state[f'statistics_{kind}_sum']
+        arrays[f'statistics_{kind}_count'] = (counts - np.bincount(index, minlength=size)).astype(counts.dtype)
+        arrays[f'statistics_{kind}_sum'] = sums - np.bincount(index, weights=ratings, minlength=size)
+
+    return arrays, state['packed_user_ids'][users], state['cv_movie_ids'][movies], ratings
+
+
+def evaluate_fold(state: Dict[str, np.ndarray], folds: np.ndarray, fold: int) -> Dict[str, float]:
+    """
+    Evaluates the predictor and the baseline predictor on a fold.
+
+    Parameters
+    ----------
+    state : Dict[str, numpy.ndarray]
+        State of the cross-validation (as returned by `encode`).
+
+    folds : numpy.ndarray
+        Fold of each rating (see `assign_folds`).
+
+    fold : int
+        Fold whose ratings are held out.
+
+    Returns
+    -------
+    Dict[str, float]
+        Number of held-out `ratings` and the mean squared errors
+        `model_mse` and `baseline_mse`.
+    """
+    arrays, user_ids, movie_ids, y_true = fold_state(state, folds, fold)
+    predictor = Predictor.from_arrays(arrays)
+    baseline_predictor = BaselinePredictor.from_statistics(RatingStatistics(
+        {name[len('statistics_'):]: array for name, array in arrays.items() if name.startswith('statistics_')}
+    ))
+    y_pred_model = predictor.predict_many(user_ids, movie_ids)
+    y_pred_base = baseline_predictor.predict_many(user_ids, movie_ids)
+    return {
+        'fold': fold,
+        'ratings': len(y_true),
+        'model_mse': float(np.mean((y_true - y_pred_model) ** 2)),
+        'baseline_mse': float(np.mean((y_true - y_pred_base) ** 2))
+    }
+
+
+def _init_worker(state_dir: str) -> None:
+    """Loads the state of the cross-validation in a worker process by memory-mapping its arrays."""
+    global _worker_state
+    _worker_state = {
+        name[:-len('.npy')]: np.load(os.path.join(state_dir, name), mmap_mode='r')
+        for name in os.listdir(state_dir) if name.endswith('.npy')
+    }
+
+
+def _evaluate_fold(fold: int) -> Dict[str, float]:
+    """Evaluates a fold in a worker process."""
+    return evaluate_fold(_worker_state, _worker_state['cv_folds'], fold)
+
+
+def cross_validate(
+    dataset: MovieLensDataset,
+    n_folds: int = 5,
+    sample_size: Optional[int] = None,
+    workers: int = 1,
+    seed: Optional[int] = 42
+) -> pd.DataFrame:
+    """
+    Evaluates the predictor and the baseline predictor with k-fold
+    cross-validation. The dataset is loaded and encoded only once (see
+    `encode`), folds are masks over its ratings (see `assign_folds`) and
+    the state fitted to the training part of each fold is derived from the
+    state fitted to all ratings (see `fold_state`).
+
+    With many workers, the folds are evaluated in parallel by worker
+    processes, with which the encoded dataset is shared through
+    memory-mapped files instead of being pickled.
+
+    Parameters
+    ----------
+    dataset : MovieLensDataset
+        Dataset (left unchanged).
+
+    n_folds : int, optional
+        Number of folds (default 5).
+
+    sample_size : int, optional
+        Number of ratings split into the folds (see `assign_folds`).
+
+    workers : int, optional
+        Number of worker processes (default 1, i.e. the folds are
+        evaluated in the current process).
+
+    seed : int, optional
+        Seed of the random assignment of the ratings to the folds.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Results of each fold: number of held-out `ratings` and the
+        mean squared errors `model_mse` and `baseline_mse`, indexed by `fold`.
+    """
+    state = encode(dataset)
+    state['cv_folds'] = assign_folds(len(state['cv_ratings']), n_folds, sample_size, seed)
+    if workers > 1:
+        with tempfile.TemporaryDirectory() as state_dir:
+            for name, array in state.items():
+                np.save(os.path.join(state_dir, f'{name}.npy'), np.asarray(array))
+            with Pool(min(workers, n_folds), initializer=_init_worker, initargs=(state_dir,)) as pool:
+                results = pool.map(_evaluate_fold, range(n_folds), chunksize=1)
+    else:
+        results = [evaluate_fold(state, state['cv_folds'], fold) for fold in range(n_folds)]
+    return pd.DataFrame(results).set_index('fold')
+
+
+def main(args: List[str]) -> None:
+
+    parser = argparse.ArgumentParser(description='Evaluates the predictor with k-fold cross-validation.')
+    parser.add_argument('dataset_name', help='name of the dataset (ml-latest-small or ml-latest)')
+    parser.add_argument('--folds', type=int, default=5, help='number of folds (default 5)')
+    parser.add_argument('--sample-size', type=int, help='number of ratings split into the folds (all ratings by default)')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes (default 1)')
+    parser.add_argument('--seed', type=int, default=42, help='seed of the assignment of the ratings to the folds (default 42)')
+    args = parser.parse_args(args)
+
+    dataset = MovieLensDataset(args.dataset_name, columns=PREDICTION_COLUMNS, categorical=True)
+
+    results = cross_validate(dataset, args.folds, args.sample_size, args.workers, args.seed)
+
+    var = dataset.get_ratings_store().get_ratings().var(ddof=1, dtype=np.float64)
+    weights = results['ratings'] / results['ratings'].sum()
+
+    print(results.to_string(float_format=lambda value: f'{value : .4f}'))
+    print()
+    for name, column in (('Model', 'model_mse'), ('Baseline', 'baseline_mse')):
+        # Pooled over all held-out ratings, with the spread between the folds.
+        mse = float((results[column] * weights).sum())
+        label = f'{name} MSE:'
+        print(f'{label : <14}{mse : .4f} (std over folds: {results[column].std() : .4f}, standarized: {mse / var : .4f})')
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,42 +1,125 @@
 import os
+import time
+import numpy as np
 import pandas as pd
-from dataclasses import dataclass
-from typing import List
-
-
-class InvalidDatasetException(Exception):
-    """Exception thrown when invalid dataset is provided."""
+from .cache import TableCache, read_csv_chunks, read_csv_columns
+from .exceptions import InvalidDatasetException, InvalidMovieException, InvalidUserException
+from .instrumentation import instrumented, stage
+from .movie_index import MovieIndex
+from .ratings_store import RatingsStore
+from .ratings_view import RatingsView
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+TABLE_DTYPES: Dict[str, Dict[str, str]] = {
+    'links': {'movieId': 'int32', 'imdbId': 'int32', 'tmdbId': 'float64'},
+    'movies': {'movieId': 'int32'},
+    'ratings': {'userId': 'int32', 'movieId': 'int32', 'rating': 'float32', 'timestamp': 'int32'},
+    'tags': {'userId': 'int32', 'movieId': 'int32', 'timestamp': 'int32'}
+}
+"""Narrow dtypes of the numeric columns of each table of the dataset."""
+
+TABLE_COLUMNS: Dict[str, List[str]] = {
+    'links': ['movieId', 'imdbId', 'tmdbId'],
+    'movies': ['movieId', 'title', 'genres'],
+    'ratings': ['userId', 'movieId', 'rating', 'timestamp'],
+    'tags': ['userId', 'movieId', 'tag', 'timestamp']
+}
+"""Columns of each table of the dataset."""
+
+TABLE_INDEX: Dict[str, List[str]] = {
+    'links': ['movieId'],
+    'movies': ['movieId'],
+    'ratings': ['userId', 'movieId'],
+    'tags': []
+}
+"""Columns by which each table is indexed."""
+
+REQUIRED_COLUMNS: Dict[str, List[str]] = {**TABLE_INDEX, 'ratings': ['userId', 'movieId', 'rating']}
+"""Columns of each table which are always loaded."""
+
+CATEGORICAL_COLUMNS: Dict[str, List[str]] = {'movies': ['genres'], 'tags': ['tag']}
+"""Text columns with few distinct values, which can be loaded as categoricals."""
+
+PREDICTION_COLUMNS: Dict[str, List[str]] = {'movies': ['genres'], 'ratings': ['rating']}
+"""Columns used by the predictors (which do not use the `links` and `tags` tables at all)."""
+
+RatingsListener = Callable[[int, int, Optional[float], Optional[float]], None]
+"""
+Function called when a rating changes, with the id of the user, the id of
+the movie, the previous rating and the new rating (`None` when the rating
+did not exist before or does not exist anymore, respectively).
+"""
+
+
+def snapshot(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Creates a read-only snapshot of a data frame, which shares memory
+    with it instead of copying the data.
 
-    def __init__(self, *args: object) -> None:
-        super().__init__(*args)
+    Values of the snapshot cannot be modified in place (an attempt raises
+    `ValueError`), while structural changes (e.g. adding or dropping
+    columns or rows) only affect the snapshot itself. Hence, the snapshot
+    should be copied before its values are modified.
 
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Data frame of which the snapshot should be taken.
 
-class InvalidMovieException(Exception):
-    """Exception thrown when invalid movie is selected."""
+    Returns
+    -------
+    pandas.DataFrame
+        Read-only snapshot of the data frame.
+    """
+    columns = {}
+    for position in range(df.shape[1]):
+        column = df.iloc[:, position]
+        if isinstance(column.dtype, np.dtype):
+            values = column.to_numpy().view()
+            values.flags.writeable = False
+            columns[position] = values
+        else:
+            columns[position] = column.copy()
+    result = pd.DataFrame(columns, index=df.index, copy=False)
+    result.columns = df.columns
+    return result
 
-    def __init__(self, *args: object) -> None:
-        super().__init__(*args)
 
+class Movie:
+    """
+    Representation of a movie from the Movie Lens dataset.
 
-class InvalidUserException(Exception):
-    """Exception thrown when invalid user is selected."""
+    Parameters
+    ----------
+    id : int
+        Id of the movie.
 
-    def __init__(self, *args: object) -> None:
-        super().__init__(*args)
+    title : str
+        Title of the movie.
 
+    genres : List[str]
+        List of genres.
+    """
 
-@dataclass
-class Movie:
-    """Representation of a movie from the Movie Lens dataset."""
+    __slots__ = ('id', 'title', 'genres')
 
     id: int
-    """Id of the movie."""
-
     title: str
-    """Title of the movie."""
-
     genres: List[str]
-    """List of genres."""
+
+    def __init__(self, id: int, title: str, genres: List[str]) -> None:
+        self.id = id
+        self.title = title
+        self.genres = genres
+
+    def __repr__(self) -> str:
+        return f'Movie(id={self.id!r}, title={self.title!r}, genres={self.genres!r})'
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Movie):
+            return NotImplemented
+        return (self.id, self.title, self.genres) == (other.id, other.title, other.genres)
 
 
 class MovieLensDataset:
@@ -56,23 +139,165 @@ class MovieLensDataset:
         - `ml-latest` - contains 33832162 ratings and 2328315 tag applications across 86537
         movies. These data were created by 330975 users between January 09, 1995 and July 20,
         2023. This dataset was generated on July 20, 2023.
+
+    use_cache : bool, optional
+        Whether the tables should be loaded from (and stored in) the binary
+        on-disk cache in `data/cache` instead of being parsed from the CSV
+        files each time (default `True`).
+
+    chunk_bytes : int, optional
+        Approximate memory budget for parsing a chunk of a CSV file
+        (default 64 MiB); the CSV files are streamed into the cache and
+        the ratings into their store chunk by chunk (see `TableCache` and
+        `RatingsStore.from_chunks`).
+
+    data_dir : str, optional
+        Directory containing the CSV files of a dataset in the Movie Lens
+        format (e.g. a synthetic one, see `synthetic.py`), loaded instead of
+        the downloaded dataset. The name of the dataset is then arbitrary,
+        and its cache is stored in the subdirectory `cache` of the directory.
+
+    columns : Dict[str, Sequence[str]], optional
+        Columns which should be loaded for some of the tables (all columns
+        by default, e.g. `PREDICTION_COLUMNS` for prediction runs). The
+        index columns, as well as `rating` of the `ratings` table, are
+        always loaded; titles of movies are loaded on demand by
+        `get_movie_by_id`.
+
+    categorical : bool, optional
+        Whether the text columns with few distinct values (`genres` of the
+        `movies` table and `tag` of the `tags` table) should be loaded as
+        `pandas.Categorical` instead of strings (default `False`).
+
+    Tables are loaded lazily, on their first use, so that e.g. the `links`
+    and `tags` tables are never loaded when only ratings are predicted.
+    The ratings are loaded into their store (see `get_ratings_store`),
+    from which the `ratings` table is materialized only when it is used.
     """
 
     _name: str
-    _links: pd.DataFrame
-    _movies: pd.DataFrame
-    _ratings: pd.DataFrame
-    _tags: pd.DataFrame
-
-    def __init__(self, dataset_name: str = 'ml-latest-small') -> None:
-        if dataset_name not in ('ml-latest-small', 'ml-latest'):
-            raise InvalidDatasetException(f'Unknown dataset: {dataset_name}')
+    _raw_dir: str
+    _cache: TableCache
+    _chunk_bytes: int
+    _tables: Dict[str, Optional[pd.DataFrame]]
+    _ratings_view: Optional[RatingsView]
+    _ratings_listeners: Tuple[RatingsListener, ...]
+    _movie_index: Optional[MovieIndex]
+    _columns: Dict[str, Optional[List[str]]]
+    _categorical: bool
+
+    def __init__(
+        self,
+        dataset_name: str = 'ml-latest-small',
+        use_cache: bool = True,
+        chunk_bytes: int = 64 * 2 ** 20,
+        data_dir: Optional[str] = None,
+        columns: Optional[Dict[str, Sequence[str]]] = None,
+        categorical: bool = False
+    ) -> None:
         dirname = os.path.dirname(__file__)
+        if data_dir is not None:
+            if not os.path.isdir(data_dir):
+                raise InvalidDatasetException(f'Dataset directory does not exist: {data_dir}')
+            raw_dir, cache_dir = data_dir, os.path.join(data_dir, 'cache')
+        elif dataset_name in ('ml-latest-small', 'ml-latest'):
+            raw_dir, cache_dir = os.path.join(dirname, f'../data/raw/{dataset_name}'), os.path.join(dirname, f'../data/cache/{dataset_name}')
+        else:
+            raise InvalidDatasetException(f'Unknown dataset: {dataset_name}')
         self._name = dataset_name
-        self._links = pd.read_csv(os.path.join(dirname, f'../data/raw/{dataset_name}/links.csv')).set_index('movieId')
-        self._movies = pd.read_csv(os.path.join(dirname, f'../data/raw/{dataset_name}/movies.csv')).set_index('movieId')
-        self._ratings = pd.read_csv(os.path.join(dirname, f'../data/raw/{dataset_name}/ratings.csv')).set_index(['userId', 'movieId'])
-        self._tags = pd.read_csv(os.path.join(dirname, f'../data/raw/{dataset_name}/tags.csv'))
+        self._raw_dir = raw_dir
+        self._cache = TableCache(cache_dir, chunk_bytes) if use_cache else None
+        self._chunk_bytes = chunk_bytes
+        self._tables = {table: None for table in TABLE_COLUMNS}
+        self._ratings_view = None
+        self._ratings_listeners = ()
+        self._movie_index = None
+        self._columns = {table: None for table in TABLE_COLUMNS}
+        for table, selected in (columns or {}).items():
+            if table not in TABLE_COLUMNS:
+                raise ValueError(f'Unknown table: {table}.')
+            unknown = [column for column in selected if column not in TABLE_COLUMNS[table]]
+            if unknown:
+                raise ValueError(f'Unknown columns of the table {table}: {", ".join(unknown)}.')
+            self._columns[table] = [column for column in TABLE_COLUMNS[table] if column in selected or column in REQUIRED_COLUMNS[table]]
+        self._categorical = categorical
+
+    def _get_table(self, table: str) -> pd.DataFrame:
+        """
+        Provides one of the tables of the dataset, loading it on its first
+        use (the `ratings` table is materialized from the store of the
+        ratings, see `get_ratings_store`).
+
+        Parameters
+        ----------
+        table : str
+            Name of the table (`links`, `movies`, `ratings` or `tags`).
+
+        Returns
+        -------
+        pandas.DataFrame
+            Loaded table (indexed by its index columns, see `TABLE_INDEX`).
+        """
+        if self._tables[table] is None:
+            if table == 'ratings':
+                self._tables[table] = self._ratings_frame(self.get_ratings_store())
+            else:
+                self._tables[table] = self._load_table(table)
+        return self._tables[table]
+
+    def _load_table(self, table: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Loads one of the tables of the dataset, using the on-disk cache if enabled.
+
+        Parameters
+        ----------
+        table : str
+            Name of the table (`links`, `movies`, `ratings` or `tags`).
+
+        columns : List[str], optional
+            Columns which should be loaded (the columns selected for the
+            dataset by default).
+
+        Returns
+        -------
+        pandas.DataFrame
+            Loaded table (indexed by its index columns, see `TABLE_INDEX`).
+        """
+        source_path = os.path.join(self._raw_dir, f'{table}.csv')
+        columns = columns if columns is not None else self._columns[table]
+        categorical = CATEGORICAL_COLUMNS.get(table, []) if self._categorical else []
+        with stage(f'dataset.load_table.{table}') as measured:
+            if self._cache is None:
+                df = read_csv_columns(source_path, TABLE_DTYPES[table], columns, categorical)
+            else:
+                df = self._cache.load(table, source_path, TABLE_DTYPES[table], columns, categorical)
+            measured.add_rows(len(df))
+        return df.set_index(TABLE_INDEX[table]) if TABLE_INDEX[table] else df
+
+    def _load_columns(self, table: str, columns: List[str]) -> None:
+        """
+        Adds columns which have not been selected for the dataset (e.g.
+        titles of movies when only `PREDICTION_COLUMNS` are loaded) to
+        a table, loading them on demand. Snapshots of the table returned
+        earlier are not affected.
+        """
+        df = self._get_table(table)
+        missing = [column for column in columns if column not in df.columns]
+        if not missing:
+            return
+        loaded = self._load_table(table, TABLE_INDEX[table] + missing)
+        df = df.join(loaded[missing])
+        self._columns = {**self._columns, table: [column for column in TABLE_COLUMNS[table] if column in df.columns or column in TABLE_INDEX[table]]}
+        self._tables[table] = df[[column for column in self._columns[table] if column in df.columns]]
+
+    def get_loaded_tables(self) -> List[str]:
+        """
+        Returns
+        -------
+        List[str]
+            Names of the tables which have already been loaded.
+        """
+        return [table for table, df in self._tables.items() if df is not None]
     
     def get_name(self) -> str:
         """
@@ -83,7 +308,7 @@ class MovieLensDataset:
         """
         return self._name
     
-    def get_links(self) -> pd.DataFrame:
+    def get_links(self, copy: bool = True) -> pd.DataFrame:
         """
         Provides table containing identifiers that can be used to link to other
         sources of movie data in which each row represents one movie, and
@@ -102,14 +327,22 @@ class MovieLensDataset:
 
         Use of the resources listed above is subject to the terms of each provider.
 
+        Parameters
+        ----------
+        copy : bool, optional
+            Whether an independent copy of the table should be returned
+            (default `True`). Otherwise, a read-only snapshot sharing memory
+            with the dataset is returned (see `snapshot`).
+
         Returns
         -------
         pandas.DataFrame
             Data frame conatining data about links to other data sources.
         """
-        return self._links.copy()
+        df = self._get_table('links')
+        return df.copy() if copy else snapshot(df)
     
-    def get_movies(self) -> pd.DataFrame:
+    def get_movies(self, copy: bool = True) -> pd.DataFrame:
         """
         Provides table in which each represents one movie, and has the following format:
 
@@ -141,14 +374,23 @@ class MovieLensDataset:
         * Western
         * (no genres listed)
 
+        Parameters
+        ----------
+        copy : bool, optional
+            Whether an independent copy of the table should be returned
+            (default `True`). Otherwise, a read-only snapshot sharing memory
+            with the dataset is returned (see `snapshot`).
+
         Returns
         -------
         pandas.DataFrame
             Data frame conatining information about movies.
         """
-        return self._movies.copy()
+        df = self._get_table('movies')
+        return df.copy() if copy else snapshot(df)
 
-    def get_ratings(self) -> pd.DataFrame:
+    @instrumented('dataset.get_ratings', rows=len)
+    def get_ratings(self, copy: bool = True) -> pd.DataFrame:
         """
         Provides table in which each row represents one rating of one movie
         by one user, and has the following format:
@@ -156,6 +398,8 @@ class MovieLensDataset:
             `userId`, `movieId`, `rating`, `timestamp`
 
         The rows are ordered first by `userId`, then, within user, by `movieId`.
+        The table is materialized from the store of the ratings (see
+        `get_ratings_store`) on the first call.
 
         Ratings are made on a 5-star scale, with half-star increments
         (0.5 stars - 5.0 stars).
@@ -163,14 +407,84 @@ class MovieLensDataset:
         Timestamps represent seconds since midnight Coordinated Universal
         Time (UTC) of January 1, 1970.
 
+        Parameters
+        ----------
+        copy : bool, optional
+            Whether an independent copy of the table should be returned
+            (default `True`). Otherwise, a read-only snapshot sharing memory
+            with the dataset is returned (see `snapshot`).
+
         Returns
         -------
         pandas.DataFrame
             Data frame conatining data about user ratings.
         """
-        return self._ratings.copy()
+        df = self._get_table('ratings')
+        return df.copy() if copy else snapshot(df)
     
-    def get_tags(self) -> pd.DataFrame:
+    @instrumented('dataset.get_ratings_store', rows=len)
+    def get_ratings_store(self) -> RatingsView:
+        """
+        Provides the `ratings` table in the form of a `RatingsStore`, which
+        allows retrieving ratings of a single user or of a single movie in
+        time proportional to their number.
+
+        If the on-disk cache is enabled, the store of all ratings is
+        memory-mapped from the cache (and built there first if needed), so
+        that all processes using the dataset share a single copy of it
+        through the OS page cache. The store is built from the CSV file
+        parsed in chunks, without materializing the `ratings` table.
+
+        Changes of the ratings only update an overlay of the store (see
+        `RatingsView`): deleted ratings are marked in a mask of its rows
+        and added or changed ratings are recorded in a log of changes.
+        Ratings of single users and movies and of random samples are read
+        through the overlay, so the store is not derived again after each
+        change.
+
+        Returns
+        -------
+        RatingsView
+            Read-only store of the current ratings.
+        """
+        if self._ratings_view is None:
+            if self._tables['ratings'] is not None:
+                self._ratings_view = RatingsView(RatingsStore.from_frame(self._tables['ratings']))
+            else:
+                self._ratings_view = RatingsView(self._load_ratings_store())
+        return self._ratings_view
+
+    def _load_ratings_store(self) -> RatingsStore:
+        """
+        Loads the store of all ratings (with timestamps, even if they have
+        not been selected), using the on-disk cache if enabled.
+        """
+        source_path = os.path.join(self._raw_dir, 'ratings.csv')
+        dtype = TABLE_DTYPES['ratings']
+
+        def build() -> RatingsStore:
+            return RatingsStore.from_chunks(read_csv_chunks(source_path, dtype, TABLE_COLUMNS['ratings'], self._chunk_bytes))
+
+        with stage('dataset.load_table.ratings') as measured:
+            if self._cache is None:
+                store = build()
+            else:
+                store = RatingsStore(self._cache.load_arrays('ratings_store', source_path, lambda: build().to_arrays(), params={'dtype': dtype}))
+            measured.add_rows(len(store))
+        return store
+
+    def _ratings_frame(self, store: RatingsStore) -> pd.DataFrame:
+        """Materializes the `ratings` table (with the selected columns) from a store of the ratings."""
+        user_ids = np.repeat(store.get_user_ids(), np.diff(store.get_user_offsets()))
+        movie_ids = store.get_movie_ids()[store.get_rated_movies()]
+        columns = {'rating': store.get_ratings(), 'timestamp': store.get_timestamps()}
+        selected = self._columns['ratings'] or TABLE_COLUMNS['ratings']
+        return pd.DataFrame(
+            {column: np.array(values) for column, values in columns.items() if column in selected},
+            index=pd.MultiIndex.from_arrays([user_ids, movie_ids], names=TABLE_INDEX['ratings'])
+        )
+
+    def get_tags(self, copy: bool = True) -> pd.DataFrame:
         """
         Provides table in which each row represents one tag applied to
         one movie by one user, and has the following format:
@@ -187,12 +501,20 @@ class MovieLensDataset:
         Timestamps represent seconds since midnight Coordinated
         Universal Time (UTC) of January 1, 1970.
 
+        Parameters
+        ----------
+        copy : bool, optional
+            Whether an independent copy of the table should be returned
+            (default `True`). Otherwise, a read-only snapshot sharing memory
+            with the dataset is returned (see `snapshot`).
+
         Returns
         -------
         pandas.DataFrame
             Data frame conatining information about tags.
         """
-        return self._tags.copy()
+        df = self._get_table('tags')
+        return df.copy() if copy else snapshot(df)
     
     def get_movie_by_id(self, movie_id: int):
         """
@@ -215,15 +537,57 @@ class MovieLensDataset:
             When there is no movie with requested `movieId`.
         """
 
-        if movie_id not in self._movies.index:
+        position = int(self.get_movie_index().positions([movie_id])[0])
+        if position < 0:
             raise InvalidMovieException(f'There is no movie with movieId={movie_id}.')
         
-        title: str
-        tags_str: str
-        title, tags_str = self._movies.loc[[movie_id]].values.reshape(-1)
+        self._load_columns('movies', ['title', 'genres'])
+        movies = self._get_table('movies')
+        title: str = movies['title'].array[position]
+        tags_str: str = movies['genres'].array[position]
         tags = tags_str.split('|')
         return Movie(movie_id, title, tags)
 
+    def get_movie_index(self) -> MovieIndex:
+        """
+        Provides the index of the movies (with genre masks of the movies),
+        which is built on the first call.
+
+        Returns
+        -------
+        MovieIndex
+            Index of the movies of the `movies` table.
+        """
+        if self._movie_index is None:
+            self._movie_index = MovieIndex.from_genres(self._get_table('movies')['genres'])
+        return self._movie_index
+
+    def add_ratings_listener(self, listener: RatingsListener) -> None:
+        """
+        Registers a function called whenever a rating is added to, changed
+        in or removed from the `ratings` table (e.g. to update data derived
+        from it).
+
+        Parameters
+        ----------
+        listener : RatingsListener
+            Function taking the id of the user and the id of the movie
+            whose rating has changed, as well as the previous and the new
+            rating (`None` for a rating which is added or removed).
+        """
+        self._ratings_listeners = (*self._ratings_listeners, listener)
+
+    def remove_ratings_listener(self, listener: RatingsListener) -> None:
+        """
+        Unregisters a function registered with `add_ratings_listener`.
+
+        Parameters
+        ----------
+        listener : RatingsListener
+            Function that should no longer be called.
+        """
+        self._ratings_listeners = tuple(registered for registered in self._ratings_listeners if registered != listener)
+
     def delete_rating(self, user_id: int, movie_id: int) -> bool:
         """
         Deletes a requested user rating from the `ratings` table.
@@ -251,14 +615,183 @@ class MovieLensDataset:
             When there is no movie with requested `movieId`.
         """
 
-        if user_id not in self._ratings.index.get_level_values('userId'):
+        if not self.get_ratings_store().has_ratings([user_id])[0]:
             raise InvalidUserException(f'There is no user with userId={user_id}.')
         
-        if movie_id not in self._movies.index:
+        if self.get_movie_index().positions([movie_id])[0] < 0:
             raise InvalidMovieException(f'There is no movie with movieId={movie_id}.')
         
-        if (user_id, movie_id) in self._ratings.index:
-            self._ratings.drop((user_id, movie_id), inplace=True)
-            return True
-        
-        return False
\ No newline at end of file
+        return bool(self._delete_pairs(np.array([user_id]), np.array([movie_id]))[0])
+
+    def add_rating(self, user_id: int, movie_id: int, rating: float, timestamp: Optional[int] = None) -> bool:
+        """
+        Adds a user rating to the `ratings` table (keeping its order) or
+        replaces the rating if the user has already rated the movie.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user who rated the movie (it may be a new user).
+
+        movie_id : int
+            Id of the rated movie.
+
+        rating : float
+            Rating on the 5-star scale with half-star increments.
+
+        timestamp : int, optional
+            Time of the rating in seconds since the epoch (current time by default).
+
+        Returns
+        -------
+        bool
+            `True` if the rating was added, `False` if an existing rating
+            was replaced.
+
+        Raises
+        ------
+        dataset.InvalidMovieException
+            When there is no movie with requested `movieId`.
+
+        ValueError
+            When the rating is not on the 5-star scale.
+        """
+
+        if movie_id not in self._get_table('movies').index:
+            raise InvalidMovieException(f'There is no movie with movieId={movie_id}.')
+
+        if not (0.5 <= rating <= 5.0 and float(rating * 2).is_integer()):
+            raise ValueError(f'Rating should be a multiple of 0.5 from the interval [0.5, 5.0]. Got {rating}.')
+
+        timestamp = int(time.time()) if timestamp is None else timestamp
+        previous = self.get_ratings_store().set_rating(user_id, movie_id, rating, timestamp)
+        self._tables['ratings'] = None
+        for listener in self._ratings_listeners:
+            listener(user_id, movie_id, previous, float(rating))
+        return previous is None
+
+    def delete_ratings(self, user_ids: Sequence[int], movie_ids: Sequence[int]) -> np.ndarray:
+        """
+        Deletes many user ratings from the `ratings` table at once, with
+        a single vectorized lookup and a single removal of the rows.
+
+        Parameters
+        ----------
+        user_ids : Sequence[int]
+            Ids of the users whose ratings should be removed.
+
+        movie_ids : Sequence[int]
+            Ids of the movies for which the ratings should be removed
+            (one for each user id).
+
+        Returns
+        -------
+        numpy.ndarray
+            For each pair, `True` if the rating was actually in the table
+            `ratings`, `False` otherwise (including repeated pairs).
+
+        Raises
+        ------
+        dataset.InvalidUserException
+            When there is no user with some of the requested `userId`s.
+
+        dataset.InvalidMovieException
+            When there is no movie with some of the requested `movieId`s.
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64).reshape(-1)
+        movie_ids = np.asarray(movie_ids, dtype=np.int64).reshape(-1)
+        if len(user_ids) != len(movie_ids):
+            raise ValueError('user_ids and movie_ids should have equal lengths.')
+
+        distinct_users = np.unique(user_ids)
+        unknown_users = distinct_users[~self.get_ratings_store().has_ratings(distinct_users)]
+        if len(unknown_users):
+            raise InvalidUserException(f'There is no user with userId={unknown_users[0]}.')
+
+        unknown_movies = np.unique(movie_ids[self.get_movie_index().positions(movie_ids) < 0])
+        if len(unknown_movies):
+            raise InvalidMovieException(f'There is no movie with movieId={unknown_movies[0]}.')
+
+        return self._delete_pairs(user_ids, movie_ids)
+
+    @instrumented('dataset.split', rows=lambda held_out: len(held_out[0]))
+    def split(
+        self,
+        sample_size: Optional[int] = None,
+        fraction: Optional[float] = None,
+        mask: Optional[np.ndarray] = None,
+        seed: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Holds out a part of the `ratings` table, i.e. removes the selected
+        ratings from the table (leaving the training part in the dataset)
+        and returns them. Exactly one of `sample_size`, `fraction` and
+        `mask` should be given.
+
+        Random samples are drawn in the same way as by
+        `pandas.DataFrame.sample` with `random_state=seed`, so the
+        held-out ratings are the same as the rows of such a sample.
+
+        Parameters
+        ----------
+        sample_size : int, optional
+            Number of ratings drawn at random.
+
+        fraction : float, optional
+            Fraction of the ratings drawn at random.
+
+        mask : numpy.ndarray, optional
+            Boolean mask of the rows of the `ratings` table to be held out.
+
+        seed : int, optional
+            Seed of the random number generator.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+            User ids, movie ids and ratings of the held-out ratings (in the
+            order in which they were drawn, or in the order of the table
+            for a mask).
+        """
+        if sum(option is not None for option in (sample_size, fraction, mask)) != 1:
+            raise ValueError('Exactly one of sample_size, fraction and mask should be given.')
+        store = self.get_ratings_store()
+        n_rows = len(store)
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool)
+            if mask.shape != (n_rows,):
+                raise ValueError(f'Mask should have one value for each of {n_rows} ratings.')
+            positions = np.flatnonzero(mask)
+        else:
+            if fraction is not None:
+                if not 0 <= fraction <= 1:
+                    raise ValueError('fraction should be a number from the interval [0, 1].')
+                sample_size = round(fraction * n_rows)
+            if not 0 <= sample_size <= n_rows:
+                raise ValueError(f'sample_size should be a number from the interval [0, {n_rows}].')
+            positions = np.random.RandomState(seed).choice(n_rows, size=sample_size, replace=False)
+
+        held_out = store.get_rows(positions)
+        self._delete_pairs(*held_out[:2])
+        return held_out
+
+    def _delete_pairs(self, user_ids: np.ndarray, movie_ids: np.ndarray) -> np.ndarray:
+        """
+        Deletes the current ratings of pairs (skipping repeated pairs) in
+        the overlay of the store (see `RatingsView.delete`) and notifies
+        the listeners. The `ratings` table is materialized anew when it is used.
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean mask of the pairs whose ratings were deleted.
+        """
+        with stage('dataset.delete_rows', len(user_ids)):
+            deleted, ratings = self.get_ratings_store().delete(user_ids, movie_ids, int(time.time()))
+            if deleted.any():
+                self._tables['ratings'] = None
+        user_ids, movie_ids = user_ids[deleted], movie_ids[deleted]
+        for listener in self._ratings_listeners:
+            for user_id, movie_id, rating in zip(user_ids.tolist(), movie_ids.tolist(), ratings.tolist()):
+                listener(user_id, movie_id, rating, None)
+        return deleted
@@ -0,0 +1,19 @@
+class InvalidDatasetException(Exception):
+    """Exception thrown when invalid dataset is provided."""
+
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
+class InvalidMovieException(Exception):
+    """Exception thrown when invalid movie is selected."""
+
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
+class InvalidUserException(Exception):
+    """Exception thrown when invalid user is selected."""
+
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
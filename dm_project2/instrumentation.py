@@ -0,0 +1,334 @@
+import json
+import time
+import functools
+import threading
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+
+class StageCollector:
+    """
+    Collector of measurements of the stages of the pipeline: for each
+    stage, the number of calls, the total wall time, the number of
+    processed rows and (if memory is traced) the allocated memory.
+
+    Stages may be nested, so the time of a stage includes the time of
+    the stages called within it. Memory is traced with `tracemalloc`,
+    which slows down the code considerably, so it is disabled by default.
+
+    Parameters
+    ----------
+    trace_memory : bool, optional
+        Whether the memory allocated by the stages should be measured (default `False`).
+    """
+
+    _trace_memory: bool
+    _lock: threading.Lock
+    _local: threading.local
+    _stages: Dict[str, Dict[str, float]]
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self._trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stages = {}
+
+    def traces_memory(self) -> bool:
+        """
+        Returns
+        -------
+        bool
+            Whether the memory allocated by the stages is measured.
+        """
+        return self._trace_memory
+
+    def record(self, name: str, seconds: float, rows: Optional[int] = None, peak_bytes: Optional[int] = None, net_bytes: Optional[int] = None) -> None:
+        """
+        Records a call of a stage.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage.
+
+        seconds : float
+            Wall time of the call.
+
+        rows : int, optional
+            Number of rows processed by the call.
+
+        peak_bytes : int, optional
+            Peak size of the memory allocated during the call.
+
+        net_bytes : int, optional
+            Size of the memory allocated during the call and not freed by its end.
+        """
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0}
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            if rows is not None:
+                stats['rows'] += int(rows)
+            if peak_bytes is not None:
+                stats['peak_bytes'] = max(stats.get('peak_bytes', 0), peak_bytes)
+                stats['net_bytes'] = stats.get('net_bytes', 0) + net_bytes
+
+    def get_stages(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns
+        -------
+        Dict[str, Dict[str, float]]
+            Measurements of each stage: `calls`, `seconds` (total),
+            `max_seconds`, `rows` (total) and, if memory is traced,
+            `peak_bytes` (maximal over the calls) and `net_bytes` (total).
+        """
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stages.items()}
+
+    def reset(self) -> None:
+        """Removes all measurements."""
+        with self._lock:
+            self._stages = {}
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """
+        Dumps the measurements as JSON.
+
+        Parameters
+        ----------
+        path : str, optional
+            File to which the measurements are written.
+
+        Returns
+        -------
+        str
+            Measurements of the stages (see `get_stages`) as a JSON object.
+        """
+        content = json.dumps({'trace_memory': self._trace_memory, 'stages': self.get_stages()}, indent=2)
+        if path is not None:
+            with open(path, 'w') as file:
+                file.write(content)
+        return content
+
+    def summary(self) -> str:
+        """
+        Returns
+        -------
+        str
+            Table of the measurements of the stages, ordered by their total time.
+        """
+        lines = [f'{"stage" : <40} {"calls" : >8} {"total s" : >10} {"max s" : >10} {"rows" : >12} {"peak MiB" : >10}']
+        for name, stats in sorted(self.get_stages().items(), key=lambda item: -item[1]['seconds']):
+            peak = f'{stats["peak_bytes"] / 2 ** 20 : >10.2f}' if 'peak_bytes' in stats else f'{"-" : >10}'
+            lines.append(
+                f'{name : <40} {stats["calls"] : >8} {stats["seconds"] : >10.4f} {stats["max_seconds"] : >10.4f} {stats["rows"] : >12} {peak}'
+            )
+        return '\n'.join(lines)
+
+    def _memory_frames(self) -> List[List[int]]:
+        """Provides the memory frames of the stages currently running in this thread."""
+        frames = getattr(self._local, 'frames', None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+
+class Stage:
+    """
+    Context manager measuring a single call of a stage (see `stage`).
+
+    Parameters
+    ----------
+    collector : StageCollector
+        Collector to which the call is recorded.
+
+    name : str
+        Name of the stage.
+
+    rows : int, optional
+        Number of rows processed by the call (can also be given later with `add_rows`).
+    """
+
+    __slots__ = ('_collector', '_name', '_rows', '_started', '_traced')
+
+    def __init__(self, collector: StageCollector, name: str, rows: Optional[int] = None) -> None:
+        self._collector = collector
+        self._name = name
+        self._rows = rows
+        self._traced = False
+
+    def add_rows(self, rows: int) -> None:
+        """
+        Adds to the number of rows processed by the call.
+
+        Parameters
+        ----------
+        rows : int
+            Number of rows.
+        """
+        self._rows = (self._rows or 0) + int(rows)
+
+    def __enter__(self) -> "Stage":
+        if self._collector.traces_memory() and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # The peak is reset for this stage, so the peak reached so far is kept for the enclosing one.
+            self._collector._memory_frames().append([current, peak, 0])
+            tracemalloc.reset_peak()
+            self._traced = True
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        seconds = time.perf_counter() - self._started
+        peak_bytes = net_bytes = None
+        if self._traced:
+            current, peak = tracemalloc.get_traced_memory()
+            frames = self._collector._memory_frames()
+            start, outer_peak, inner_peak = frames.pop()
+            peak = max(peak, inner_peak)
+            peak_bytes, net_bytes = peak - start, current - start
+            if frames:
+                frames[-1][2] = max(frames[-1][2], peak, outer_peak)
+        self._collector.record(self._name, seconds, self._rows, peak_bytes, net_bytes)
+        return False
+
+
+class _NullStage:
+    """Context manager doing nothing, used when instrumentation is disabled."""
+
+    __slots__ = ()
+
+    def add_rows(self, rows: int) -> None:
+        pass
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+_collector: Optional[StageCollector] = None
+"""Collector of the enabled instrumentation (`None` when disabled)."""
+
+_started_tracing: bool = False
+"""Whether `tracemalloc` has been started by `enable` (and should be stopped by `disable`)."""
+
+
+def enable(trace_memory: bool = False) -> StageCollector:
+    """
+    Enables the instrumentation of the stages of the pipeline, replacing
+    the previous collector (if any).
+
+    Parameters
+    ----------
+    trace_memory : bool, optional
+        Whether the memory allocated by the stages should be measured (default `False`).
+
+    Returns
+    -------
+    StageCollector
+        Collector to which the stages are recorded.
+    """
+    global _collector, _started_tracing
+    disable()
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracing = True
+    _collector = StageCollector(trace_memory)
+    return _collector
+
+
+def disable() -> Optional[StageCollector]:
+    """
+    Disables the instrumentation.
+
+    Returns
+    -------
+    StageCollector, optional
+        Collector to which the stages have been recorded (`None` if the instrumentation was disabled).
+    """
+    global _collector, _started_tracing
+    collector, _collector = _collector, None
+    if _started_tracing:
+        tracemalloc.stop()
+        _started_tracing = False
+    return collector
+
+
+def get_collector() -> Optional[StageCollector]:
+    """
+    Returns
+    -------
+    StageCollector, optional
+        Collector to which the stages are recorded (`None` if the instrumentation is disabled).
+    """
+    return _collector
+
+
+def stage(name: str, rows: Optional[int] = None):
+    """
+    Measures a block of code as a stage of the pipeline:
+
+        with stage('dataset.load_table') as measured:
+            ...
+            measured.add_rows(len(table))
+
+    When the instrumentation is disabled, a shared context manager doing
+    nothing is returned.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage.
+
+    rows : int, optional
+        Number of rows processed by the stage.
+
+    Returns
+    -------
+    Stage
+        Context manager measuring the block.
+    """
+    collector = _collector
+    if collector is None:
+        return _NULL_STAGE
+    return Stage(collector, name, rows)
+
+
+def instrumented(name: str, rows: Optional[Callable[[Any], int]] = None) -> Callable[[Callable], Callable]:
+    """
+    Decorator measuring each call of a function as a stage of the pipeline.
+    When the instrumentation is disabled, the function is called directly.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage.
+
+    rows : Callable[[Any], int], optional
+        Function providing the number of processed rows from the result of the decorated function.
+
+    Returns
+    -------
+    Callable[[Callable], Callable]
+        Decorator.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            collector = _collector
+            if collector is None:
+                return func(*args, **kwargs)
+            with Stage(collector, name) as measured:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    measured.add_rows(rows(result))
+            return result
+        return wrapper
+    return decorator
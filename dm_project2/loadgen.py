@@ -0,0 +1,73 @@
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+from .client import PredictionClient
+from .dataset import MovieLensDataset
+from http.client import HTTPException
+from typing import List, Tuple
+
+
+def run_client(host: str, port: int, pairs: List[Tuple[int, int]], latencies: List[float], errors: List[int]) -> None:
+    """Sends prediction requests for consecutive pairs over one connection, recording their latencies."""
+    client = PredictionClient(host, port)
+    try:
+        for user_id, movie_id in pairs:
+            started = time.perf_counter()
+            try:
+                client.predict(user_id, movie_id)
+            except ValueError:
+                errors.append(1)
+            except (HTTPException, OSError):
+                # The connection is reopened by the next request.
+                client.close()
+                errors.append(1)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        client.close()
+
+
+def main(args: List[str]) -> None:
+
+    parser = argparse.ArgumentParser(description='Generates load on the local prediction server.')
+    parser.add_argument('--dataset', default='ml-latest-small', help='dataset from which user-movie pairs are sampled')
+    parser.add_argument('--host', default='127.0.0.1', help='host of the server (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='port of the server (default 8000)')
+    parser.add_argument('--requests', type=int, default=10000, help='total number of requests (default 10000)')
+    parser.add_argument('--concurrency', type=int, default=32, help='number of concurrent clients (default 32)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the sampling of pairs (default 0)')
+    args = parser.parse_args(args)
+
+    store = MovieLensDataset(args.dataset, columns={'ratings': []}).get_ratings_store()
+    positions = np.random.default_rng(args.seed).integers(len(store), size=args.requests)
+    pairs = list(zip(*(ids.tolist() for ids in store.get_pairs(positions))))
+
+    latencies: List[float] = []
+    errors: List[int] = []
+    threads = [
+        threading.Thread(target=run_client, args=(args.host, args.port, pairs[i::args.concurrency], latencies, errors))
+        for i in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    print(f'Requests:   {len(latencies)} ({len(errors)} errors) in {elapsed : .2f} s')
+    print(f'Throughput: {len(latencies) / elapsed : .1f} requests/s')
+    print(f'Latency:    p50 {np.percentile(latencies_ms, 50) : .2f} ms, p99 {np.percentile(latencies_ms, 99) : .2f} ms')
+
+    client = PredictionClient(args.host, args.port)
+    try:
+        print(f'Server:     {json.dumps(client.stats())}')
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,209 @@
+import numpy as np
+from typing import Dict, List, Sequence, TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+NO_GENRES = '(no genres listed)'
+"""Value of the `genres` column of movies without any genres."""
+
+
+class MovieIndex:
+    """
+    Array-based index of the movies of the Movie Lens dataset: a dense
+    mapping from movie ids to rows of the `movies` table, a vocabulary of
+    genres and the genres of each movie encoded as a `uint32` bitmask,
+    in which the bits correspond to the consecutive genres of the
+    vocabulary (sorted by name, as the columns of
+    `MovieLensDatasetPreprocessor.movies_ohe`).
+
+    The index is built once (splitting each distinct combination of genres
+    only once), after which looking up the genres of movies and one-hot
+    encoding them are plain array operations.
+
+    Parameters
+    ----------
+    arrays : Dict[str, numpy.ndarray]
+        Arrays of the index (as returned by `to_arrays`).
+
+    genres : List[str]
+        Vocabulary of genres, in the order of the bits of the masks.
+    """
+
+    ARRAYS: Tuple[str, ...] = ('movie_ids', 'movie_lookup', 'genre_masks')
+    """Names of the arrays comprising the index."""
+
+    _arrays: Dict[str, np.ndarray]
+    _genres: List[str]
+
+    def __init__(self, arrays: Dict[str, np.ndarray], genres: List[str]) -> None:
+        missing = [name for name in self.ARRAYS if name not in arrays]
+        if missing:
+            raise ValueError(f'Missing arrays of the movie index: {", ".join(missing)}.')
+        self._arrays = {name: arrays[name] for name in self.ARRAYS}
+        self._genres = list(genres)
+
+    @classmethod
+    def from_masks(cls, movie_ids: np.ndarray, genre_masks: np.ndarray, genres: List[str]) -> "MovieIndex":
+        """
+        Creates the index from genre masks of movies.
+
+        Parameters
+        ----------
+        movie_ids : numpy.ndarray
+            Ids of the movies.
+
+        genre_masks : numpy.ndarray
+            Genre mask of each movie.
+
+        genres : List[str]
+            Vocabulary of genres, in the order of the bits of the masks.
+
+        Returns
+        -------
+        MovieIndex
+            Index of the movies.
+        """
+        movie_ids = np.asarray(movie_ids)
+        lookup = np.full(int(movie_ids.max()) + 1 if len(movie_ids) else 0, -1, dtype=np.int32)
+        lookup[movie_ids] = np.arange(len(movie_ids), dtype=np.int32)
+        return cls({'movie_ids': movie_ids, 'movie_lookup': lookup, 'genre_masks': np.asarray(genre_masks, dtype=np.uint32)}, genres)
+
+    @classmethod
+    def from_genres(cls, genres: "pd.Series") -> "MovieIndex":
+        """
+        Builds the index from the `genres` column of the `movies` table.
+
+        Parameters
+        ----------
+        genres : pandas.Series
+            Genres of each movie separated by `|` (strings or categoricals),
+            indexed by `movieId`.
+
+        Returns
+        -------
+        MovieIndex
+            Index of the movies.
+
+        Raises
+        ------
+        ValueError
+            When there are more than 32 distinct genres.
+        """
+        import pandas as pd
+        if isinstance(genres.dtype, pd.CategoricalDtype):
+            genres = genres.cat.remove_unused_categories()
+            codes, combinations = genres.cat.codes.to_numpy(), genres.cat.categories
+        else:
+            codes, combinations = pd.factorize(genres)
+        split = [combination.split('|') for combination in combinations]
+        vocabulary = sorted({genre for combination in split for genre in combination} - {NO_GENRES})
+        if len(vocabulary) > 32:
+            raise ValueError('Movie index supports at most 32 genres.')
+        bits = {genre: 1 << position for position, genre in enumerate(vocabulary)}
+        # The last mask (of missing genres, coded as -1) is empty.
+        combination_masks = np.zeros(len(split) + 1, dtype=np.uint32)
+        combination_masks[:-1] = [sum(bits.get(genre, 0) for genre in set(combination)) for combination in split]
+        return cls.from_masks(genres.index.to_numpy(), combination_masks[codes], vocabulary)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Arrays comprising the index.
+        """
+        return dict(self._arrays)
+
+    def __len__(self) -> int:
+        return len(self._arrays['movie_ids'])
+
+    def __contains__(self, movie_id: int) -> bool:
+        lookup = self._arrays['movie_lookup']
+        return 0 <= movie_id < len(lookup) and lookup[movie_id] >= 0
+
+    def get_genres(self) -> List[str]:
+        """
+        Returns
+        -------
+        List[str]
+            Vocabulary of genres, in the order of the bits of the masks.
+        """
+        return list(self._genres)
+
+    def get_movie_ids(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Ids of the movies, in the order of the rows of the `movies` table.
+        """
+        return self._arrays['movie_ids']
+
+    def get_genre_masks(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Genre mask of each movie, in the order of the rows of the `movies` table.
+        """
+        return self._arrays['genre_masks']
+
+    def positions(self, movie_ids: Sequence[int]) -> np.ndarray:
+        """
+        Maps movie ids to rows of the `movies` table.
+
+        Parameters
+        ----------
+        movie_ids : Sequence[int]
+            Ids of the movies.
+
+        Returns
+        -------
+        numpy.ndarray
+            Row of each of the movies (-1 for unknown movies).
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64).reshape(-1)
+        lookup = self._arrays['movie_lookup']
+        known = (movie_ids >= 0) & (movie_ids < len(lookup))
+        positions = np.full(len(movie_ids), -1, dtype=np.int64)
+        positions[known] = lookup[movie_ids[known]]
+        return positions
+
+    def masks(self, movie_ids: Sequence[int]) -> np.ndarray:
+        """
+        Provides genre masks of movies.
+
+        Parameters
+        ----------
+        movie_ids : Sequence[int]
+            Ids of the movies.
+
+        Returns
+        -------
+        numpy.ndarray
+            Genre mask of each of the movies (0 for unknown movies).
+        """
+        positions = self.positions(movie_ids)
+        masks = np.zeros(len(positions), dtype=np.uint32)
+        masks[positions >= 0] = self._arrays['genre_masks'][positions[positions >= 0]]
+        return masks
+
+    def one_hot(self) -> "pd.DataFrame":
+        """
+        One-hot encodes genres of the movies.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Frame indexed by `movieId` with an integer column for each genre of the vocabulary.
+        """
+        import pandas as pd
+        masks = self._arrays['genre_masks']
+        bits = (masks[:, None] >> np.arange(len(self._genres), dtype=np.uint32)) & 1
+        return pd.DataFrame(
+            bits.astype(np.int64),
+            index=pd.Index(self._arrays['movie_ids'], name='movieId'),
+            columns=pd.Index(self._genres, dtype=object)
+        )
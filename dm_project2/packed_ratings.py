@@ -0,0 +1,282 @@
+import numpy as np
+from .ratings_store import RatingsStore, merge_user_rows
+from typing import Dict, List, Optional, TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class PackedRatings:
+    """
+    Compact encoding of the preprocessed ratings: each rating is a single
+    `uint32` bitmask, in which the lower bits mark the genres of the rated
+    movie and one of the higher bits marks the rating. Rows are grouped by
+    user (ordered by user id, then by movie id) with offsets of each user's
+    slice, so the ratings of a user are retrieved without scanning the table.
+
+    The bits correspond to the consecutive columns (see `get_columns`) of
+    the one-hot encoded frame returned by
+    `MovieLensDatasetPreprocessor.preprocess_ratings`, which can be
+    materialized from this encoding on demand (see `to_frame`).
+
+    Single ratings can be added, changed or removed (see `update`); the
+    rows of the affected users are kept aside and merged into the arrays
+    only when the whole encoding is accessed. Rows of an updated user may
+    be ordered differently than in the frame of `preprocess_ratings`.
+
+    Parameters
+    ----------
+    arrays : Dict[str, numpy.ndarray]
+        Arrays of the encoding (as returned by `to_arrays`).
+
+    genres : List[str]
+        Names of the genres, in the order of the bits of the masks.
+    """
+
+    ARRAYS: Tuple[str, ...] = ('user_ids', 'user_lookup', 'user_offsets', 'masks', 'rating_values')
+    """Names of the arrays comprising the encoding."""
+
+    _arrays: Dict[str, np.ndarray]
+    _genres: List[str]
+    _overrides: Dict[int, np.ndarray]
+
+    def __init__(self, arrays: Dict[str, np.ndarray], genres: List[str]) -> None:
+        missing = [name for name in self.ARRAYS if name not in arrays]
+        if missing:
+            raise ValueError(f'Missing arrays of the packed ratings: {", ".join(missing)}.')
+        self._arrays = {name: arrays[name] for name in self.ARRAYS}
+        self._genres = list(genres)
+        self._overrides = {}
+
+    @classmethod
+    def from_store(cls, store: RatingsStore, movie_masks: np.ndarray, genres: List[str]) -> "PackedRatings":
+        """
+        Encodes the ratings of a store.
+
+        Parameters
+        ----------
+        store : RatingsStore
+            Store of the ratings.
+
+        movie_masks : numpy.ndarray
+            Genre mask of each movie of the store (in the order of its dense indices).
+
+        genres : List[str]
+            Names of the genres, in the order of the bits of genre masks.
+
+        Returns
+        -------
+        PackedRatings
+            Encoded ratings.
+
+        Raises
+        ------
+        ValueError
+            When the genres and the distinct ratings do not fit into 32 bits.
+        """
+        arrays = store.to_arrays()
+        rating_values, rating_codes = np.unique(arrays['ratings'], return_inverse=True)
+        if len(genres) + len(rating_values) > 32:
+            raise ValueError('Packed ratings support at most 32 genres and distinct ratings in total.')
+        rating_bits = np.left_shift(np.uint32(1), (len(genres) + rating_codes).astype(np.uint32))
+        return cls({
+            'user_ids': arrays['user_ids'],
+            'user_lookup': arrays['user_lookup'],
+            'user_offsets': arrays['user_offsets'],
+            'masks': movie_masks[arrays['movie_index']].astype(np.uint32) | rating_bits,
+            'rating_values': rating_values.astype(np.float32)
+        }, genres)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Arrays comprising the encoding.
+        """
+        self._merge_overrides()
+        return dict(self._arrays)
+
+    def __len__(self) -> int:
+        self._merge_overrides()
+        return len(self._arrays['masks'])
+
+    def get_nbytes(self) -> int:
+        """
+        Returns
+        -------
+        int
+            Total size of the arrays of the encoding in bytes.
+        """
+        self._merge_overrides()
+        return sum(array.nbytes for array in self._arrays.values())
+
+    def get_genres(self) -> List[str]:
+        """
+        Returns
+        -------
+        List[str]
+            Names of the genres, in the order of the lower bits of the masks.
+        """
+        return list(self._genres)
+
+    def get_columns(self) -> List[str]:
+        """
+        Returns
+        -------
+        List[str]
+            Names of the columns of the one-hot encoded frame (genres,
+            then ratings), in the order of the bits of the masks.
+        """
+        return self._genres + [f'rating_{value}' for value in self._arrays['rating_values']]
+
+    def get_rating_values(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Distinct rating values, in the order of the higher bits of the masks.
+        """
+        return self._arrays['rating_values']
+
+    def get_masks(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Bitmask of each rating, grouped by user.
+        """
+        self._merge_overrides()
+        return self._arrays['masks']
+
+    def get_user_offsets(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Offsets of the slices of consecutive users.
+        """
+        self._merge_overrides()
+        return self._arrays['user_offsets']
+
+    def get_user_masks(self, user_id: int) -> np.ndarray:
+        """
+        Provides the bitmasks of the ratings given by a user.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user in the Movie Lens dataset.
+
+        Returns
+        -------
+        numpy.ndarray
+            Bitmasks of the user's ratings (empty if the user has no ratings).
+        """
+        if user_id in self._overrides:
+            return self._overrides[user_id]
+        lookup = self._arrays['user_lookup']
+        if not 0 <= user_id < len(lookup) or lookup[user_id] < 0:
+            return self._arrays['masks'][:0]
+        start, end = self._arrays['user_offsets'][lookup[user_id]:lookup[user_id] + 2]
+        return self._arrays['masks'][start:end]
+
+    def to_frame(self) -> "pd.DataFrame":
+        """
+        Materializes the one-hot encoded frame of all ratings.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Boolean frame indexed by `userId`, with a column for each bit.
+        """
+        self._merge_overrides()
+        user_index = np.repeat(self._arrays['user_ids'], np.diff(self._arrays['user_offsets']))
+        return self._frame(self._arrays['masks'], user_index)
+
+    def user_frame(self, user_id: int) -> "pd.DataFrame":
+        """
+        Materializes the one-hot encoded frame of the ratings given by a user.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user in the Movie Lens dataset.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Boolean frame indexed by `userId`, with a column for each bit.
+        """
+        masks = self.get_user_masks(user_id)
+        return self._frame(masks, np.full(len(masks), user_id, dtype=self._arrays['user_ids'].dtype))
+
+    def update(self, user_id: int, genre_mask: int, previous: Optional[float], rating: Optional[float]) -> None:
+        """
+        Patches the encoding after a user's rating of a movie has been
+        added, changed or removed.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user.
+
+        genre_mask : int
+            Genre mask of the movie.
+
+        previous : float, optional
+            Previous rating (`None` if the rating has been added).
+
+        rating : float, optional
+            New rating (`None` if the rating has been removed).
+        """
+        # Bits of the ratings are found first, as a new distinct rating changes the masks.
+        rating_bit = self._rating_bit(rating) if rating is not None else None
+        previous_bit = self._rating_bit(previous) if previous is not None else None
+        masks = self.get_user_masks(user_id)
+        if previous_bit is not None:
+            removed = np.flatnonzero(masks == np.uint32(genre_mask | previous_bit))
+            masks = np.delete(masks, removed[:1])
+        if rating_bit is not None:
+            masks = np.append(masks, np.uint32(genre_mask | rating_bit))
+        self._overrides[user_id] = masks.astype(np.uint32)
+
+    def _rating_bit(self, rating: float) -> int:
+        """
+        Provides the bit of a rating. A new distinct rating is assigned
+        a bit in the order of ratings, shifting the bits of greater ratings.
+        """
+        rating_values = self._arrays['rating_values']
+        code = int(np.searchsorted(rating_values, rating))
+        if code == len(rating_values) or rating_values[code] != rating:
+            if len(self._genres) + len(rating_values) >= 32:
+                raise ValueError('Packed ratings support at most 32 genres and distinct ratings in total.')
+            position = np.uint32(len(self._genres) + code)
+            self._arrays['masks'] = self._insert_bit(self._arrays['masks'], position)
+            self._overrides = {user_id: self._insert_bit(masks, position) for user_id, masks in self._overrides.items()}
+            self._arrays['rating_values'] = np.insert(rating_values, code, rating).astype(np.float32)
+        return 1 << (len(self._genres) + code)
+
+    @staticmethod
+    def _insert_bit(masks: np.ndarray, position: np.uint32) -> np.ndarray:
+        """Inserts an unset bit at a position of bitmasks (shifting the higher bits)."""
+        low = masks & ((np.uint32(1) << position) - np.uint32(1))
+        return low | ((masks ^ low) << np.uint32(1))
+
+    def _merge_overrides(self) -> None:
+        """Merges the rows of the updated users into the arrays of the encoding."""
+        if not self._overrides:
+            return
+        user_ids, user_lookup, user_offsets, rows = merge_user_rows(
+            self._arrays['user_ids'], self._arrays['user_offsets'], {'masks': self._arrays['masks']},
+            {user_id: {'masks': masks} for user_id, masks in self._overrides.items()}
+        )
+        self._arrays.update(user_ids=user_ids, user_lookup=user_lookup, user_offsets=user_offsets, masks=rows['masks'])
+        self._overrides = {}
+
+    def _frame(self, masks: np.ndarray, user_index: np.ndarray) -> "pd.DataFrame":
+        """Unpacks bitmasks into a boolean frame."""
+        import pandas as pd
+        columns = self.get_columns()
+        bits = (masks[:, None] >> np.arange(len(columns), dtype=np.uint32)) & 1
+        return pd.DataFrame(bits.astype(bool), index=pd.Index(user_index, name='userId'), columns=columns)
@@ -1,66 +1,821 @@
+import os
+import abc
+import csv
 import sys
+import json
+import argparse
 import warnings
-import pandas as pd
-from dataset import MovieLensDataset
-from preprocessing import MovieLensDatasetPreprocessor
-from mlxtend.frequent_patterns import apriori, association_rules
-from typing import List
+import numpy as np
+from .exceptions import InvalidMovieException, InvalidUserException
+from .instrumentation import instrumented, stage
+from .movie_index import MovieIndex
+from .packed_ratings import PackedRatings
+from .prediction_table import PredictionTable
+from .rating_cube import RULE_METRICS, RatingCube
+from .rating_stats import RatingStatistics
+from .rule_cache import RuleCache
+from .rule_table import RuleTable
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple, Union
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from .preprocessing import MovieLensDatasetPreprocessor
+
+
+MODEL_FORMAT_VERSION = 1
+"""Version of the layout of saved predictors; artifacts of other versions cannot be loaded."""
+
+
+class MiningEngine(abc.ABC):
+    """
+    Interface of engines mining association rules which predict
+    the rating, i.e. rules whose consequent is a single `rating_*` item.
+    """
+
+    @abc.abstractmethod
+    def mine(self, transactions: "pd.DataFrame", min_support: float, min_threshold: float) -> "pd.DataFrame":
+        """
+        Mines association rules from a set of transactions.
+
+        Parameters
+        ----------
+        transactions : pandas.DataFrame
+            One-hot encoded transactions (as in the preprocessed ratings).
+
+        min_support : float
+            Minimum support of frequent itemsets (apriori algorithm).
+
+        min_threshold : float
+            Minimum support of the generated association rules.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Rules with columns `antecedents`, `consequents` (frozensets
+            of item names) and one column for each of `RULE_METRICS`.
+        """
+
+    def mine_table(
+        self,
+        masks: np.ndarray,
+        genres: List[str],
+        rating_values: np.ndarray,
+        min_support: float,
+        min_threshold: float
+    ) -> RuleTable:
+        """
+        Mines association rules from a set of packed transactions and
+        compiles them into a table (see `RuleTable`).
+
+        By default, the transactions are unpacked into a one-hot encoded
+        frame, mined with `mine` and the resulting rules are compiled.
+
+        Parameters
+        ----------
+        masks : numpy.ndarray
+            Bitmask of each transaction (see `PackedRatings`): genres in the
+            lower bits, followed by a bit for each of the rating values.
+
+        genres : List[str]
+            Names of the genres, in the order of the lower bits of the masks.
+
+        rating_values : numpy.ndarray
+            Distinct rating values, in the order of the higher bits of the masks.
+
+        min_support : float
+            Minimum support of frequent itemsets (apriori algorithm).
+
+        min_threshold : float
+            Minimum support of the generated association rules.
+
+        Returns
+        -------
+        RuleTable
+            Rules whose consequent is a single rating.
+        """
+        import pandas as pd
+        items = list(genres) + [f'rating_{value}' for value in rating_values]
+        bits = (masks[:, None] >> np.arange(len(items), dtype=np.uint32)) & 1
+        transactions = pd.DataFrame(bits.astype(bool), columns=items)
+        return RuleTable.from_frame(self.mine(transactions, min_support, min_threshold), list(genres))
+
+    @staticmethod
+    def _empty_rules() -> "pd.DataFrame":
+        """Creates a data frame of rules containing no rules."""
+        import pandas as pd
+        return pd.DataFrame(columns=['antecedents', 'consequents', *RULE_METRICS])
+
+
+class MlxtendEngine(MiningEngine):
+    """
+    Mining engine based on the generic apriori algorithm and rule
+    generation from mlxtend. It serves as the reference implementation.
+    """
+
+    def mine(self, transactions: "pd.DataFrame", min_support: float, min_threshold: float) -> "pd.DataFrame":
+        # Imported on first use, as mlxtend (with scikit-learn and scipy) takes long to import.
+        from mlxtend.frequent_patterns import apriori, association_rules
+        with stage('mlxtend.apriori', len(transactions)):
+            frequent_itemsets = apriori(transactions, min_support=min_support, use_colnames=True)
+        if frequent_itemsets.empty:
+            return self._empty_rules()
+        with stage('mlxtend.association_rules', len(frequent_itemsets)):
+            rules = association_rules(frequent_itemsets, metric="support", min_threshold=min_threshold)
+        with stage('mlxtend.filter_rules', len(rules)):
+            # Each distinct consequent is checked once, rather than each rule.
+            consequents = rules['consequents'].unique()
+            rating = {x: len(x) == 1 and 'rating' in next(iter(x)) for x in consequents}
+            rules = rules[rules['consequents'].map(rating).astype(bool)]
+            return rules[['antecedents', 'consequents', *RULE_METRICS]].reset_index(drop=True)
+
+
+class BitsetEngine(MiningEngine):
+    """
+    Mining engine specialised for the small item universe of the
+    preprocessed ratings (genres and ratings, at most 32 items).
+
+    Each transaction is packed into a 32-bit mask of its items and
+    itemsets are represented by such masks as well, so the supports
+    of all candidate itemsets of a level of the apriori algorithm are
+    counted at once with bitwise operations over the distinct masks.
+    Only rules with a single `rating_*` item as the consequent are
+    generated. The result is the same as that of `MlxtendEngine`.
+    Packed ratings are mined directly into a `RuleTable` (see
+    `mine_table`), without materializing frames or sets of item names.
+    """
+
+    def mine(self, transactions: "pd.DataFrame", min_support: float, min_threshold: float) -> "pd.DataFrame":
+        self._check_support(min_support)
+        items = list(transactions.columns)
+        if len(items) > 32:
+            raise ValueError('BitsetEngine supports at most 32 items.')
+        n_rows = len(transactions)
+        if n_rows == 0 or not items:
+            return self._empty_rules()
+
+        bits = np.left_shift(np.uint32(1), np.arange(len(items), dtype=np.uint32))
+        masks = np.bitwise_or.reduce(np.where(transactions.to_numpy(dtype=bool), bits, np.uint32(0)), axis=1)
+        rating_bits = np.array([bit for item, bit in zip(items, bits) if 'rating' in item], dtype=np.uint32)
+        antecedents, consequents, metrics = self._mine_masks(masks, bits, rating_bits, min_support, min_threshold)
+
+        import pandas as pd
+        names: Dict[int, frozenset] = {}
+        for mask in np.concatenate([antecedents, rating_bits]).tolist():
+            if mask not in names:
+                names[mask] = frozenset(item for item, bit in zip(items, bits.tolist()) if mask & bit)
+        return pd.DataFrame({
+            'antecedents': [names[mask] for mask in antecedents.tolist()],
+            'consequents': [names[mask] for mask in consequents.tolist()],
+            **metrics
+        }, columns=['antecedents', 'consequents', *RULE_METRICS])
+
+    def mine_table(
+        self,
+        masks: np.ndarray,
+        genres: List[str],
+        rating_values: np.ndarray,
+        min_support: float,
+        min_threshold: float
+    ) -> RuleTable:
+        # The packed transactions are mined as they are, and the masks of the
+        # mined itemsets are already the genre masks of the antecedents.
+        self._check_support(min_support)
+        n_genres = len(genres)
+        if n_genres + len(rating_values) > 32:
+            raise ValueError('BitsetEngine supports at most 32 items.')
+        if len(masks) == 0:
+            return RuleTable.empty()
+
+        bits = np.left_shift(np.uint32(1), np.arange(n_genres + len(rating_values), dtype=np.uint32))
+        antecedents, consequents, metrics = self._mine_masks(masks, bits, bits[n_genres:], min_support, min_threshold)
+        # Rules with antecedents other than genres never apply to any movie.
+        kept = (antecedents >> np.uint32(n_genres)) == 0
+        arrays = {
+            'antecedents': antecedents[kept],
+            'consequents': np.asarray(rating_values, dtype=np.float32)[np.searchsorted(bits[n_genres:], consequents[kept])]
+        }
+        arrays.update({metric: values[kept] for metric, values in metrics.items()})
+        return RuleTable(arrays)
+
+    @staticmethod
+    def _check_support(min_support: float) -> None:
+        """Validates the minimum support (in the same way as mlxtend)."""
+        if min_support <= 0.0:
+            raise ValueError(f'`min_support` must be a positive number within the interval `(0, 1]`. Got {min_support}.')
+
+    def _mine_masks(
+        self,
+        masks: np.ndarray,
+        bits: np.ndarray,
+        rating_bits: np.ndarray,
+        min_support: float,
+        min_threshold: float
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Mines rules with a single rating item as the consequent from
+        transactions packed into masks; returns the masks of the antecedents
+        and the consequents of the rules and the values of `RULE_METRICS`.
+        """
+        n_rows = len(masks)
+        with stage('bitset.frequent_itemsets', n_rows):
+            distinct, counts = np.unique(masks, return_counts=True)
+            itemsets, supports = self._frequent_itemsets(distinct, counts, n_rows, bits, min_support)
+        with stage('bitset.rules', len(itemsets)):
+            return self._rating_rules(itemsets, supports, rating_bits, min_threshold)
+
+    @staticmethod
+    def _count(distinct: np.ndarray, counts: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Counts transactions containing each of the candidate itemsets."""
+        contained = (distinct[None, :] & candidates[:, None]) == candidates[:, None]
+        return contained @ counts
+
+    def _frequent_itemsets(
+        self,
+        distinct: np.ndarray,
+        counts: np.ndarray,
+        n_rows: int,
+        bits: np.ndarray,
+        min_support: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Finds all frequent itemsets (as masks) and their supports with the apriori algorithm."""
+        support = self._count(distinct, counts, bits) / n_rows
+        singles = bits[support >= min_support]
+        level, level_support = singles, support[support >= min_support]
+        all_itemsets, all_supports = [level], [level_support]
+        while len(level) > 1:
+            # Extend each itemset with frequent items above its highest item...
+            extend = singles[None, :] > level[:, None]
+            candidates = (level[:, None] | singles[None, :])[extend]
+            # ...and keep the candidates whose all subsets are frequent.
+            known = np.sort(level)
+            subsets = candidates[:, None] & ~singles[None, :]
+            position = np.minimum(np.searchsorted(known, subsets), len(known) - 1)
+            frequent = (known[position] == subsets) | ((candidates[:, None] & singles[None, :]) == 0)
+            candidates = candidates[frequent.all(axis=1)]
+            if len(candidates) == 0:
+                break
+            support = self._count(distinct, counts, candidates) / n_rows
+            level, level_support = candidates[support >= min_support], support[support >= min_support]
+            all_itemsets.append(level)
+            all_supports.append(level_support)
+        return np.concatenate(all_itemsets), np.concatenate(all_supports)
+
+    @staticmethod
+    def _rating_rules(
+        itemsets: np.ndarray,
+        supports: np.ndarray,
+        rating_bits: np.ndarray,
+        min_threshold: float
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """Generates rules with a single rating item as the consequent from the frequent itemsets."""
+        order = np.argsort(itemsets)
+        itemsets, supports = itemsets[order], supports[order]
+        rating_bits = rating_bits[np.isin(rating_bits, itemsets)]
+
+        # Each frequent itemset containing a rating item (and something
+        # else) gives the rule: the rest of the itemset -> the rating item.
+        selected = ((itemsets[:, None] & rating_bits[None, :]) != 0) & (itemsets[:, None] != rating_bits[None, :])
+        selected &= (supports >= min_threshold)[:, None]
+        rows, columns = np.nonzero(selected)
+        consequents = rating_bits[columns]
+        antecedents = itemsets[rows] & ~consequents
+        sAC = supports[rows]
+        sA = supports[np.searchsorted(itemsets, antecedents)]
+        sC = supports[np.searchsorted(itemsets, consequents)]
+        return antecedents, consequents, {
+            'antecedent support': sA,
+            'consequent support': sC,
+            'support': sAC,
+            'confidence': sAC / sA,
+            'lift': sAC / sA / sC
+        }
 
 
 class Predictor:
     """
     Rating predictor for the Movie Lens dataset
     based on association rules.
+
+    Rules mined for a user are kept in a bounded LRU cache (see
+    `RuleCache`), so repeated predictions for the same user and
+    thresholds do not mine them again.
+
+    The predictor follows changes of the ratings in the dataset it was
+    fitted to (see `MovieLensDataset.add_rating` and
+    `MovieLensDataset.delete_rating`): the fitted state is patched
+    incrementally for the affected user and movie, without refitting,
+    and cached rules of the user are invalidated.
+
+    Parameters
+    ----------
+    rule_cache_bytes : int, optional
+        Memory budget of the cache of mined rules in bytes
+        (default 64 MiB; 0 disables the cache).
+
+    engine : MiningEngine, optional
+        Engine used for mining association rules (`BitsetEngine` by
+        default; `MlxtendEngine` is the reference implementation).
+
+    use_cube : bool, optional
+        Whether the rules should be derived from the counting cube of the
+        ratings (see `RatingCube`) built once when fitting, instead of
+        being mined for each user (default False). Predictions are the same.
     """
 
-    _preprocessor: MovieLensDatasetPreprocessor
-    _ratings_preprocessed: pd.DataFrame
+    _preprocessor: "MovieLensDatasetPreprocessor"
+    _ratings_packed: PackedRatings
+    _statistics: RatingStatistics
+    _movie_index: MovieIndex
+    _rule_cache: RuleCache
+    _engine: MiningEngine
+    _use_cube: bool
+    _cube: Optional[RatingCube]
+    _catalog: Optional[Dict[str, np.ndarray]]
+    _table: Optional[PredictionTable]
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        rule_cache_bytes: int = 64 * 2 ** 20,
+        engine: Optional[MiningEngine] = None,
+        use_cube: bool = False
+    ) -> None:
         self._preprocessor = None
+        self._statistics = None
+        self._rule_cache = RuleCache(rule_cache_bytes)
+        self._engine = engine if engine is not None else BitsetEngine()
+        self._use_cube = use_cube
+        self._cube = None
+        self._catalog = None
+        self._table = None
+        self._movie_index = MovieIndex.from_masks(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint32), [])
 
-    def fit(self, preprocessor: MovieLensDatasetPreprocessor) -> None:
+    @instrumented('predict.fit')
+    def fit(self, preprocessor: "MovieLensDatasetPreprocessor") -> None:
         """Fits the predictor to the preprocessed data."""
+        from .preprocessing import MovieLensDatasetPreprocessor
         if not isinstance(preprocessor, MovieLensDatasetPreprocessor):
             raise ValueError(f'Parameter of fit method should be of type MovieLensDatasetPreprocessor.')
+        if self._preprocessor is not None:
+            self._preprocessor.get_dataset().remove_ratings_listener(self._on_rating_changed)
         self._preprocessor = preprocessor
-        self._ratings_preprocessed = preprocessor.preprocess_ratings()
+        self._rule_cache.clear()
+        preprocessor.get_dataset().add_ratings_listener(self._on_rating_changed)
+        self._ratings_packed = preprocessor.preprocess_ratings_packed()
+        self._statistics = RatingStatistics.from_store(preprocessor.get_dataset().get_ratings_store())
+        self._cube = preprocessor.rating_cube() if self._use_cube else None
+        self._movie_index = preprocessor.get_dataset().get_movie_index()
+        self._catalog = None
+        self._table = None
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Provides the fitted state of the predictor as plain arrays, e.g. to
+        be written to disk and memory-mapped by other processes
+        (see `from_arrays`).
+
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Arrays comprising the fitted state, keyed by names.
+        """
+        arrays = {
+            'genres': np.array(self._ratings_packed.get_genres(), dtype=np.str_),
+            'movie_ids': self._movie_index.get_movie_ids(),
+            'movie_masks': self._movie_index.get_genre_masks()
+        }
+        arrays.update({f'packed_{name}': array for name, array in self._ratings_packed.to_arrays().items()})
+        arrays.update({f'statistics_{name}': array for name, array in self._statistics.to_arrays().items()})
+        if self._cube is not None:
+            arrays.update({f'cube_{name}': array for name, array in self._cube.to_arrays().items()})
+        if self._table is not None:
+            self._refresh_table()
+            arrays.update({f'table_{name}': array for name, array in self._table.to_arrays().items()})
+        return arrays
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Dict[str, np.ndarray],
+        rule_cache_bytes: int = 64 * 2 ** 20,
+        engine: Optional[MiningEngine] = None
+    ) -> "Predictor":
+        """
+        Creates a fitted predictor from its state (as returned by
+        `to_arrays`). The predictor is not attached to any dataset, so it
+        is not notified about changes of the ratings.
+
+        Parameters
+        ----------
+        arrays : Dict[str, numpy.ndarray]
+            Arrays comprising the fitted state.
+
+        rule_cache_bytes : int, optional
+            Memory budget of the cache of mined rules in bytes.
+
+        engine : MiningEngine, optional
+            Engine used for mining association rules.
+
+        Returns
+        -------
+        Predictor
+            Fitted predictor.
+        """
+        def prefixed(prefix: str) -> Dict[str, np.ndarray]:
+            return {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+
+        genres = [str(genre) for genre in arrays['genres']]
+        cube_arrays = prefixed('cube_')
+        predictor = cls(rule_cache_bytes, engine, use_cube=bool(cube_arrays))
+        predictor._ratings_packed = PackedRatings(prefixed('packed_'), genres)
+        predictor._statistics = RatingStatistics(prefixed('statistics_'))
+        predictor._cube = RatingCube(cube_arrays, genres) if cube_arrays else None
+        predictor._movie_index = MovieIndex.from_masks(arrays['movie_ids'], arrays['movie_masks'], genres)
+        table_arrays = prefixed('table_')
+        predictor._table = PredictionTable(table_arrays) if table_arrays else None
+        return predictor
+
+    def save(self, path: str) -> None:
+        """
+        Saves the fitted predictor as a versioned artifact: a directory
+        containing one `.npy` file per array of the fitted state (see
+        `to_arrays`) and a `manifest.json` file describing them. The
+        manifest is written last, so that a partially written artifact
+        is never valid.
+
+        Parameters
+        ----------
+        path : str
+            Directory in which the artifact should be stored.
+        """
+        arrays = self.to_arrays()
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, 'manifest.json')
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), np.asarray(array))
+        manifest = {
+            'format_version': MODEL_FORMAT_VERSION,
+            'arrays': {name: {'dtype': array.dtype.str, 'shape': list(array.shape)} for name, array in arrays.items()}
+        }
+        with open(f'{manifest_path}.tmp', 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(f'{manifest_path}.tmp', manifest_path)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        mmap: bool = True,
+        rule_cache_bytes: int = 64 * 2 ** 20,
+        engine: Optional[MiningEngine] = None
+    ) -> "Predictor":
+        """
+        Loads a predictor saved with `save`.
+
+        Parameters
+        ----------
+        path : str
+            Directory in which the artifact is stored.
+
+        mmap : bool, optional
+            Whether the arrays should be memory-mapped (read-only, shared
+            between processes through the OS page cache) instead of being
+            read into memory (default `True`).
+
+        rule_cache_bytes : int, optional
+            Memory budget of the cache of mined rules in bytes.
+
+        engine : MiningEngine, optional
+            Engine used for mining association rules.
+
+        Returns
+        -------
+        Predictor
+            Fitted predictor (not attached to any dataset).
+
+        Raises
+        ------
+        ValueError
+            When the artifact is missing, incomplete or of another format version.
+        """
+        try:
+            with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+        except (OSError, ValueError) as error:
+            raise ValueError(f'There is no valid predictor saved in {path}.') from error
+        if manifest.get('format_version') != MODEL_FORMAT_VERSION:
+            raise ValueError(f'Unsupported format version of the saved predictor: {manifest.get("format_version")}.')
+        arrays = {}
+        for name, description in manifest['arrays'].items():
+            array = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+            if array.dtype.str != description['dtype'] or list(array.shape) != description['shape']:
+                raise ValueError(f'Array {name} of the saved predictor does not match its manifest.')
+            arrays[name] = array
+        return cls.from_arrays(arrays, rule_cache_bytes, engine)
+
+    def get_statistics(self) -> RatingStatistics:
+        """
+        Provides statistics of the ratings the predictor was fitted to.
+
+        Returns
+        -------
+        RatingStatistics
+            Per-user, per-movie and global rating statistics.
+        """
+        return self._statistics
+
+    def get_rule_cache(self) -> RuleCache:
+        """
+        Provides the cache of mined association rules (e.g. to inspect
+        its hit and miss counters).
+
+        Returns
+        -------
+        RuleCache
+            Cache of mined rules.
+        """
+        return self._rule_cache
+
+    def get_cube(self) -> Optional[RatingCube]:
+        """
+        Provides the counting cube of the ratings the predictor was fitted to.
+
+        Returns
+        -------
+        RatingCube, optional
+            Counting cube, or `None` if the predictor does not use it.
+        """
+        return self._cube
+
+    def get_prediction_table(self) -> Optional[PredictionTable]:
+        """
+        Provides the materialized predictions of the active users (see `materialize`).
+
+        Returns
+        -------
+        PredictionTable, optional
+            Table of predictions, or `None` if no predictions are materialized.
+        """
+        return self._table
+
+    @instrumented('predict.materialize', rows=len)
+    def materialize(
+        self,
+        user_ids: Optional[Sequence[int]] = None,
+        n_users: int = 1000,
+        threshold_itemsets: float = 0.01,
+        threshold_rules: float = 0.01,
+        weighted_mean_metric: str = 'confidence'
+    ) -> PredictionTable:
+        """
+        Materializes predictions based on association rules of the given
+        (or the most active) users for every distinct combination of genres
+        of the movies (see `PredictionTable`), replacing the previous table.
+
+        Predictions for pairs of these users with the same thresholds and
+        metric are then looked up in the table instead of being computed
+        from the rules, which leaves only blending them with the averages.
+        Rows of users whose ratings change are recomputed on the next
+        prediction. The predictions are the same as without the table
+        (up to rounding errors).
+
+        Parameters
+        ----------
+        user_ids : Sequence[int], optional
+            Ids of the users (by default, the `n_users` users with the most ratings).
+
+        n_users : int, optional
+            Number of the most active users, if the users are not given (default 1000).
+
+        threshold_itemsets : float
+            Minimum support used in the apriori algorithm.
+
+        threshold_rules : float
+            Threshold used when generating association rules.
+
+        weighted_mean_metric : str
+            Association rule metric used as weights (see `predict`).
+
+        Returns
+        -------
+        PredictionTable
+            Table of the predictions.
+        """
+        self._check_parameters(threshold_itemsets, threshold_rules, weighted_mean_metric, 0.5, 0.5)
+        if user_ids is None:
+            arrays = self._statistics.to_arrays()
+            candidates = np.flatnonzero(arrays['user_lookup'] >= 0)
+            counts = self._statistics.user_count(candidates)
+            user_ids = candidates[np.lexsort((candidates, -counts))[:n_users]]
+        self._table = PredictionTable.create(
+            user_ids, self._movie_index.get_genre_masks(), threshold_itemsets, threshold_rules, weighted_mean_metric
+        )
+        self._refresh_table()
+        return self._table
+
+    def drop_prediction_table(self) -> None:
+        """Drops the materialized predictions (see `materialize`)."""
+        self._table = None
+
+    def _refresh_table(self) -> None:
+        """Recomputes the stale rows of the table of materialized predictions."""
+        warnings.filterwarnings('ignore')
+        threshold_itemsets, threshold_rules, weighted_mean_metric = self._table.get_parameters()
+        for user_id in self._table.get_stale_users():
+            self._table.set_row(user_id, self._rules_predictions(
+                user_id, self._table.get_signatures(), threshold_itemsets, threshold_rules, weighted_mean_metric
+            ))
+
+    def _on_rating_changed(self, user_id: int, movie_id: int, previous: Optional[float], rating: Optional[float]) -> None:
+        """
+        Incrementally updates the fitted state after a rating of the dataset
+        has been added, changed or removed: patches the preprocessed
+        ratings, the statistics and the counting cube (if used) only for
+        the affected user and movie, and invalidates rules cached for the user.
+        """
+        user_id, movie_id = int(user_id), int(movie_id)
+        genre_mask = int(self._get_genre_masks(np.array([movie_id], dtype=np.int64))[0])
+        self._ratings_packed.update(user_id, genre_mask, previous, rating)
+        self._statistics.update(user_id, movie_id, previous, rating)
+        if self._cube is not None:
+            self._cube.update(user_id, genre_mask, previous, rating)
+        self._rule_cache.invalidate(user_id)
+        self._catalog = None
+        if self._table is not None:
+            self._table.invalidate(user_id)
     
-    def _get_avg_movie_rating(self, movie_id: int) -> float:
+    def _get_avg_movie_ratings(self, movie_ids: np.ndarray) -> np.ndarray:
         """
-        Computes the average rating of the movie.
+        Computes the average ratings of the movies.
 
         Parameters
         ----------
-        movie_id : int
-            Id of the movie in the Movie Lens dataset.
+        movie_ids : numpy.ndarray
+            Ids of the movies in the Movie Lens dataset.
         
         Returns
         -------
-        float
-            Computed average rating.
+        numpy.ndarray
+            Computed average ratings (3.5 for movies without ratings).
         """
-        ratings = self._preprocessor.get_dataset().get_ratings()
-        movie_avg = ratings[ratings.index.get_level_values('movieId') == movie_id]['rating'].mean()
-        return movie_avg if not pd.isna(movie_avg) else 3.5
+        movie_avg = self._statistics.movie_mean(movie_ids)
+        return np.where(np.isnan(movie_avg), 3.5, movie_avg)
     
-    def _get_avg_user_rating(self, user_id: int) -> float:
+    def _get_avg_user_ratings(self, user_ids: np.ndarray) -> np.ndarray:
+        """
+        Computes the average ratings given by specific users.
+
+        Parameters
+        ----------
+        user_ids : numpy.ndarray
+            Ids of the users in the Movie Lens dataset.
+        
+        Returns
+        -------
+        numpy.ndarray
+            Computed average ratings.
+        """
+        return self._statistics.user_mean(user_ids)
+
+    def _get_genre_masks(self, movie_ids: np.ndarray) -> np.ndarray:
+        """
+        Encodes genres of the movies as bitmasks (with bits ordered
+        as the genre columns of the preprocessed ratings).
+
+        Parameters
+        ----------
+        movie_ids : numpy.ndarray
+            Ids of the movies in the Movie Lens dataset.
+
+        Returns
+        -------
+        numpy.ndarray
+            Genre bitmask of each of the movies.
+
+        Raises
+        ------
+        dataset.InvalidMovieException
+            When there is no movie with some of the requested ids.
         """
-        Computes the average rating given by a specific user.
+        positions = self._movie_index.positions(movie_ids)
+        if (positions < 0).any():
+            raise InvalidMovieException(f'There is no movie with movieId={movie_ids[positions < 0][0]}.')
+        return self._movie_index.get_genre_masks()[positions]
+
+    def _mine_rules(self, user_id: int, threshold_itemsets: float, threshold_rules: float) -> RuleTable:
+        """
+        Mines association rules predicting the rating from the ratings
+        given by a user.
 
         Parameters
         ----------
         user_id : int
             Id of the user in the Movie Lens dataset.
-        
+
+        threshold_itemsets : float
+            Minimum support used in the apriori algorithm.
+
+        threshold_rules : float
+            Threshold used when generating association rules.
+
         Returns
         -------
-        float
-            Computed average rating.
+        RuleTable
+            Compiled association rules whose consequent is a single rating
+            (see `MiningEngine.mine_table`).
         """
-        ratings = self._preprocessor.get_dataset().get_ratings()
-        return ratings[ratings.index.get_level_values('userId') == user_id]['rating'].mean()
-    
+        masks = self._ratings_packed.get_user_masks(user_id)
+        with stage('predict.mine_rules', len(masks)):
+            return self._engine.mine_table(
+                masks, self._ratings_packed.get_genres(), self._ratings_packed.get_rating_values(),
+                threshold_itemsets, threshold_rules
+            )
+
+    def _cube_predictions(
+        self,
+        user_id: int,
+        genre_masks: np.ndarray,
+        threshold_itemsets: float,
+        threshold_rules: float,
+        weighted_mean_metric: str
+    ) -> np.ndarray:
+        """
+        Computes predictions based on association rules for movies rated
+        by a user, querying the counting cube once per distinct genre mask.
+        """
+        unique_masks, inverse = np.unique(genre_masks, return_inverse=True)
+        predictions = np.full(len(unique_masks), np.nan)
+        for position, mask in enumerate(unique_masks):
+            rules = self._cube.rules(user_id, int(mask), threshold_itemsets, threshold_rules)
+            weights = rules[weighted_mean_metric]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                predictions[position] = (rules['consequents'] @ weights) / weights.sum()
+        return predictions[inverse]
+
+    def _rules_predictions(
+        self,
+        user_id: int,
+        genre_masks: np.ndarray,
+        threshold_itemsets: float,
+        threshold_rules: float,
+        weighted_mean_metric: str
+    ) -> np.ndarray:
+        """
+        Computes predictions based on association rules of a user for
+        movies with the given genre masks (NaN where no rule applies),
+        either from the counting cube or from the mined rules.
+        """
+        if self._cube is not None:
+            with stage('predict.cube_predictions', len(genre_masks)):
+                return self._cube_predictions(user_id, genre_masks, threshold_itemsets, threshold_rules, weighted_mean_metric)
+        return self._mined_rules_predictions(user_id, genre_masks, threshold_itemsets, threshold_rules, weighted_mean_metric)
+
+    def _mined_rules_predictions(
+        self,
+        user_id: int,
+        genre_masks: np.ndarray,
+        threshold_itemsets: float,
+        threshold_rules: float,
+        weighted_mean_metric: str
+    ) -> np.ndarray:
+        """
+        Computes predictions based on association rules of a user (see
+        `_rules_predictions`) from the mined rules, matching all of them
+        against all genre masks at once.
+        """
+        with stage('predict.get_rules'):
+            rules = self._get_rules(user_id, threshold_itemsets, threshold_rules)
+        with stage('predict.apply_rules', len(genre_masks)):
+            return rules.predict(genre_masks, weighted_mean_metric)
+
+    def _get_rules(self, user_id: int, threshold_itemsets: float, threshold_rules: float) -> RuleTable:
+        """
+        Provides association rules of a user (see `_mine_rules`),
+        taking them from the cache if possible.
+        """
+        key = (user_id, threshold_itemsets, threshold_rules)
+        rules = self._rule_cache.get(key)
+        if rules is None:
+            rules = self._mine_rules(user_id, threshold_itemsets, threshold_rules)
+            self._rule_cache.put(key, rules, rules.get_nbytes())
+        return rules
+
+    @staticmethod
+    def _check_parameters(
+        threshold_itemsets: float,
+        threshold_rules: float,
+        weighted_mean_metric: str,
+        alpha: float,
+        beta: float
+    ) -> None:
+        """Validates parameters of the prediction."""
+        assert isinstance(threshold_itemsets, float) and threshold_itemsets >= 0, 'threshold_itemsets should be a nonnegative float.'
+        assert isinstance(threshold_rules, float) and threshold_rules >= 0, 'threshold_rules should be a nonnegative float.'
+        assert weighted_mean_metric in RULE_METRICS, 'Unknown weighted mean metric.'
+        assert isinstance(alpha, float) and 0 <= alpha <= 1, 'alpha should be a float from the interval [0, 1].'
+        assert isinstance(beta, float) and 0 <= beta <= 1, 'beta should be a float from the interval [0, 1].'
+
     def predict(
         self,
         user_id: int,
@@ -114,36 +869,306 @@ class Predictor:
         
         assert isinstance(user_id, int) and user_id > 0, 'user_id should be a positive integer.'
         assert isinstance(movie_id, int) and movie_id > 0, 'movie_id should be a positive integer.'
-        assert isinstance(threshold_itemsets, float) and threshold_itemsets >= 0, 'threshold_itemsets should be a nonnegative float.'
-        assert isinstance(threshold_rules, float) and threshold_rules >= 0, 'threshold_rules should be a nonnegative float.'
-        assert weighted_mean_metric in ('antecedent support', 'consequent support', 'support', 'confidence', 'lift'), 'Unknown weighted mean metric.'
-        assert isinstance(alpha, float) and 0 <= alpha <= 1, 'alpha should be a float from the interval [0, 1].'
-        assert isinstance(beta, float) and 0 <= beta <= 1, 'beta should be a float from the interval [0, 1].'
+
+        return float(self.predict_many(
+            [user_id], [movie_id], threshold_itemsets, threshold_rules, weighted_mean_metric, alpha, beta
+        )[0])
+
+    @instrumented('predict.predict_many', rows=len)
+    def predict_many(
+        self,
+        user_ids: Sequence[int],
+        movie_ids: Sequence[int],
+        threshold_itemsets: float = 0.01,
+        threshold_rules: float = 0.01,
+        weighted_mean_metric: str = 'confidence',
+        alpha: float = 0.5,
+        beta: float = 0.5
+    ) -> np.ndarray:
+        """
+        Predicts ratings for many user-movie pairs at once.
+
+        The pairs are grouped by user, so that association rules of each
+        user are mined only once (or, with `use_cube`, the counting cube is
+        queried once per distinct genre mask of the user's movies), and the
+        predictions are computed for the whole batch with array operations.
+        Parameters have the same meaning as in `predict`.
+
+        Parameters
+        ----------
+        user_ids : Sequence[int]
+            Ids of the users in the Movie Lens dataset.
+
+        movie_ids : Sequence[int]
+            Ids of the movies in the Movie Lens dataset (one for each user id).
+
+        threshold_itemsets : float
+            Minimum support used in the apriori algorithm.
+
+        threshold_rules : float
+            Threshold used when generating association rules.
+
+        weighted_mean_metric : str
+            Association rule metric used as weights of the weighted mean.
+
+        alpha : float
+            Importance of the prediction based on average movie rating
+            vs average user rating in the final prediction.
+
+        beta : float
+            How important is the prediction purely based on association
+            rules in the final prediction.
+
+        Returns
+        -------
+        numpy.ndarray
+            Predictions of the ratings (not rounded), in the order of the pairs.
+        """
+
+        user_ids = np.asarray(user_ids, dtype=np.int64).reshape(-1)
+        movie_ids = np.asarray(movie_ids, dtype=np.int64).reshape(-1)
+        assert len(user_ids) == len(movie_ids), 'user_ids and movie_ids should have equal lengths.'
+        assert (user_ids > 0).all(), 'user_ids should be positive integers.'
+        assert (movie_ids > 0).all(), 'movie_ids should be positive integers.'
+        self._check_parameters(threshold_itemsets, threshold_rules, weighted_mean_metric, alpha, beta)
 
         warnings.filterwarnings('ignore')
 
-        user_prepr = self._ratings_preprocessed[self._ratings_preprocessed.index == user_id]
+        with stage('predict.genre_masks', len(movie_ids)):
+            genre_masks = self._get_genre_masks(movie_ids)
+        rules_prediction = np.full(len(user_ids), np.nan)
 
-        frequent_itemsets = apriori(user_prepr, min_support=threshold_itemsets, use_colnames=True)
-        rules = association_rules(frequent_itemsets, metric="support", min_threshold=threshold_rules)
-        rules = rules[rules['consequents'].apply(lambda x: len(x) == 1 and 'rating' in list(x)[0])]
+        pending = np.arange(len(user_ids))
+        if self._table is not None and self._table.get_parameters() == (threshold_itemsets, threshold_rules, weighted_mean_metric):
+            self._refresh_table()
+            with stage('predict.table_lookup', len(user_ids)):
+                rules_prediction, covered = self._table.lookup(user_ids, self._movie_index.positions(movie_ids))
+            pending = np.flatnonzero(~covered)
 
-        movie = self._preprocessor.get_dataset().get_movie_by_id(movie_id)
-        genres = frozenset(movie.genres)
+        users, inverse = np.unique(user_ids[pending], return_inverse=True)
+        groups = np.split(np.argsort(inverse, kind='stable'), np.cumsum(np.bincount(inverse))[:-1])
+        for user_id, pairs in zip(users, groups):
+            pairs = pending[pairs]
+            rules_prediction[pairs] = self._rules_predictions(
+                int(user_id), genre_masks[pairs], threshold_itemsets, threshold_rules, weighted_mean_metric
+            )
 
-        movie_avg = self._get_avg_movie_rating(movie_id)
-        user_avg = self._get_avg_user_rating(user_id)
-        avg_prediction = movie_avg * alpha + user_avg * (1 - alpha)
+        with stage('predict.averages', len(user_ids)):
+            movie_avg = self._get_avg_movie_ratings(movie_ids)
+            user_avg = self._get_avg_user_ratings(user_ids)
+            avg_prediction = movie_avg * alpha + user_avg * (1 - alpha)
 
-        relevant_rules = rules[rules['antecedents'] <= genres]
-        relevant_rules.loc[:, 'consequents'] = relevant_rules['consequents'].apply(lambda x: float(list(x)[0].split('_')[1]))
-        rules_prediction = (relevant_rules['consequents'] * relevant_rules[weighted_mean_metric]).sum() / relevant_rules[weighted_mean_metric].sum()
+        rules_prediction = np.where(np.isnan(rules_prediction), avg_prediction, rules_prediction)
 
-        if pd.isna(rules_prediction):
-            rules_prediction = avg_prediction
-        
         return rules_prediction * beta + avg_prediction * (1 - beta)
 
+    @instrumented('predict.predict_grid', rows=lambda predictions: predictions.shape[-1])
+    def predict_grid(
+        self,
+        user_ids: Sequence[int],
+        movie_ids: Sequence[int],
+        thresholds_itemsets: Sequence[float] = (0.01,),
+        thresholds_rules: Sequence[float] = (0.01,),
+        weighted_mean_metrics: Sequence[str] = ('confidence',),
+        alphas: Sequence[float] = (0.5,),
+        betas: Sequence[float] = (0.5,)
+    ) -> np.ndarray:
+        """
+        Predicts ratings for many user-movie pairs at once for every
+        combination of the given parameters (see `predict` for their meaning).
+
+        Rules of each user are mined only once, with the lowest of
+        `thresholds_itemsets`, together with all their metrics. Since the
+        frequent itemsets for a higher minimum support are a subset of
+        those for a lower one, a rule belongs to the rules of thresholds
+        `(threshold_itemsets, threshold_rules)` exactly when its support
+        reaches both of them, so the rules of the other thresholds are
+        derived by filtering. The predictions based on rules are computed
+        for all thresholds and metrics with a single matrix product per
+        user, and blended with the averages for all values of `alpha` and
+        `beta` with broadcasting. The predictions are the same as those of
+        `predict_many` for each combination of the parameters.
+
+        Parameters
+        ----------
+        user_ids : Sequence[int]
+            Ids of the users in the Movie Lens dataset.
+
+        movie_ids : Sequence[int]
+            Ids of the movies in the Movie Lens dataset (one for each user id).
+
+        thresholds_itemsets : Sequence[float]
+            Values of the minimum support used in the apriori algorithm.
+
+        thresholds_rules : Sequence[float]
+            Values of the threshold used when generating association rules.
+
+        weighted_mean_metrics : Sequence[str]
+            Association rule metrics used as weights (see `predict`).
+
+        alphas : Sequence[float]
+            Values of the importance of the average movie rating vs average user rating.
+
+        betas : Sequence[float]
+            Values of the importance of the prediction based on association rules.
+
+        Returns
+        -------
+        numpy.ndarray
+            Predictions of the ratings (not rounded) of shape
+            `(len(thresholds_itemsets), len(thresholds_rules),
+            len(weighted_mean_metrics), len(alphas), len(betas), n_pairs)`.
+        """
+
+        user_ids = np.asarray(user_ids, dtype=np.int64).reshape(-1)
+        movie_ids = np.asarray(movie_ids, dtype=np.int64).reshape(-1)
+        assert len(user_ids) == len(movie_ids), 'user_ids and movie_ids should have equal lengths.'
+        assert (user_ids > 0).all(), 'user_ids should be positive integers.'
+        assert (movie_ids > 0).all(), 'movie_ids should be positive integers.'
+        parameters = [thresholds_itemsets, thresholds_rules, weighted_mean_metrics, alphas, betas]
+        assert all(len(values) > 0 for values in parameters), 'Each parameter should have at least one value.'
+        defaults = [values[0] for values in parameters]
+        for index, values in enumerate(parameters):
+            for value in values:
+                self._check_parameters(*defaults[:index], value, *defaults[index + 1:])
+
+        warnings.filterwarnings('ignore')
+
+        # Rules of thresholds (i, j) are those whose support reaches both of them.
+        limits = np.maximum(np.asarray(thresholds_itemsets, dtype=np.float64)[:, None], np.asarray(thresholds_rules, dtype=np.float64)[None, :])
+        distinct_limits, limit_of = np.unique(limits, return_inverse=True)
+        min_support = float(min(thresholds_itemsets))
+        metrics = list(weighted_mean_metrics)
+        n_combinations = len(distinct_limits) * len(metrics)
+
+        with stage('predict.genre_masks', len(movie_ids)):
+            genre_masks = self._get_genre_masks(movie_ids)
+        rules_prediction = np.full((n_combinations, len(user_ids)), np.nan)
+
+        users, inverse = np.unique(user_ids, return_inverse=True)
+        groups = np.split(np.argsort(inverse, kind='stable'), np.cumsum(np.bincount(inverse))[:-1])
+        for user_id, pairs in zip(users, groups):
+            with stage('predict.get_rules'):
+                rules = self._get_rules(int(user_id), min_support, 0.0)
+            weights = rules.get_weights(['support', *metrics])
+            with stage('predict.apply_rules', len(pairs)):
+                active = weights[:, :1] >= distinct_limits[None, :]
+                # Weights of the rules for each (limit, metric) combination.
+                combined = (active[:, :, None] * weights[:, None, 1:]).reshape(len(rules), n_combinations)
+                relevant = rules.match(genre_masks[pairs])
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    rules_prediction[:, pairs] = ((relevant @ (rules.get_consequents()[:, None] * combined)) / (relevant @ combined)).T
+
+        with stage('predict.averages', len(user_ids)):
+            movie_avg = self._get_avg_movie_ratings(movie_ids)
+            user_avg = self._get_avg_user_ratings(user_ids)
+            alphas = np.asarray(alphas, dtype=np.float64)[:, None]
+            avg_prediction = movie_avg[None, :] * alphas + user_avg[None, :] * (1 - alphas)
+
+        rules_prediction = rules_prediction.reshape(len(distinct_limits), len(metrics), 1, 1, len(user_ids))
+        avg_prediction = avg_prediction[None, None, :, None, :]
+        betas = np.asarray(betas, dtype=np.float64)[:, None]
+        rules_prediction = np.where(np.isnan(rules_prediction), avg_prediction, rules_prediction)
+        predictions = rules_prediction * betas + avg_prediction * (1 - betas)
+
+        return predictions[limit_of.reshape(limits.shape)]
+
+    def _get_catalog(self) -> Dict[str, np.ndarray]:
+        """
+        Provides arrays describing all movies for recommendations (computed
+        once and dropped when the ratings change): the distinct genre masks
+        (`masks`), the distinct mask of each movie (`inverse`) and the
+        average rating of each movie (`movie_avg`), in the order of the
+        movie index.
+        """
+        if self._catalog is None:
+            masks, inverse = np.unique(self._movie_index.get_genre_masks(), return_inverse=True)
+            movie_avg = self._get_avg_movie_ratings(self._movie_index.get_movie_ids())
+            self._catalog = {'masks': masks, 'inverse': inverse.reshape(-1), 'movie_avg': movie_avg}
+        return self._catalog
+
+    @instrumented('predict.recommend', rows=lambda recommended: len(recommended[0]))
+    def recommend(
+        self,
+        user_id: int,
+        n: int = 10,
+        threshold_itemsets: float = 0.01,
+        threshold_rules: float = 0.01,
+        weighted_mean_metric: str = 'confidence',
+        alpha: float = 0.5,
+        beta: float = 0.5,
+        exclude: Optional[Sequence[int]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recommends movies to a user: the movies with the highest predicted
+        ratings among the movies the user has not rated.
+
+        Rules of the user are mined only once (even if the predictor uses
+        the cube, which is queried per genre mask), and the predictions
+        based on them are computed once per distinct genre mask of the
+        movies rather than per movie. They are blended with the
+        precomputed averages of all movies, and the best movies are selected
+        with a partial sort. Parameters of the prediction have the same
+        meaning as in `predict`, and the predicted ratings are the same.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user in the Movie Lens dataset.
+
+        n : int, optional
+            Number of recommended movies (default 10).
+
+        exclude : Sequence[int], optional
+            Ids of the movies which should not be recommended (by default,
+            the movies rated by the user in the dataset the predictor was
+            fitted to, or none for a predictor not attached to a dataset).
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Ids of the recommended movies and their predicted ratings
+            (not rounded), from the best one (ties broken by movie id).
+
+        Raises
+        ------
+        dataset.InvalidUserException
+            When the user has no ratings.
+        """
+
+        assert isinstance(user_id, int) and user_id > 0, 'user_id should be a positive integer.'
+        assert isinstance(n, int) and n >= 0, 'n should be a nonnegative integer.'
+        self._check_parameters(threshold_itemsets, threshold_rules, weighted_mean_metric, alpha, beta)
+        user_avg = float(self._get_avg_user_ratings(np.array([user_id], dtype=np.int64))[0])
+        if np.isnan(user_avg):
+            raise InvalidUserException(f'There are no ratings of the user with userId={user_id}.')
+
+        warnings.filterwarnings('ignore')
+
+        catalog = self._get_catalog()
+        # The cube is queried once per genre mask, so for all the movies the rules are matched at once instead.
+        rules_prediction = self._mined_rules_predictions(
+            user_id, catalog['masks'], threshold_itemsets, threshold_rules, weighted_mean_metric
+        )[catalog['inverse']]
+        avg_prediction = catalog['movie_avg'] * alpha + user_avg * (1 - alpha)
+        rules_prediction = np.where(np.isnan(rules_prediction), avg_prediction, rules_prediction)
+        predictions = rules_prediction * beta + avg_prediction * (1 - beta)
+
+        if exclude is None and self._preprocessor is not None:
+            exclude = self._preprocessor.get_dataset().get_ratings_store().get_user_ratings(user_id)[0]
+        candidates = np.arange(len(predictions))
+        if exclude is not None and len(exclude):
+            positions = self._movie_index.positions(exclude)
+            candidates = np.setdiff1d(candidates, positions[positions >= 0], assume_unique=True)
+
+        movie_ids = self._movie_index.get_movie_ids()
+        if 0 < n < len(candidates):
+            # Movies tied with the n-th best one are kept, so that ties are broken by movie id.
+            threshold = np.partition(predictions[candidates], len(candidates) - n)[len(candidates) - n]
+            candidates = candidates[predictions[candidates] >= threshold]
+        best = candidates[np.lexsort((movie_ids[candidates], -predictions[candidates]))[:n]]
+        return movie_ids[best], predictions[best]
+
 
 def round_rating(rating: float) -> float:
     """
@@ -163,24 +1188,286 @@ def round_rating(rating: float) -> float:
     return round(rating * 2) / 2
 
 
+BATCH_HEADERS = {('user_id', 'movie_id'), ('userid', 'movieid')}
+"""Recognized headers of batch input in CSV format (compared case-insensitively)."""
+
+
+def parse_pair(line: str) -> Tuple[int, int]:
+    """
+    Parses a user-movie pair from a line of batch input: either a CSV
+    line `<user_id>,<movie_id>` or a JSON object with the keys `user_id`
+    and `movie_id` (JSON Lines).
+
+    Parameters
+    ----------
+    line : str
+        Line of the input.
+
+    Returns
+    -------
+    Tuple[int, int]
+        Id of the user and id of the movie.
+
+    Raises
+    ------
+    ValueError
+        When the line is not a valid pair of positive integer ids.
+    """
+    line = line.strip()
+    if line.startswith('{'):
+        record = json.loads(line)
+        user_id, movie_id = record.get('user_id'), record.get('movie_id')
+        if not all(isinstance(value, int) and not isinstance(value, bool) for value in (user_id, movie_id)):
+            raise ValueError('Fields user_id and movie_id should be integers.')
+    else:
+        fields = line.split(',')
+        if len(fields) != 2:
+            raise ValueError('Line should consist of user_id and movie_id separated by a comma.')
+        user_id, movie_id = int(fields[0]), int(fields[1])
+    if user_id <= 0 or movie_id <= 0:
+        raise ValueError('Ids should be positive integers.')
+    return user_id, movie_id
+
+
+def read_pairs(lines: Iterable[str]) -> Iterator[Tuple[int, Optional[Tuple[int, int]], Optional[str]]]:
+    """
+    Parses the lines of batch input (see `parse_pair`), skipping empty
+    lines and a CSV header in the first line.
+
+    Parameters
+    ----------
+    lines : Iterable[str]
+        Lines of the input.
+
+    Returns
+    -------
+    Iterator[Tuple[int, Optional[Tuple[int, int]], Optional[str]]]
+        For each nonempty line: its number (counted from 1) and either
+        the parsed pair or the reason why it is invalid.
+    """
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        if number == 1 and tuple(field.strip().lower() for field in line.split(',')) in BATCH_HEADERS:
+            continue
+        try:
+            yield number, parse_pair(line), None
+        except ValueError as error:
+            yield number, None, str(error)
+
+
+class BatchWriter:
+    """
+    Writer of the results of batch prediction, one line per pair,
+    in CSV (with a header) or JSON Lines format.
+
+    Parameters
+    ----------
+    output : TextIO
+        Stream to which the results are written.
+
+    output_format : str, optional
+        Format of the results, `csv` or `jsonl` (default `jsonl`).
+    """
+
+    FORMATS: Tuple[str, ...] = ('csv', 'jsonl')
+    """Supported output formats."""
+
+    COLUMNS: Tuple[str, ...] = ('line', 'user_id', 'movie_id', 'prediction', 'rounded', 'error')
+    """Columns of the results in CSV format."""
+
+    _output: TextIO
+    _format: str
+    _csv: Optional[Any]
+
+    def __init__(self, output: TextIO, output_format: str = 'jsonl') -> None:
+        if output_format not in self.FORMATS:
+            raise ValueError(f'Unsupported output format: {output_format}.')
+        self._output = output
+        self._format = output_format
+        self._csv = None
+        if output_format == 'csv':
+            self._csv = csv.writer(output, lineterminator='\n')
+            self._csv.writerow(self.COLUMNS)
+
+    def write(self, line: int, user_id: Optional[int], movie_id: Optional[int], prediction: Optional[float] = None, error: Optional[str] = None) -> None:
+        """
+        Writes the result of a single pair (either the prediction or an error).
+
+        Parameters
+        ----------
+        line : int
+            Number of the line of the input.
+
+        user_id : int, optional
+            Id of the user (`None` if the line is invalid).
+
+        movie_id : int, optional
+            Id of the movie (`None` if the line is invalid).
+
+        prediction : float, optional
+            Predicted rating.
+
+        error : str, optional
+            Reason why the rating could not be predicted.
+        """
+        if self._format == 'jsonl':
+            record = {'line': line, 'user_id': user_id, 'movie_id': movie_id}
+            record.update({'error': error} if error is not None else {'prediction': prediction, 'rounded': round_rating(prediction)})
+            self._output.write(json.dumps(record) + '\n')
+            return
+        rounded = round_rating(prediction) if error is None else None
+        self._csv.writerow([line, user_id, movie_id, prediction, rounded, error])
+
+    def flush(self) -> None:
+        """Flushes the output stream."""
+        self._output.flush()
+
+
+def predict_batch(predictor: Predictor, lines: Iterable[str], writer: BatchWriter, chunk_size: int = 1000) -> Dict[str, int]:
+    """
+    Predicts ratings of the pairs read from batch input with a fitted
+    predictor. The pairs are predicted in chunks and the results of each
+    chunk are written (in the order of the input) and flushed as soon as
+    it is predicted, so the input can be streamed. Invalid lines and
+    pairs whose rating cannot be predicted are reported by the writer
+    without stopping the batch.
+
+    Parameters
+    ----------
+    predictor : Predictor
+        Fitted predictor.
+
+    lines : Iterable[str]
+        Lines of the input (see `parse_pair`).
+
+    writer : BatchWriter
+        Writer of the results.
+
+    chunk_size : int, optional
+        Number of lines predicted at once (default 1000).
+
+    Returns
+    -------
+    Dict[str, int]
+        Numbers of `predicted` pairs and `errors`.
+    """
+    counts = {'predicted': 0, 'errors': 0}
+    chunk = []
+    for item in read_pairs(lines):
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            _write_chunk(predictor, chunk, writer, counts)
+            chunk = []
+    _write_chunk(predictor, chunk, writer, counts)
+    return counts
+
+
+def _predict_chunk(predictor: Predictor, pairs: List[Tuple[int, Tuple[int, int]]]) -> Dict[int, Union[float, InvalidMovieException]]:
+    """
+    Predicts ratings of the valid pairs of a chunk at once, falling back
+    to predicting them one by one when some of the movies are invalid.
+    Returns the prediction or the exception for each line number.
+    """
+    if not pairs:
+        return {}
+    user_ids, movie_ids = (np.array(ids, dtype=np.int64) for ids in zip(*(pair for _, pair in pairs)))
+    try:
+        return dict(zip((number for number, _ in pairs), predictor.predict_many(user_ids, movie_ids)))
+    except InvalidMovieException:
+        pass
+    # Pairs of the chunk are predicted one by one to find out which of them are invalid.
+    predictions = {}
+    for number, (user_id, movie_id) in pairs:
+        try:
+            predictions[number] = predictor.predict(user_id, movie_id)
+        except InvalidMovieException as error:
+            predictions[number] = error
+    return predictions
+
+
+def _write_chunk(
+    predictor: Predictor,
+    chunk: List[Tuple[int, Optional[Tuple[int, int]], Optional[str]]],
+    writer: BatchWriter,
+    counts: Dict[str, int]
+) -> None:
+    """Predicts a chunk of parsed lines (see `read_pairs`), writes and flushes the results and counts them."""
+    predictions = _predict_chunk(predictor, [(number, pair) for number, pair, _ in chunk if pair is not None])
+    for number, pair, error in chunk:
+        user_id, movie_id = pair if pair is not None else (None, None)
+        prediction = predictions.get(number)
+        if isinstance(prediction, Exception):
+            error = str(prediction)
+        elif pair is not None and not np.isfinite(prediction):
+            error = f'There are no ratings of the user with userId={user_id}.'
+        if error is not None:
+            writer.write(number, user_id, movie_id, error=error)
+            counts['errors'] += 1
+        else:
+            writer.write(number, user_id, movie_id, float(prediction))
+            counts['predicted'] += 1
+    writer.flush()
+
+
 def main(args: List[str]) -> None:
-    
-    if len(args) != 3:
-        print("Invalid number of arguments.")
-        sys.exit(1)
-    
-    user_id = int(args[0])
-    movie_id = int(args[1])
-    dataset_name = args[2]
-
-    dataset = MovieLensDataset(dataset_name)
-    dataset.delete_rating(user_id, movie_id)
-    preprocessor = MovieLensDatasetPreprocessor().fit_transform(dataset)
-    predictor = Predictor()
-    predictor.fit(preprocessor)
-    prediction = predictor.predict(user_id, movie_id)
-    
-    print(f'Predicted rating for movie "{dataset.get_movie_by_id(movie_id).title}" and user with userId={user_id}: {prediction} (rounded: {round_rating(prediction)})')
+    # The dataset (with pandas) is only needed to fit a predictor, not to load a saved one.
+    from .dataset import PREDICTION_COLUMNS, MovieLensDataset
+    from .preprocessing import MovieLensDatasetPreprocessor
+
+    if len(args) == 3 and not any(arg.startswith('--') for arg in args):
+        # Single pair: <user_id> <movie_id> <dataset_name>
+        user_id = int(args[0])
+        movie_id = int(args[1])
+        dataset_name = args[2]
+
+        dataset = MovieLensDataset(dataset_name, columns=PREDICTION_COLUMNS, categorical=True)
+        dataset.delete_rating(user_id, movie_id)
+        preprocessor = MovieLensDatasetPreprocessor().fit_transform(dataset)
+        predictor = Predictor()
+        predictor.fit(preprocessor)
+        prediction = predictor.predict(user_id, movie_id)
+
+        print(f'Predicted rating for movie "{dataset.get_movie_by_id(movie_id).title}" and user with userId={user_id}: {prediction} (rounded: {round_rating(prediction)})')
+        return
+
+    parser = argparse.ArgumentParser(
+        description='Predicts ratings of many user-movie pairs, loading the dataset and fitting the predictor once.',
+        epilog='A single pair is predicted with: predict.py <user_id> <movie_id> <dataset_name>'
+    )
+    parser.add_argument('dataset_name', help='name of the dataset (ml-latest-small or ml-latest)')
+    parser.add_argument('--batch', required=True, metavar='FILE', help='file with the pairs, one per line as CSV (user_id,movie_id) or JSON Lines ("-" for standard input)')
+    parser.add_argument('--output-format', choices=BatchWriter.FORMATS, default='jsonl', help='format of the predictions written to standard output (default jsonl)')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='number of pairs predicted at once (default 1000)')
+    parser.add_argument('--hold-out', action='store_true', help='delete the ratings of all the pairs before fitting (the input is then read in full first)')
+    parser.add_argument('--model', help='directory of a saved predictor to use instead of fitting one')
+    args = parser.parse_args(args)
+    if args.chunk_size <= 0:
+        parser.error('--chunk-size should be a positive integer.')
+    if args.hold_out and args.model is not None:
+        parser.error('--hold-out cannot be used with a saved predictor.')
+
+    source = sys.stdin if args.batch == '-' else open(args.batch)
+    try:
+        lines: Iterable[str] = source
+        if args.model is not None:
+            predictor = Predictor.load(args.model)
+        else:
+            dataset = MovieLensDataset(args.dataset_name, columns=PREDICTION_COLUMNS, categorical=True)
+            if args.hold_out:
+                lines = list(source)
+                pairs = np.array([pair for _, pair, _ in read_pairs(lines) if pair is not None], dtype=np.int64).reshape(-1, 2)
+                user_ids, movie_ids = pairs[:, 0], pairs[:, 1]
+                known = dataset.get_ratings_store().user_index(user_ids) >= 0
+                known &= np.isin(movie_ids, dataset.get_movie_index().get_movie_ids())
+                dataset.delete_ratings(user_ids[known], movie_ids[known])
+            predictor = Predictor()
+            predictor.fit(MovieLensDatasetPreprocessor().fit_transform(dataset))
+        counts = predict_batch(predictor, lines, BatchWriter(sys.stdout, args.output_format), args.chunk_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    print(f'{counts["predicted"]} predicted, {counts["errors"]} errors', file=sys.stderr)
 
 
 if __name__ == "__main__":
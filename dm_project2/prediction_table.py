@@ -0,0 +1,200 @@
+import numpy as np
+from typing import Dict, List, Sequence, Set, Tuple
+
+
+class PredictionTable:
+    """
+    Materialized predictions based on association rules for a set of
+    (active) users. Apart from the averages of the movie and the user, a
+    prediction depends only on the user and the genres of the movie, and
+    there are far fewer distinct combinations of genres (signatures) than
+    movies, so the table keeps one prediction per user and signature
+    (computed for fixed thresholds and metric, see `get_parameters`).
+
+    A prediction is retrieved in constant time (see `lookup`): the row of
+    the user and the signature of the movie are two array lookups. When
+    ratings of a user change, the user's row becomes stale (see
+    `invalidate`) and is recomputed by the owner of the table (see
+    `get_stale_users` and `set_row`).
+
+    Parameters
+    ----------
+    arrays : Dict[str, numpy.ndarray]
+        Arrays of the table (as returned by `to_arrays`).
+    """
+
+    ARRAYS: Tuple[str, ...] = (
+        'user_ids', 'user_lookup', 'signatures', 'movie_signatures', 'predictions', 'thresholds', 'metric'
+    )
+    """Names of the arrays comprising the table."""
+
+    _arrays: Dict[str, np.ndarray]
+    _stale: Set[int]
+
+    def __init__(self, arrays: Dict[str, np.ndarray]) -> None:
+        missing = [name for name in self.ARRAYS if name not in arrays]
+        if missing:
+            raise ValueError(f'Missing arrays of the prediction table: {", ".join(missing)}.')
+        self._arrays = {name: arrays[name] for name in self.ARRAYS}
+        self._stale = set()
+
+    @classmethod
+    def create(
+        cls,
+        user_ids: Sequence[int],
+        movie_masks: np.ndarray,
+        threshold_itemsets: float,
+        threshold_rules: float,
+        weighted_mean_metric: str
+    ) -> "PredictionTable":
+        """
+        Creates a table for the given users with all rows stale.
+
+        Parameters
+        ----------
+        user_ids : Sequence[int]
+            Ids of the users.
+
+        movie_masks : numpy.ndarray
+            Genre mask of each movie (in the order of the movie index).
+
+        threshold_itemsets : float
+            Minimum support used in the apriori algorithm.
+
+        threshold_rules : float
+            Threshold used when generating association rules.
+
+        weighted_mean_metric : str
+            Association rule metric used as weights.
+
+        Returns
+        -------
+        PredictionTable
+            Table whose rows have to be computed (see `set_row`).
+        """
+        user_ids = np.unique(np.asarray(user_ids, dtype=np.int64))
+        lookup = np.full(int(user_ids[-1]) + 1 if len(user_ids) else 0, -1, dtype=np.int32)
+        lookup[user_ids] = np.arange(len(user_ids), dtype=np.int32)
+        signatures, movie_signatures = np.unique(np.asarray(movie_masks, dtype=np.uint32), return_inverse=True)
+        table = cls({
+            'user_ids': user_ids,
+            'user_lookup': lookup,
+            'signatures': signatures,
+            'movie_signatures': movie_signatures.reshape(-1).astype(np.int32),
+            'predictions': np.full((len(user_ids), len(signatures)), np.nan),
+            'thresholds': np.array([threshold_itemsets, threshold_rules], dtype=np.float64),
+            'metric': np.array(weighted_mean_metric, dtype=np.str_)
+        })
+        table._stale = set(user_ids.tolist())
+        return table
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Arrays comprising the table.
+        """
+        return dict(self._arrays)
+
+    def __len__(self) -> int:
+        return len(self._arrays['user_ids'])
+
+    def get_user_ids(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Sorted ids of the users of the table.
+        """
+        return self._arrays['user_ids']
+
+    def get_signatures(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Distinct genre masks of the movies, in the order of the columns of the table.
+        """
+        return self._arrays['signatures']
+
+    def get_parameters(self) -> Tuple[float, float, str]:
+        """
+        Returns
+        -------
+        Tuple[float, float, str]
+            Thresholds of itemsets and rules and the metric for which the predictions are computed.
+        """
+        threshold_itemsets, threshold_rules = self._arrays['thresholds'].tolist()
+        return threshold_itemsets, threshold_rules, str(self._arrays['metric'])
+
+    def get_stale_users(self) -> List[int]:
+        """
+        Returns
+        -------
+        List[int]
+            Ids of the users whose rows have to be recomputed.
+        """
+        return sorted(self._stale)
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Marks the row of a user as stale (if the user belongs to the table).
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user.
+        """
+        lookup = self._arrays['user_lookup']
+        if 0 <= user_id < len(lookup) and lookup[user_id] >= 0:
+            self._stale.add(int(user_id))
+
+    def set_row(self, user_id: int, predictions: np.ndarray) -> None:
+        """
+        Stores the predictions of a user.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of a user of the table.
+
+        predictions : numpy.ndarray
+            Prediction for each signature (see `get_signatures`).
+        """
+        if not self._arrays['predictions'].flags.writeable:
+            # The array may be read-only (e.g. memory-mapped), hence it is copied before the first update.
+            self._arrays['predictions'] = np.array(self._arrays['predictions'])
+        self._arrays['predictions'][self._arrays['user_lookup'][user_id]] = predictions
+        self._stale.discard(int(user_id))
+
+    def lookup(self, user_ids: np.ndarray, movie_positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retrieves predictions for many user-movie pairs.
+
+        Parameters
+        ----------
+        user_ids : numpy.ndarray
+            Ids of the users.
+
+        movie_positions : numpy.ndarray
+            Positions of the movies in the movie index (one for each user id).
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Prediction of each pair (NaN where no rule applies or the pair is
+            not covered) and whether the pair is covered by the table, i.e.
+            the user belongs to the table and the row is not stale.
+        """
+        lookup = self._arrays['user_lookup']
+        known = (user_ids >= 0) & (user_ids < len(lookup))
+        rows = np.full(len(user_ids), -1, dtype=np.int64)
+        rows[known] = lookup[user_ids[known]]
+        covered = (rows >= 0) & (movie_positions >= 0)
+        if self._stale:
+            covered &= ~np.isin(user_ids, np.fromiter(self._stale, dtype=np.int64, count=len(self._stale)))
+        predictions = np.full(len(user_ids), np.nan)
+        columns = self._arrays['movie_signatures'][movie_positions[covered]]
+        predictions[covered] = self._arrays['predictions'][rows[covered], columns]
+        return predictions, covered
@@ -1,12 +1,22 @@
+import numpy as np
 import pandas as pd
-from dataset import MovieLensDataset
-from sklearn.base import TransformerMixin, BaseEstimator
-    
+from .dataset import MovieLensDataset
+from .instrumentation import instrumented
+from .packed_ratings import PackedRatings
+from .rating_cube import RatingCube
+from .ratings_store import RatingsStore
+from typing import Any, Dict
+
 
-class MovieLensDatasetPreprocessor(BaseEstimator, TransformerMixin):
+class MovieLensDatasetPreprocessor:
     """
     Class used for performing basic preprocessing of
     the Movie Lens dataset.
+
+    It follows the interface of scikit-learn transformers (`fit`,
+    `transform`, `fit_transform`, `get_params` and `set_params`) without
+    inheriting from their base classes, so that scikit-learn does not
+    have to be imported to preprocess the dataset.
     """
 
     _dataset: MovieLensDataset
@@ -28,7 +38,18 @@ class MovieLensDatasetPreprocessor(BaseEstimator, TransformerMixin):
         """Combines fitting to the dataset and transforming it."""
         self.fit(dataset)
         return self.transform(dataset)
+
+    def get_params(self, deep: bool = True) -> Dict[str, Any]:
+        """Provides parameters of the preprocessor (it has none)."""
+        return {}
+
+    def set_params(self, **params: Any) -> "MovieLensDatasetPreprocessor":
+        """Sets parameters of the preprocessor (it has none)."""
+        if params:
+            raise ValueError(f'Invalid parameters of MovieLensDatasetPreprocessor: {", ".join(params)}.')
+        return self
     
+    @instrumented('preprocessing.movies_ohe', rows=len)
     def movies_ohe(self) -> pd.DataFrame:
         """
         Perfroms one-hot encoding of the movie genres.
@@ -38,8 +59,9 @@ class MovieLensDatasetPreprocessor(BaseEstimator, TransformerMixin):
         pandas.DataFrame
             One-hot encoded movies.
         """
-        return self._dataset.get_movies()["genres"].str.get_dummies("|").drop(columns="(no genres listed)")    
-    
+        return self._dataset.get_movie_index().one_hot()
+
+    @instrumented('preprocessing.preprocess_ratings', rows=len)
     def preprocess_ratings(self) -> pd.DataFrame:
         """
         Performs ratings preprocessing.
@@ -49,8 +71,56 @@ class MovieLensDatasetPreprocessor(BaseEstimator, TransformerMixin):
         pandas.DataFrame
             Preprocessed ratings.
         """
-        return pd.get_dummies(self._dataset.get_ratings().join(self.movies_ohe()).drop('timestamp', axis=1).droplevel('movieId'), columns=['rating']).astype(bool)
+        return pd.get_dummies(self._dataset.get_ratings(copy=False)[['rating']].join(self.movies_ohe()).droplevel('movieId'), columns=['rating']).astype(bool)
+
+    @instrumented('preprocessing.preprocess_ratings_packed', rows=len)
+    def preprocess_ratings_packed(self) -> PackedRatings:
+        """
+        Performs ratings preprocessing, encoding each preprocessed rating
+        as a single bitmask instead of a row of boolean columns (the frame
+        returned by `preprocess_ratings` can be materialized from it with
+        `PackedRatings.to_frame`).
+
+        Returns
+        -------
+        PackedRatings
+            Compactly encoded preprocessed ratings.
+        """
+        store = self._dataset.get_ratings_store()
+        return PackedRatings.from_store(store, self._movie_masks(store), self._dataset.get_movie_index().get_genres())
     
+    @instrumented('preprocessing.genre_masks', rows=len)
+    def genre_masks(self) -> pd.Series:
+        """
+        Encodes genres of each movie as a bitmask, in which the bits
+        correspond to the consecutive columns of `movies_ohe`.
+
+        Returns
+        -------
+        pandas.Series
+            Genre masks (of type `uint32`) indexed by `movieId`.
+        """
+        index = self._dataset.get_movie_index()
+        return pd.Series(index.get_genre_masks(), index=pd.Index(index.get_movie_ids(), name='movieId'), name='genres')
+
+    @instrumented('preprocessing.rating_cube', rows=len)
+    def rating_cube(self) -> RatingCube:
+        """
+        Builds the counting cube of the ratings (the number of ratings of
+        each combination of user, genres of the movie and rating).
+
+        Returns
+        -------
+        RatingCube
+            Counting cube of the ratings.
+        """
+        store = self._dataset.get_ratings_store()
+        return RatingCube.build(store, self._movie_masks(store), self._dataset.get_movie_index().get_genres())
+
+    def _movie_masks(self, store: RatingsStore) -> np.ndarray:
+        """Provides genre masks of the movies of a ratings store (0 for unknown movies)."""
+        return self._dataset.get_movie_index().masks(store.get_movie_ids())
+
     def get_dataset(self) -> MovieLensDataset:
         """
         Provides the Movie Lens dataset on which the
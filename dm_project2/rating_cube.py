@@ -0,0 +1,269 @@
+import numpy as np
+from .ratings_store import RatingsStore, merge_user_rows
+from typing import Dict, List, Optional, Tuple
+
+
+RULE_METRICS = ('antecedent support', 'consequent support', 'support', 'confidence', 'lift')
+"""Association rule metrics which can be used as weights of predictions."""
+
+
+class RatingCube:
+    """
+    Sparse counting cube of the ratings: for each user, the number of
+    ratings of each distinct combination of (genres of the movie, rating).
+
+    Every association rule used for predicting ratings has an antecedent
+    made of genres and a single rating as the consequent, so its support
+    and confidence can be derived from these counts. The cube therefore
+    answers queries about the rules applicable to a movie (see `rules`)
+    without mining the user's ratings. When a single rating changes, only
+    the cells of the affected user are patched (see `update`).
+
+    Parameters
+    ----------
+    arrays : Dict[str, numpy.ndarray]
+        Arrays of the cube (as returned by `to_arrays`).
+
+    genres : List[str]
+        Names of the genres, in the order of the bits of genre masks.
+    """
+
+    ARRAYS: Tuple[str, ...] = (
+        'user_lookup', 'user_offsets', 'masks', 'rating_codes', 'counts', 'rating_values'
+    )
+    """Names of the arrays comprising the cube."""
+
+    _arrays: Dict[str, np.ndarray]
+    _genres: List[str]
+    _overrides: Dict[int, Dict[str, np.ndarray]]
+
+    def __init__(self, arrays: Dict[str, np.ndarray], genres: List[str]) -> None:
+        missing = [name for name in self.ARRAYS if name not in arrays]
+        if missing:
+            raise ValueError(f'Missing arrays of the rating cube: {", ".join(missing)}.')
+        self._arrays = {name: arrays[name] for name in self.ARRAYS}
+        self._genres = list(genres)
+        self._overrides = {}
+
+    @classmethod
+    def build(cls, store: RatingsStore, movie_masks: np.ndarray, genres: List[str]) -> "RatingCube":
+        """
+        Builds the cube in a single grouped pass over all ratings.
+
+        Parameters
+        ----------
+        store : RatingsStore
+            Store of the ratings.
+
+        movie_masks : numpy.ndarray
+            Genre mask of each movie of the store (in the order of its dense indices).
+
+        genres : List[str]
+            Names of the genres, in the order of the bits of genre masks.
+
+        Returns
+        -------
+        RatingCube
+            Built cube.
+        """
+        arrays = store.to_arrays()
+        rating_values, rating_codes = np.unique(arrays['ratings'], return_inverse=True)
+        user_offsets = arrays['user_offsets']
+        n_users = len(user_offsets) - 1
+        user_index = np.repeat(np.arange(n_users, dtype=np.int64), np.diff(user_offsets))
+
+        # A single key per rating: (user, genre mask, rating), grouped by sorting.
+        keys = (user_index << 40) | (movie_masks[arrays['movie_index']].astype(np.int64) << 8) | rating_codes
+        keys, counts = np.unique(keys, return_counts=True)
+
+        entry_users = keys >> 40
+        return cls({
+            'user_lookup': arrays['user_lookup'],
+            'user_offsets': np.searchsorted(entry_users, np.arange(n_users + 1)).astype(np.int64),
+            'masks': ((keys >> 8) & 0xFFFFFFFF).astype(np.uint32),
+            'rating_codes': (keys & 0xFF).astype(np.uint8),
+            'counts': counts.astype(np.int32),
+            'rating_values': rating_values.astype(np.float32)
+        }, genres)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Arrays comprising the cube.
+        """
+        self._merge_overrides()
+        return dict(self._arrays)
+
+    def get_genres(self) -> List[str]:
+        """
+        Returns
+        -------
+        List[str]
+            Names of the genres, in the order of the bits of genre masks.
+        """
+        return list(self._genres)
+
+    def __len__(self) -> int:
+        self._merge_overrides()
+        return len(self._arrays['counts'])
+
+    def get_user_entries(self, user_id: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Provides the cells of the cube belonging to a user.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user in the Movie Lens dataset.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+            Genre masks, rating values and the numbers of ratings of the
+            user's cells (all empty if the user has no ratings).
+        """
+        masks, codes, counts = self._user_cells(user_id)
+        return masks, self._arrays['rating_values'][codes], counts
+
+    def _user_cells(self, user_id: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Provides genre masks, rating codes and counts of the cells of a user (empty if the user has no ratings)."""
+        if user_id in self._overrides:
+            cells = self._overrides[user_id]
+            return cells['masks'], cells['rating_codes'], cells['counts']
+        lookup = self._arrays['user_lookup']
+        if not 0 <= user_id < len(lookup) or lookup[user_id] < 0:
+            start, end = 0, 0
+        else:
+            start, end = self._arrays['user_offsets'][lookup[user_id]:lookup[user_id] + 2]
+        return tuple(self._arrays[name][start:end] for name in ('masks', 'rating_codes', 'counts'))
+
+    def update(self, user_id: int, genre_mask: int, previous: Optional[float], rating: Optional[float]) -> None:
+        """
+        Patches the cells of a user after the user's rating of a movie
+        has been added, changed or removed.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user.
+
+        genre_mask : int
+            Genre mask of the movie.
+
+        previous : float, optional
+            Previous rating (`None` if the rating has been added).
+
+        rating : float, optional
+            New rating (`None` if the rating has been removed).
+        """
+        masks, codes, counts = self._user_cells(user_id)
+        counts = np.array(counts)
+        for value, delta in ((previous, -1), (rating, 1)):
+            if value is None:
+                continue
+            code = self._rating_code(value)
+            cell = np.flatnonzero((masks == genre_mask) & (codes == code))
+            if len(cell):
+                counts[cell[0]] += delta
+            else:
+                masks = np.append(masks, np.uint32(genre_mask))
+                codes = np.append(codes, np.uint8(code))
+                counts = np.append(counts, np.int32(delta))
+        nonempty = counts > 0
+        self._overrides[user_id] = {'masks': masks[nonempty], 'rating_codes': codes[nonempty], 'counts': counts[nonempty]}
+
+    def _rating_code(self, rating: float) -> int:
+        """Provides the code of a rating, assigning a new code to a new distinct rating."""
+        rating_values = self._arrays['rating_values']
+        codes = np.flatnonzero(rating_values == np.float32(rating))
+        if len(codes):
+            return int(codes[0])
+        self._arrays['rating_values'] = np.append(rating_values, np.float32(rating))
+        return len(rating_values)
+
+    def _merge_overrides(self) -> None:
+        """Merges the cells of the updated users into the arrays of the cube."""
+        if not self._overrides:
+            return
+        user_ids = np.flatnonzero(self._arrays['user_lookup'] >= 0)
+        user_ids = user_ids[np.argsort(self._arrays['user_lookup'][user_ids])]
+        user_ids, user_lookup, user_offsets, cells = merge_user_rows(
+            user_ids, self._arrays['user_offsets'],
+            {name: self._arrays[name] for name in ('masks', 'rating_codes', 'counts')},
+            self._overrides
+        )
+        self._arrays.update(user_lookup=user_lookup, user_offsets=user_offsets, **cells)
+        self._overrides = {}
+
+    @staticmethod
+    def _submasks(mask: int) -> np.ndarray:
+        """Enumerates all nonempty submasks of a mask."""
+        bits = np.array([1 << position for position in range(32) if mask >> position & 1], dtype=np.int64)
+        selection = (np.arange(1, 1 << len(bits))[:, None] >> np.arange(len(bits))) & 1
+        return (selection @ bits).astype(np.uint32)
+
+    def rules(self, user_id: int, genre_mask: int, min_support: float, min_threshold: float) -> Dict[str, np.ndarray]:
+        """
+        Provides the association rules of a user which apply to a movie,
+        i.e. the rules (genres -> rating) whose antecedent is a subset of
+        the movie's genres. The rules are the same as the ones mined from
+        the user's preprocessed ratings with the apriori algorithm.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user in the Movie Lens dataset.
+
+        genre_mask : int
+            Genre mask of the movie.
+
+        min_support : float
+            Minimum support of frequent itemsets (apriori algorithm).
+
+        min_threshold : float
+            Minimum support of the association rules.
+
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Genre masks of the antecedents (`antecedents`), rating values
+            of the consequents (`consequents`) and each of `RULE_METRICS`.
+        """
+        if min_support <= 0.0:
+            raise ValueError(f'`min_support` must be a positive number within the interval `(0, 1]`. Got {min_support}.')
+        masks, codes, counts = self._user_cells(user_id)
+        rating_values = self._arrays['rating_values']
+        antecedents = self._submasks(int(genre_mask) & int(np.bitwise_or.reduce(masks, initial=0)))
+        n_rows = int(counts.sum())
+        if n_rows == 0 or len(antecedents) == 0:
+            return self._empty_rules()
+
+        by_rating = np.zeros((len(masks), len(rating_values)))
+        by_rating[np.arange(len(masks)), codes] = counts
+        contained = (masks[None, :] & antecedents[:, None]) == antecedents[:, None]
+
+        sA = (contained @ counts) / n_rows
+        sC = by_rating.sum(axis=0) / n_rows
+        sAC = (contained @ by_rating) / n_rows
+
+        frequent = (sAC >= min_support) & (sAC >= min_threshold)
+        rows, columns = np.nonzero(frequent)
+        sA, sC, sAC = sA[rows], sC[columns], sAC[rows, columns]
+        return {
+            'antecedents': antecedents[rows],
+            'consequents': rating_values[columns],
+            'antecedent support': sA,
+            'consequent support': sC,
+            'support': sAC,
+            'confidence': sAC / sA,
+            'lift': sAC / sA / sC
+        }
+
+    @staticmethod
+    def _empty_rules() -> Dict[str, np.ndarray]:
+        """Creates a set of rules containing no rules."""
+        rules = {'antecedents': np.empty(0, dtype=np.uint32), 'consequents': np.empty(0, dtype=np.float32)}
+        rules.update({metric: np.empty(0) for metric in RULE_METRICS})
+        return rules
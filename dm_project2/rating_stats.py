@@ -0,0 +1,244 @@
+import numpy as np
+from .ratings_store import RatingsStore
+from typing import Dict, Optional, Tuple
+
+
+class RatingStatistics:
+    """
+    Index of aggregated rating statistics: the number, the sum and the
+    mean of the ratings of each user and of each movie, as well as of all
+    ratings in the dataset.
+
+    The index is computed once (see `from_store`), after which statistics
+    of any user or movie are retrieved in constant time. When a single
+    rating changes, the index is patched in constant time (see `update`).
+
+    Parameters
+    ----------
+    arrays : Dict[str, numpy.ndarray]
+        Arrays of the index (as returned by `to_arrays`).
+    """
+
+    ARRAYS: Tuple[str, ...] = (
+        'user_lookup', 'user_count', 'user_sum',
+        'movie_lookup', 'movie_count', 'movie_sum'
+    )
+    """Names of the arrays comprising the index."""
+
+    _arrays: Dict[str, np.ndarray]
+    _user_mean: np.ndarray
+    _movie_mean: np.ndarray
+
+    def __init__(self, arrays: Dict[str, np.ndarray]) -> None:
+        missing = [name for name in self.ARRAYS if name not in arrays]
+        if missing:
+            raise ValueError(f'Missing arrays of the rating statistics: {", ".join(missing)}.')
+        self._arrays = {name: arrays[name] for name in self.ARRAYS}
+        self._user_mean = self._mean(self._arrays['user_sum'], self._arrays['user_count'])
+        self._movie_mean = self._mean(self._arrays['movie_sum'], self._arrays['movie_count'])
+
+    @classmethod
+    def from_store(cls, store: RatingsStore) -> "RatingStatistics":
+        """
+        Computes the statistics of all ratings in a store.
+
+        Parameters
+        ----------
+        store : RatingsStore
+            Store of the ratings.
+
+        Returns
+        -------
+        RatingStatistics
+            Computed statistics.
+        """
+        arrays = store.to_arrays()
+        return cls({
+            'user_lookup': arrays['user_lookup'],
+            'user_count': np.diff(arrays['user_offsets']),
+            'user_sum': cls._sums(arrays['ratings'], arrays['user_offsets']),
+            'movie_lookup': arrays['movie_lookup'],
+            'movie_count': np.diff(arrays['movie_offsets']),
+            'movie_sum': cls._sums(arrays['csc_ratings'], arrays['movie_offsets'])
+        })
+
+    @staticmethod
+    def _sums(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        """Sums consecutive (nonempty) slices of values delimited by offsets."""
+        if len(offsets) < 2:
+            return np.zeros(0)
+        return np.add.reduceat(values, offsets[:-1], dtype=np.float64)
+
+    @staticmethod
+    def _mean(sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Computes means from sums and counts (NaN where the count is zero)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return sums / counts
+
+    @staticmethod
+    def _lookup(lookup: np.ndarray, values: np.ndarray, ids) -> np.ndarray:
+        """Retrieves values for ids through a lookup array (NaN for unknown ids)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        known = (ids >= 0) & (ids < len(lookup))
+        index = np.full(ids.shape, -1, dtype=np.int64)
+        index[known] = lookup[ids[known]]
+        result = np.full(ids.shape, np.nan)
+        result[index >= 0] = values[index[index >= 0]]
+        return result
+
+    def update(self, user_id: int, movie_id: int, previous: Optional[float], rating: Optional[float]) -> None:
+        """
+        Patches the statistics of a user and of a movie after the user's
+        rating of the movie has been added, changed or removed.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user.
+
+        movie_id : int
+            Id of the movie.
+
+        previous : float, optional
+            Previous rating (`None` if the rating has been added).
+
+        rating : float, optional
+            New rating (`None` if the rating has been removed).
+        """
+        if not all(array.flags.writeable for array in self._arrays.values()):
+            # Arrays may be read-only (e.g. memory-mapped), hence they are copied before the first update.
+            self._arrays = {name: np.array(array) for name, array in self._arrays.items()}
+        count_delta = (rating is not None) - (previous is not None)
+        sum_delta = (rating or 0.0) - (previous or 0.0)
+        for kind, entity_id in (('user', user_id), ('movie', movie_id)):
+            index = self._entry(kind, entity_id)
+            counts, sums = self._arrays[f'{kind}_count'], self._arrays[f'{kind}_sum']
+            counts[index] += count_delta
+            sums[index] += sum_delta
+            getattr(self, f'_{kind}_mean')[index] = sums[index] / counts[index] if counts[index] else np.nan
+
+    def _entry(self, kind: str, entity_id: int) -> int:
+        """Finds the index of a user or a movie (`kind`), adding an empty entry for an unknown id."""
+        lookup = self._arrays[f'{kind}_lookup']
+        if entity_id >= len(lookup):
+            lookup = np.concatenate([lookup, np.full(entity_id + 1 - len(lookup), -1, dtype=lookup.dtype)])
+            self._arrays[f'{kind}_lookup'] = lookup
+        if lookup[entity_id] < 0:
+            lookup[entity_id] = len(self._arrays[f'{kind}_count'])
+            for name in ('count', 'sum'):
+                values = self._arrays[f'{kind}_{name}']
+                self._arrays[f'{kind}_{name}'] = np.append(values, 0).astype(values.dtype)
+            setattr(self, f'_{kind}_mean', np.append(getattr(self, f'_{kind}_mean'), np.nan))
+        return int(lookup[entity_id])
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Arrays comprising the index.
+        """
+        return dict(self._arrays)
+
+    def get_global_count(self) -> int:
+        """
+        Returns
+        -------
+        int
+            Number of all ratings.
+        """
+        return int(self._arrays['user_count'].sum())
+
+    def get_global_mean(self) -> float:
+        """
+        Returns
+        -------
+        float
+            Mean of all ratings (NaN if there are none).
+        """
+        count = self.get_global_count()
+        return float(self._arrays['user_sum'].sum() / count) if count else np.nan
+
+    def user_count(self, user_ids) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        user_ids : int or array-like of int
+            Ids of the users.
+
+        Returns
+        -------
+        numpy.ndarray
+            Number of ratings given by each of the users.
+        """
+        return np.nan_to_num(self._lookup(self._arrays['user_lookup'], self._arrays['user_count'], user_ids)).astype(np.int64)
+
+    def user_sum(self, user_ids) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        user_ids : int or array-like of int
+            Ids of the users.
+
+        Returns
+        -------
+        numpy.ndarray
+            Sum of the ratings given by each of the users.
+        """
+        return np.nan_to_num(self._lookup(self._arrays['user_lookup'], self._arrays['user_sum'], user_ids))
+
+    def user_mean(self, user_ids) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        user_ids : int or array-like of int
+            Ids of the users.
+
+        Returns
+        -------
+        numpy.ndarray
+            Average rating given by each of the users (NaN for users without ratings).
+        """
+        return self._lookup(self._arrays['user_lookup'], self._user_mean, user_ids)
+
+    def movie_count(self, movie_ids) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        movie_ids : int or array-like of int
+            Ids of the movies.
+
+        Returns
+        -------
+        numpy.ndarray
+            Number of ratings of each of the movies.
+        """
+        return np.nan_to_num(self._lookup(self._arrays['movie_lookup'], self._arrays['movie_count'], movie_ids)).astype(np.int64)
+
+    def movie_sum(self, movie_ids) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        movie_ids : int or array-like of int
+            Ids of the movies.
+
+        Returns
+        -------
+        numpy.ndarray
+            Sum of the ratings of each of the movies.
+        """
+        return np.nan_to_num(self._lookup(self._arrays['movie_lookup'], self._arrays['movie_sum'], movie_ids))
+
+    def movie_mean(self, movie_ids) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        movie_ids : int or array-like of int
+            Ids of the movies.
+
+        Returns
+        -------
+        numpy.ndarray
+            Average rating of each of the movies (NaN for movies without ratings).
+        """
+        return self._lookup(self._arrays['movie_lookup'], self._movie_mean, movie_ids)
@@ -0,0 +1,265 @@
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+
+class RatingsLog:
+    """
+    Append-only log of changes of the ratings (added, changed and deleted
+    ratings) kept in growable arrays: user and movie of each change, the
+    new rating (NaN for a deleted rating) and its timestamp.
+
+    The latest change of each pair is found through dictionaries mapping
+    users (and movies) to the positions of the latest changes of their
+    pairs, so that a change is recorded and a single pair is looked up in
+    amortized constant time, and the changes of a user or of a movie are
+    retrieved without going through the whole log. Many pairs at once are
+    looked up with a binary search over the current ratings of the log
+    sorted by user and movie (see `get_current`), which are sorted again
+    only when they are needed after the log has changed.
+
+    Parameters
+    ----------
+    capacity : int, optional
+        Initial number of changes the arrays can hold (they are doubled
+        whenever they are full).
+    """
+
+    _arrays: Dict[str, np.ndarray]
+    _size: int
+    _by_user: Dict[int, Dict[int, int]]
+    _by_movie: Dict[int, Dict[int, int]]
+    _user_counts: Dict[int, int]
+    _count: int
+    _current: Optional[Tuple[np.ndarray, np.ndarray]]
+
+    def __init__(self, capacity: int = 16) -> None:
+        self._arrays = {
+            'user_ids': np.empty(capacity, dtype=np.int32),
+            'movie_ids': np.empty(capacity, dtype=np.int32),
+            'ratings': np.empty(capacity, dtype=np.float32),
+            'timestamps': np.empty(capacity, dtype=np.int32)
+        }
+        self._size = 0
+        self._by_user = {}
+        self._by_movie = {}
+        self._user_counts = {}
+        self._count = 0
+        self._current = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get_count(self) -> int:
+        """
+        Returns
+        -------
+        int
+            Number of current ratings in the log (i.e. pairs whose latest
+            change has not deleted the rating).
+        """
+        return self._count
+
+    def append(self, user_id: int, movie_id: int, rating: Optional[float], timestamp: int) -> None:
+        """
+        Records a change of a rating.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user.
+
+        movie_id : int
+            Id of the movie.
+
+        rating : float, optional
+            New rating (`None` if the rating has been deleted).
+
+        timestamp : int
+            Time of the change in seconds since the epoch.
+        """
+        user_id, movie_id = int(user_id), int(movie_id)
+        if self._size == len(self._arrays['ratings']):
+            self._arrays = {name: np.resize(array, max(2 * len(array), 1)) for name, array in self._arrays.items()}
+        position = self._size
+        self._arrays['user_ids'][position] = user_id
+        self._arrays['movie_ids'][position] = movie_id
+        self._arrays['ratings'][position] = np.nan if rating is None else rating
+        self._arrays['timestamps'][position] = timestamp
+        self._size += 1
+
+        count_delta = (rating is not None) - (self.get(user_id, movie_id) >= 0)
+        self._user_counts[user_id] = self._user_counts.get(user_id, 0) + count_delta
+        self._count += count_delta
+        self._by_user.setdefault(user_id, {})[movie_id] = position
+        self._by_movie.setdefault(movie_id, {})[user_id] = position
+        self._current = None
+
+    def get(self, user_id: int, movie_id: int) -> int:
+        """
+        Finds the current rating of a single pair.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user.
+
+        movie_id : int
+            Id of the movie.
+
+        Returns
+        -------
+        int
+            Position of the latest change of the pair in the log (-1 if
+            the pair has not been changed or its rating has been deleted).
+        """
+        position = self._by_user.get(int(user_id), {}).get(int(movie_id), -1)
+        return -1 if position < 0 or np.isnan(self._arrays['ratings'][position]) else position
+
+    def positions(self, user_ids, movie_ids) -> np.ndarray:
+        """
+        Finds the current ratings of pairs (vectorized over the pairs).
+
+        Parameters
+        ----------
+        user_ids : array-like of int
+            Ids of the users.
+
+        movie_ids : array-like of int
+            Ids of the movies (one for each user id).
+
+        Returns
+        -------
+        numpy.ndarray
+            Position of the latest change of each pair in the log (-1 for
+            pairs which have not been changed or whose ratings have been deleted).
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64).reshape(-1)
+        movie_ids = np.asarray(movie_ids, dtype=np.int64).reshape(-1)
+        if len(user_ids) == 1:
+            # A single pair is looked up without sorting the current ratings.
+            return np.array([self.get(user_ids[0], movie_ids[0])], dtype=np.int64)
+        keys = self._keys(user_ids, movie_ids)
+        current, current_keys = self._sorted()
+        positions = np.full(len(keys), -1, dtype=np.int64)
+        if len(current):
+            indices = np.minimum(np.searchsorted(current_keys, keys), len(current) - 1)
+            found = current_keys[indices] == keys
+            positions[found] = current[indices[found]]
+        return positions
+
+    @staticmethod
+    def _keys(user_ids: np.ndarray, movie_ids: np.ndarray) -> np.ndarray:
+        """Encodes pairs as integers ordered by user, then by movie."""
+        return (user_ids.astype(np.int64) << 32) | movie_ids.astype(np.int64)
+
+    def get_current(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Positions of the latest changes of all pairs which have not
+            deleted the ratings, in the order of users and movies.
+        """
+        return self._sorted()[0]
+
+    def _sorted(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Provides the positions of the current ratings and their keys, sorted again only after the log has changed."""
+        if self._current is None:
+            latest = [position for movies in self._by_user.values() for position in movies.values()]
+            positions = np.array(latest, dtype=np.int64)
+            positions = positions[~np.isnan(self.get_ratings()[positions])]
+            keys = self._keys(self.get_user_ids()[positions], self.get_movie_ids()[positions])
+            order = np.argsort(keys)
+            self._current = positions[order], keys[order]
+        return self._current
+
+    def has_ratings(self, user_ids) -> np.ndarray:
+        """
+        Checks which users have current ratings in the log.
+
+        Parameters
+        ----------
+        user_ids : array-like of int
+            Ids of the users.
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean mask of the users with current ratings in the log.
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64).reshape(-1)
+        if len(user_ids) == 1:
+            return np.array([self._user_counts.get(int(user_ids[0]), 0) > 0])
+        return np.isin(user_ids, self.get_user_ids()[self.get_current()])
+
+    def get_user_changes(self, user_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Parameters
+        ----------
+        user_id : int
+            Id of the user.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Ids of the movies changed by the user and positions of their
+            latest changes in the log.
+        """
+        return self._changes(self._by_user.get(int(user_id), {}))
+
+    def get_movie_changes(self, movie_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Parameters
+        ----------
+        movie_id : int
+            Id of the movie.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Ids of the users who changed ratings of the movie and positions
+            of their latest changes in the log.
+        """
+        return self._changes(self._by_movie.get(int(movie_id), {}))
+
+    @staticmethod
+    def _changes(latest: Dict[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Converts a dictionary of the latest changes into arrays of ids and positions."""
+        ids = np.fromiter(latest, dtype=np.int64, count=len(latest))
+        return ids, np.fromiter(latest.values(), dtype=np.int64, count=len(latest))
+
+    def get_user_ids(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Id of the user of each change.
+        """
+        return self._arrays['user_ids'][:self._size]
+
+    def get_movie_ids(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Id of the movie of each change.
+        """
+        return self._arrays['movie_ids'][:self._size]
+
+    def get_ratings(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            New rating of each change (NaN for deleted ratings).
+        """
+        return self._arrays['ratings'][:self._size]
+
+    def get_timestamps(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Timestamp of each change.
+        """
+        return self._arrays['timestamps'][:self._size]
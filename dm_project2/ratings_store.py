@@ -0,0 +1,556 @@
+import numpy as np
+from typing import Dict, Iterable, List, Optional, TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class RatingsStore:
+    """
+    Compact, array-based representation of the `ratings` table of the
+    Movie Lens dataset, indexed both by user and by movie.
+
+    Users and movies are assigned dense indices (in the order of increasing
+    ids). Ratings are stored in CSR order (grouped by user, then ordered by
+    movie) with offsets of each user's slice, and additionally in CSC order
+    (grouped by movie, then ordered by user) with offsets of each movie's
+    slice. Therefore, retrieving all ratings of a user or of a movie costs
+    time proportional to the size of the slice rather than of the table.
+
+    All data is kept in plain NumPy arrays (see `ARRAYS`), which makes it
+    possible to memory-map the store from disk and share it between many
+    processes through the OS page cache.
+
+    Parameters
+    ----------
+    arrays : Dict[str, numpy.ndarray]
+        Arrays of the store (as returned by `to_arrays`).
+    """
+
+    ARRAYS: Tuple[str, ...] = (
+        'user_ids', 'movie_ids', 'user_lookup', 'movie_lookup',
+        'user_offsets', 'movie_index', 'ratings', 'timestamps',
+        'movie_offsets', 'csc_user_index', 'csc_ratings', 'csc_positions'
+    )
+    """Names of the arrays comprising the store."""
+
+    _arrays: Dict[str, np.ndarray]
+
+    def __init__(self, arrays: Dict[str, np.ndarray]) -> None:
+        missing = [name for name in self.ARRAYS if name not in arrays]
+        if missing:
+            raise ValueError(f'Missing arrays of the ratings store: {", ".join(missing)}.')
+        self._arrays = {name: arrays[name] for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(
+        cls,
+        users: np.ndarray,
+        movies: np.ndarray,
+        ratings: np.ndarray,
+        timestamps: Optional[np.ndarray] = None
+    ) -> "RatingsStore":
+        """
+        Builds the store from the columns of a `ratings` table. The rows
+        are sorted only if they are not already ordered by user and movie
+        (as in the files of the Movie Lens dataset), and dense indices are
+        assigned through lookup arrays rather than by sorting the ids.
+
+        Parameters
+        ----------
+        users : numpy.ndarray
+            Id of the user of each rating.
+
+        movies : numpy.ndarray
+            Id of the movie of each rating.
+
+        ratings : numpy.ndarray
+            Value of each rating.
+
+        timestamps : numpy.ndarray, optional
+            Timestamp of each rating (stored as 0 if not given).
+
+        Returns
+        -------
+        RatingsStore
+            Store containing the ratings.
+        """
+        users = np.asarray(users, dtype=np.int32)
+        movies = np.asarray(movies, dtype=np.int32)
+        ratings = np.asarray(ratings, dtype=np.float32)
+        timestamps = np.asarray(timestamps, dtype=np.int32) if timestamps is not None else np.zeros(len(users), dtype=np.int32)
+        if not cls._is_sorted(users, movies):
+            order = np.lexsort((movies, users))
+            users, movies, ratings, timestamps = users[order], movies[order], ratings[order], timestamps[order]
+
+        user_offsets = np.zeros(1, dtype=np.int64)
+        if len(users):
+            user_offsets = np.concatenate([[0], np.flatnonzero(users[1:] != users[:-1]) + 1, [len(users)]]).astype(np.int64)
+        user_ids = users[user_offsets[:-1]]
+        user_index = np.repeat(np.arange(len(user_ids), dtype=np.int32), np.diff(user_offsets))
+        present = np.zeros(int(movies.max()) + 1 if len(movies) else 0, dtype=bool)
+        present[movies] = True
+        movie_ids = np.flatnonzero(present).astype(np.int32)
+        movie_lookup = cls._lookup(movie_ids)
+        movie_index = movie_lookup[movies]
+
+        csc_positions = np.argsort(movie_index, kind='stable').astype(np.int32)
+        return cls({
+            'user_ids': user_ids,
+            'movie_ids': movie_ids,
+            'user_lookup': cls._lookup(user_ids),
+            'movie_lookup': movie_lookup,
+            'user_offsets': user_offsets,
+            'movie_index': movie_index,
+            'ratings': ratings,
+            'timestamps': timestamps,
+            'movie_offsets': cls._offsets(movie_index, len(movie_ids)),
+            'csc_user_index': user_index[csc_positions],
+            'csc_ratings': ratings[csc_positions],
+            'csc_positions': csc_positions
+        })
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable["pd.DataFrame"]) -> "RatingsStore":
+        """
+        Builds the store from a `ratings` table parsed in chunks (e.g. by
+        `cache.read_csv_chunks`), keeping only the narrow columns of the
+        chunks instead of the whole parsed table.
+
+        Parameters
+        ----------
+        chunks : Iterable[pandas.DataFrame]
+            Consecutive chunks of the table, with columns `userId`,
+            `movieId`, `rating` and (optionally) `timestamp`.
+
+        Returns
+        -------
+        RatingsStore
+            Store containing the ratings of all chunks.
+        """
+        dtypes = {'userId': np.int32, 'movieId': np.int32, 'rating': np.float32, 'timestamp': np.int32}
+        parts: Dict[str, List[np.ndarray]] = {column: [] for column in dtypes}
+        for chunk in chunks:
+            for column, dtype in dtypes.items():
+                if column in chunk.columns:
+                    parts[column].append(chunk[column].to_numpy(dtype=dtype))
+        columns = {}
+        for column, dtype in dtypes.items():
+            # Parts are released as soon as a column is concatenated.
+            values = parts.pop(column)
+            columns[column] = np.concatenate(values) if values else np.empty(0, dtype=dtype)
+        if len(columns['timestamp']) != len(columns['userId']):
+            columns['timestamp'] = None
+        return cls.from_arrays(columns['userId'], columns['movieId'], columns['rating'], columns['timestamp'])
+
+    @classmethod
+    def from_frame(cls, ratings: "pd.DataFrame") -> "RatingsStore":
+        """
+        Builds the store from a `ratings` table.
+
+        Parameters
+        ----------
+        ratings : pandas.DataFrame
+            Table of ratings indexed by (`userId`, `movieId`), with
+            columns `rating` and (optionally) `timestamp`; missing
+            timestamps are stored as 0.
+
+        Returns
+        -------
+        RatingsStore
+            Store containing the same ratings.
+        """
+        return cls.from_arrays(
+            ratings.index.get_level_values('userId').to_numpy(),
+            ratings.index.get_level_values('movieId').to_numpy(),
+            ratings['rating'].to_numpy(),
+            ratings['timestamp'].to_numpy() if 'timestamp' in ratings.columns else None
+        )
+
+    def select(self, keep: np.ndarray) -> "RatingsStore":
+        """
+        Derives the store of a subset of the ratings (e.g. after some of
+        them have been deleted) without sorting anything: the rows and the
+        CSC permutation are filtered by a mask, and dense indices of the
+        users and movies left without ratings are removed. The result is
+        identical to the store built from the kept ratings.
+
+        Parameters
+        ----------
+        keep : numpy.ndarray
+            Boolean mask of the kept ratings (in the CSR order).
+
+        Returns
+        -------
+        RatingsStore
+            Store containing only the kept ratings.
+        """
+        arrays = self._arrays
+        keep = np.asarray(keep, dtype=bool)
+        # New position of each row (in the CSR order) is the number of kept rows before it.
+        kept_before = np.zeros(len(keep) + 1, dtype=np.int64)
+        np.cumsum(keep, out=kept_before[1:])
+        user_counts = np.diff(kept_before[arrays['user_offsets']])
+        users_kept = user_counts > 0
+        user_remap = (np.cumsum(users_kept) - 1).astype(np.int32)
+
+        movie_index = arrays['movie_index'][keep]
+        movie_counts = np.bincount(movie_index, minlength=len(arrays['movie_ids']))
+        movies_kept = movie_counts > 0
+        movie_remap = (np.cumsum(movies_kept) - 1).astype(np.int32)
+
+        csc_keep = keep[arrays['csc_positions']]
+        user_ids = arrays['user_ids'][users_kept]
+        movie_ids = arrays['movie_ids'][movies_kept]
+        return RatingsStore({
+            'user_ids': user_ids,
+            'movie_ids': movie_ids,
+            'user_lookup': self._lookup(user_ids),
+            'movie_lookup': self._lookup(movie_ids),
+            'user_offsets': np.append(0, np.cumsum(user_counts[users_kept])).astype(np.int64),
+            'movie_index': movie_remap[movie_index],
+            'ratings': arrays['ratings'][keep],
+            'timestamps': arrays['timestamps'][keep],
+            'movie_offsets': np.append(0, np.cumsum(movie_counts[movies_kept])).astype(np.int64),
+            'csc_user_index': user_remap[arrays['csc_user_index'][csc_keep]],
+            'csc_ratings': arrays['csc_ratings'][csc_keep],
+            'csc_positions': kept_before[arrays['csc_positions'][csc_keep]].astype(np.int32)
+        })
+
+    @staticmethod
+    def _is_sorted(users: np.ndarray, movies: np.ndarray) -> bool:
+        """Checks whether rows are ordered by user, then by movie."""
+        user_steps = np.diff(users)
+        return bool((user_steps >= 0).all() and ((user_steps > 0) | (np.diff(movies) > 0)).all())
+
+    @staticmethod
+    def _lookup(ids: np.ndarray) -> np.ndarray:
+        """Creates an array mapping ids to dense indices (-1 for unknown ids)."""
+        lookup = np.full(int(ids[-1]) + 1 if len(ids) else 0, -1, dtype=np.int32)
+        lookup[ids] = np.arange(len(ids), dtype=np.int32)
+        return lookup
+
+    @staticmethod
+    def _offsets(index: np.ndarray, size: int) -> np.ndarray:
+        """Creates an array of offsets of consecutive slices of a sorted index."""
+        offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(index, minlength=size), out=offsets[1:])
+        return offsets
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Arrays comprising the store.
+        """
+        return dict(self._arrays)
+
+    def __len__(self) -> int:
+        return len(self._arrays['ratings'])
+
+    def get_user_ids(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Sorted ids of all users (the position of an id is its dense index).
+        """
+        return self._arrays['user_ids']
+
+    def get_movie_ids(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Sorted ids of all rated movies (the position of an id is its dense index).
+        """
+        return self._arrays['movie_ids']
+
+    def get_user_offsets(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Offsets of the slices of consecutive users in the CSR order.
+        """
+        return self._arrays['user_offsets']
+
+    def get_movie_offsets(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Offsets of the slices of consecutive movies in the CSC order.
+        """
+        return self._arrays['movie_offsets']
+
+    def get_rated_movies(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Dense index of the rated movie for each rating (in the CSR order).
+        """
+        return self._arrays['movie_index']
+
+    def get_ratings(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Values of all ratings (in the CSR order).
+        """
+        return self._arrays['ratings']
+
+    def get_timestamps(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Timestamps of all ratings (in the CSR order).
+        """
+        return self._arrays['timestamps']
+
+    def get_pairs(self, positions) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Provides the users and the movies of ratings at given positions.
+
+        Parameters
+        ----------
+        positions : array-like of int
+            Positions of the ratings (in the CSR order).
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Ids of the users and ids of the movies of the ratings.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        users = np.searchsorted(self._arrays['user_offsets'], positions, side='right') - 1
+        return self._arrays['user_ids'][users], self._arrays['movie_ids'][self._arrays['movie_index'][positions]]
+
+    def get_rows(self, positions) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Provides the users, the movies and the values of ratings at given positions.
+
+        Parameters
+        ----------
+        positions : array-like of int
+            Positions of the ratings (in the CSR order).
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+            Ids of the users, ids of the movies and values of the ratings.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        user_ids, movie_ids = self.get_pairs(positions)
+        return user_ids, movie_ids, self._arrays['ratings'][positions]
+
+    def positions(self, user_ids, movie_ids) -> np.ndarray:
+        """
+        Finds the positions of ratings given by users to movies, with a
+        binary search within the slice of each user (vectorized over the pairs).
+
+        Parameters
+        ----------
+        user_ids : array-like of int
+            Ids of the users.
+
+        movie_ids : array-like of int
+            Ids of the movies (one for each user id).
+
+        Returns
+        -------
+        numpy.ndarray
+            Position of each rating in the CSR order (-1 for pairs without a rating).
+        """
+        rows, found = self.insertion_points(user_ids, movie_ids)
+        return np.where(found, rows, -1)
+
+    def insertion_points(self, user_ids, movie_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds where ratings given by users to movies are or would be in
+        the CSR order, with a binary search within the slice of each user
+        (vectorized over the pairs).
+
+        Parameters
+        ----------
+        user_ids : array-like of int
+            Ids of the users (not necessarily in the store).
+
+        movie_ids : array-like of int
+            Ids of the movies (one for each user id).
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Number of ratings preceding each pair in the CSR order and
+            whether the store contains the rating of the pair.
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64).reshape(-1)
+        movie_ids = np.asarray(movie_ids, dtype=np.int64).reshape(-1)
+        ids, offsets = self._arrays['user_ids'], self._arrays['user_offsets']
+        users = np.searchsorted(ids, user_ids)
+        known = users < len(ids)
+        known[known] = ids[users[known]] == user_ids[known]
+        low = offsets[users]
+        high = np.where(known, offsets[np.minimum(users + 1, len(ids))], low)
+        end = high.copy()
+        movie_index, rated_ids = self._arrays['movie_index'], self._arrays['movie_ids']
+        if len(user_ids) == 1:
+            # A single pair is searched within the slice of the user at once.
+            low = low + np.searchsorted(rated_ids[movie_index[low[0]:high[0]]], movie_ids)
+            high = low
+        # Movies of a user are sorted by id within the user's slice.
+        while True:
+            searched = np.flatnonzero(low < high)
+            if not len(searched):
+                break
+            middle = (low[searched] + high[searched]) // 2
+            below = rated_ids[movie_index[middle]] < movie_ids[searched]
+            low[searched[below]] = middle[below] + 1
+            high[searched[~below]] = middle[~below]
+        found = low < end
+        found[found] = rated_ids[movie_index[low[found]]] == movie_ids[found]
+        return low, found
+
+    def user_index(self, user_ids) -> np.ndarray:
+        """
+        Maps user ids to dense indices.
+
+        Parameters
+        ----------
+        user_ids : int or array-like of int
+            Ids of the users.
+
+        Returns
+        -------
+        numpy.ndarray
+            Dense indices of the users (-1 for users without ratings).
+        """
+        return self._index(self._arrays['user_lookup'], user_ids)
+
+    def movie_index(self, movie_ids) -> np.ndarray:
+        """
+        Maps movie ids to dense indices.
+
+        Parameters
+        ----------
+        movie_ids : int or array-like of int
+            Ids of the movies.
+
+        Returns
+        -------
+        numpy.ndarray
+            Dense indices of the movies (-1 for movies without ratings).
+        """
+        return self._index(self._arrays['movie_lookup'], movie_ids)
+
+    @staticmethod
+    def _index(lookup: np.ndarray, ids) -> np.ndarray:
+        """Maps ids to dense indices using a lookup array."""
+        ids = np.asarray(ids, dtype=np.int64)
+        known = (ids >= 0) & (ids < len(lookup))
+        index = np.full(ids.shape, -1, dtype=np.int32)
+        index[known] = lookup[ids[known]]
+        return index
+
+    def get_user_ratings(self, user_id: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Provides all ratings given by a user.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user in the Movie Lens dataset.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+            Ids of the rated movies, values of the ratings and their timestamps
+            (all empty if the user has no ratings).
+        """
+        index = int(self.user_index(user_id))
+        if index < 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int32)
+        start, end = self._arrays['user_offsets'][index:index + 2]
+        return (
+            self._arrays['movie_ids'][self._arrays['movie_index'][start:end]],
+            self._arrays['ratings'][start:end],
+            self._arrays['timestamps'][start:end]
+        )
+
+    def get_movie_ratings(self, movie_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Provides all ratings of a movie.
+
+        Parameters
+        ----------
+        movie_id : int
+            Id of the movie in the Movie Lens dataset.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Ids of the users who rated the movie and values of the ratings
+            (both empty if the movie has no ratings).
+        """
+        index = int(self.movie_index(movie_id))
+        if index < 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        start, end = self._arrays['movie_offsets'][index:index + 2]
+        return (
+            self._arrays['user_ids'][self._arrays['csc_user_index'][start:end]],
+            self._arrays['csc_ratings'][start:end]
+        )
+
+
+def merge_user_rows(
+    user_ids: np.ndarray,
+    user_offsets: np.ndarray,
+    rows: Dict[str, np.ndarray],
+    overrides: Dict[int, Dict[str, np.ndarray]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Replaces all rows of some users in arrays of rows grouped by user
+    (ordered by user id, with offsets of each user's slice).
+
+    Parameters
+    ----------
+    user_ids : numpy.ndarray
+        Sorted ids of the users having rows.
+
+    user_offsets : numpy.ndarray
+        Offsets of the slices of consecutive users.
+
+    rows : Dict[str, numpy.ndarray]
+        Arrays of the values of the rows (all of the same length).
+
+    overrides : Dict[int, Dict[str, numpy.ndarray]]
+        New rows of each of the users to be replaced (with the same
+        arrays as `rows`; the users may be absent from `user_ids`).
+
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, Dict[str, numpy.ndarray]]
+        Ids of the users having rows, the lookup array mapping the ids to
+        dense indices, the offsets of the users' slices and the arrays of rows.
+    """
+    row_users = np.repeat(user_ids, np.diff(user_offsets))
+    keep = ~np.isin(row_users, np.fromiter(overrides, dtype=np.int64, count=len(overrides)))
+    override_users = [
+        np.full(len(next(iter(user_rows.values()))), user_id, dtype=user_ids.dtype)
+        for user_id, user_rows in overrides.items()
+    ]
+    row_users = np.concatenate([row_users[keep], *override_users])
+    order = np.argsort(row_users, kind='stable')
+    merged = {
+        name: np.concatenate([values[keep], *(user_rows[name] for user_rows in overrides.values())])[order]
+        for name, values in rows.items()
+    }
+    row_users = row_users[order]
+    merged_user_ids = np.unique(row_users)
+    offsets = np.append(np.searchsorted(row_users, merged_user_ids), len(row_users)).astype(np.int64)
+    return merged_user_ids, RatingsStore._lookup(merged_user_ids), offsets, merged
@@ -0,0 +1,306 @@
+import numpy as np
+from .ratings_log import RatingsLog
+from .ratings_store import RatingsStore
+from typing import Dict, Optional, Tuple
+
+
+class RatingsView(RatingsStore):
+    """
+    Current ratings of a dataset: a store of the ratings loaded once (the
+    base store, e.g. memory-mapped from the cache) with an overlay of the
+    later changes, i.e. a mask of the deleted rows of the base store and
+    a log of the added and changed ratings (see `RatingsLog`). The rating
+    of a pair is either in a row of the base store which is not deleted or
+    in the log, as the row of a pair is marked deleted when the pair is
+    first changed in the log.
+
+    Changes only update the overlay. The number of ratings, the ratings
+    of a user or of a movie and the ratings at given positions (e.g. of a
+    random sample) are computed from the base store and the overlay, so
+    no store is derived after a change. The arrays of the store (see
+    `to_arrays` and the accessors of whole arrays), which are needed only
+    by consumers reading all ratings anyway, are derived on their first
+    use after a change and kept until the next one.
+
+    Parameters
+    ----------
+    base : RatingsStore
+        Store of the ratings before any changes.
+    """
+
+    _base: RatingsStore
+    _deleted: Optional[np.ndarray]
+    _user_deleted: Optional[np.ndarray]
+    _n_deleted: int
+    _log: RatingsLog
+    _derived: Optional[RatingsStore]
+
+    def __init__(self, base: RatingsStore) -> None:
+        self._base = base
+        self._deleted = None
+        self._user_deleted = None
+        self._n_deleted = 0
+        self._log = RatingsLog()
+        self._derived = None
+
+    @property
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return self._derive()._arrays
+
+    def _derive(self) -> RatingsStore:
+        """Provides the store of the current ratings, deriving it only on the first use after a change."""
+        if self._derived is None:
+            if self._log.get_count():
+                self._derived = self._merge()
+            elif self._deleted is not None:
+                self._derived = self._base.select(~self._deleted)
+            else:
+                self._derived = self._base
+        return self._derived
+
+    def _merge(self) -> RatingsStore:
+        """Builds the store of the rows of the base store which are not deleted and the current ratings of the log."""
+        rows = self._kept_rows()
+        changes = self._log.get_current()
+        in_log = np.zeros(len(rows) + len(changes), dtype=bool)
+        in_log[self._change_positions(changes)] = True
+        columns = []
+        for base_values, log_values in zip(self._base.get_rows(rows), (
+            self._log.get_user_ids(), self._log.get_movie_ids(), self._log.get_ratings()
+        )):
+            values = np.empty(len(in_log), dtype=base_values.dtype)
+            values[~in_log] = base_values
+            values[in_log] = log_values[changes]
+            columns.append(values)
+        timestamps = np.empty(len(in_log), dtype=np.int32)
+        timestamps[~in_log] = self._base.get_timestamps()[rows]
+        timestamps[in_log] = self._log.get_timestamps()[changes]
+        # The rows are already in the CSR order, so they are not sorted again.
+        return RatingsStore.from_arrays(*columns, timestamps)
+
+    def _kept_rows(self) -> np.ndarray:
+        """Provides the rows of the base store which are not deleted."""
+        return np.arange(len(self._base)) if self._deleted is None else np.flatnonzero(~self._deleted)
+
+    def _change_positions(self, changes: np.ndarray) -> np.ndarray:
+        """Finds the positions in the CSR order of the current ratings of changes of the log (sorted by user and movie)."""
+        rows, _ = self._base.insertion_points(self._log.get_user_ids()[changes], self._log.get_movie_ids()[changes])
+        if self._deleted is not None:
+            deleted_before = np.zeros(len(self._deleted) + 1, dtype=np.int64)
+            np.cumsum(self._deleted, out=deleted_before[1:])
+            rows = rows - deleted_before[rows]
+        return rows + np.arange(len(changes))
+
+    def get_base(self) -> RatingsStore:
+        """
+        Returns
+        -------
+        RatingsStore
+            Store of the ratings before any changes.
+        """
+        return self._base
+
+    def __len__(self) -> int:
+        return len(self._base) - self._n_deleted + self._log.get_count()
+
+    def get_rows(self, positions) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1)
+        if self._derived is not None:
+            return self._derived.get_rows(positions)
+        changes = self._log.get_current()
+        change_positions = self._change_positions(changes)
+        # Number of changes of the log preceding each position.
+        preceding = np.searchsorted(change_positions, positions)
+        in_log = preceding < len(changes)
+        in_log[in_log] = change_positions[preceding[in_log]] == positions[in_log]
+        rows = positions[~in_log] - preceding[~in_log]
+        if self._deleted is not None:
+            rows = self._kept_rows()[rows]
+        columns = []
+        for base_values, log_values in zip(self._base.get_rows(rows), (
+            self._log.get_user_ids(), self._log.get_movie_ids(), self._log.get_ratings()
+        )):
+            values = np.empty(len(positions), dtype=base_values.dtype)
+            values[~in_log] = base_values
+            values[in_log] = log_values[changes[preceding[in_log]]]
+            columns.append(values)
+        return columns[0], columns[1], columns[2]
+
+    def get_pairs(self, positions) -> Tuple[np.ndarray, np.ndarray]:
+        user_ids, movie_ids, _ = self.get_rows(positions)
+        return user_ids, movie_ids
+
+    def get_user_ratings(self, user_id: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        movie_ids, ratings, timestamps = self._base.get_user_ratings(user_id)
+        if self._deleted is not None and len(movie_ids):
+            start = self._base.get_user_offsets()[self._base.user_index(user_id)]
+            kept = ~self._deleted[start:start + len(movie_ids)]
+            movie_ids, ratings, timestamps = movie_ids[kept], ratings[kept], timestamps[kept]
+        changed, changes = self._log.get_user_changes(user_id)
+        current = ~np.isnan(self._log.get_ratings()[changes])
+        if not current.any():
+            return movie_ids, ratings, timestamps
+        changed, changes = changed[current], changes[current]
+        order = np.argsort(np.concatenate([movie_ids, changed]), kind='stable')
+        return (
+            np.concatenate([movie_ids, changed.astype(movie_ids.dtype)])[order],
+            np.concatenate([ratings, self._log.get_ratings()[changes]])[order],
+            np.concatenate([timestamps, self._log.get_timestamps()[changes]])[order]
+        )
+
+    def get_movie_ratings(self, movie_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        index = int(self._base.movie_index(movie_id))
+        user_ids, ratings = self._base.get_movie_ratings(movie_id)
+        if self._deleted is not None and index >= 0:
+            start, end = self._base.get_movie_offsets()[index:index + 2]
+            kept = ~self._deleted[self._base.to_arrays()['csc_positions'][start:end]]
+            user_ids, ratings = user_ids[kept], ratings[kept]
+        changed, changes = self._log.get_movie_changes(movie_id)
+        current = ~np.isnan(self._log.get_ratings()[changes])
+        if not current.any():
+            return user_ids, ratings
+        changed, changes = changed[current], changes[current]
+        order = np.argsort(np.concatenate([user_ids, changed]), kind='stable')
+        return (
+            np.concatenate([user_ids, changed.astype(user_ids.dtype)])[order],
+            np.concatenate([ratings, self._log.get_ratings()[changes]])[order]
+        )
+
+    def has_ratings(self, user_ids) -> np.ndarray:
+        """
+        Checks which users have current ratings (vectorized over the users).
+
+        Parameters
+        ----------
+        user_ids : array-like of int
+            Ids of the users.
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean mask of the users with ratings.
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64).reshape(-1)
+        users = self._base.user_index(user_ids)
+        exists = users >= 0
+        if self._user_deleted is not None:
+            offsets, users = self._base.get_user_offsets(), users[exists]
+            exists[exists] = offsets[users + 1] - offsets[users] > self._user_deleted[users]
+        if self._log.get_count():
+            exists |= self._log.has_ratings(user_ids)
+        return exists
+
+    def find(self, user_ids, movie_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the current ratings of pairs (vectorized over the pairs).
+
+        Parameters
+        ----------
+        user_ids : array-like of int
+            Ids of the users.
+
+        movie_ids : array-like of int
+            Ids of the movies (one for each user id).
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Rows of the base store which are not deleted and positions of
+            the changes in the log which have not deleted the ratings (-1
+            where the rating is not there; a rating is in one of them at most).
+        """
+        rows = self._base.positions(user_ids, movie_ids)
+        if self._deleted is not None:
+            found = np.flatnonzero(rows >= 0)
+            rows[found[self._deleted[rows[found]]]] = -1
+        changes = self._log.positions(user_ids, movie_ids) if self._log.get_count() else np.full(len(rows), -1)
+        return rows, changes
+
+    def set_rating(self, user_id: int, movie_id: int, rating: float, timestamp: int) -> Optional[float]:
+        """
+        Adds or replaces a rating.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user.
+
+        movie_id : int
+            Id of the movie.
+
+        rating : float
+            New rating.
+
+        timestamp : int
+            Time of the rating in seconds since the epoch.
+
+        Returns
+        -------
+        float, optional
+            Replaced rating (`None` if the rating has been added).
+        """
+        rows, changes = self.find([user_id], [movie_id])
+        if rows[0] >= 0:
+            previous = float(self._base.get_ratings()[rows[0]])
+            # The rating in the base store is superseded by the one in the log.
+            self._mark_deleted(rows)
+        elif changes[0] >= 0:
+            previous = float(self._log.get_ratings()[changes[0]])
+        else:
+            previous = None
+        self._log.append(user_id, movie_id, rating, timestamp)
+        self._derived = None
+        return previous
+
+    def delete(self, user_ids: np.ndarray, movie_ids: np.ndarray, timestamp: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Deletes the current ratings of pairs (skipping repeated pairs).
+        Rows of the base store are marked as deleted and ratings in the
+        log are deleted by appending changes to it.
+
+        Parameters
+        ----------
+        user_ids : numpy.ndarray
+            Ids of the users.
+
+        movie_ids : numpy.ndarray
+            Ids of the movies (one for each user id).
+
+        timestamp : int
+            Time of the deletion in seconds since the epoch.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Boolean mask of the pairs whose ratings were deleted and the
+            deleted ratings (in the order of those pairs).
+        """
+        rows, changes = self.find(user_ids, movie_ids)
+        # Each rating is identified by its row of the base store or by its change in the log.
+        keys = np.where(rows >= 0, rows, -2 - changes)
+        _, first = np.unique(keys, return_index=True)
+        deleted = np.zeros(len(keys), dtype=bool)
+        deleted[first] = True
+        deleted &= keys != -1
+        rows, changes = rows[deleted], changes[deleted]
+        in_base = rows >= 0
+        ratings = np.empty(len(rows), dtype=np.float32)
+        ratings[in_base] = self._base.get_ratings()[rows[in_base]]
+        ratings[~in_base] = self._log.get_ratings()[changes[~in_base]]
+        self._mark_deleted(rows[in_base])
+        for user_id, movie_id in zip(user_ids[deleted][~in_base].tolist(), movie_ids[deleted][~in_base].tolist()):
+            self._log.append(user_id, movie_id, None, timestamp)
+        if len(rows):
+            self._derived = None
+        return deleted, ratings
+
+    def _mark_deleted(self, rows: np.ndarray) -> None:
+        """Marks (distinct) rows of the base store as deleted, allocating the mask on the first deletion."""
+        if not len(rows):
+            return
+        if self._deleted is None:
+            self._deleted = np.zeros(len(self._base), dtype=bool)
+            self._user_deleted = np.zeros(len(self._base.get_user_ids()), dtype=np.int64)
+        self._deleted[rows] = True
+        np.add.at(self._user_deleted, np.searchsorted(self._base.get_user_offsets(), rows, side='right') - 1, 1)
+        self._n_deleted += len(rows)
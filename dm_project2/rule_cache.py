@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+
+class RuleCache:
+    """
+    Bounded cache of association rules mined for users, with the least
+    recently used entries evicted first.
+
+    Entries are keyed by tuples whose first element is the id of the user
+    (e.g. `(user_id, threshold_itemsets, threshold_rules)`), so that all
+    entries of a user can be invalidated when the user's ratings change.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Memory budget of the cache, i.e. the maximal total size of the
+        cached entries in bytes (default 64 MiB). A budget of 0 disables
+        caching.
+    """
+
+    _max_bytes: int
+    _nbytes: int
+    _entries: "OrderedDict[Tuple, Tuple[Any, int]]"
+    _user_keys: Dict[Hashable, Set[Tuple]]
+    _hits: int
+    _misses: int
+
+    def __init__(self, max_bytes: int = 64 * 2 ** 20) -> None:
+        if max_bytes < 0:
+            raise ValueError('Memory budget of the cache should be nonnegative.')
+        self._max_bytes = max_bytes
+        self._nbytes = 0
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """
+        Retrieves a cached entry and marks it as recently used.
+
+        Parameters
+        ----------
+        key : Tuple
+            Key of the entry (starting with the id of the user).
+
+        Returns
+        -------
+        Any, optional
+            Cached value, or `None` if there is no such entry.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Tuple, value: Any, nbytes: int) -> None:
+        """
+        Stores an entry in the cache, evicting the least recently used
+        entries if the memory budget would be exceeded. Entries larger
+        than the whole budget are not stored.
+
+        Parameters
+        ----------
+        key : Tuple
+            Key of the entry (starting with the id of the user).
+
+        value : Any
+            Value to be cached.
+
+        nbytes : int
+            (Estimated) size of the value in bytes.
+        """
+        self._remove(key)
+        if nbytes > self._max_bytes:
+            return
+        while self._nbytes + nbytes > self._max_bytes:
+            self._remove(next(iter(self._entries)))
+        self._entries[key] = (value, nbytes)
+        self._user_keys.setdefault(key[0], set()).add(key)
+        self._nbytes += nbytes
+
+    def invalidate(self, user_id: Hashable) -> int:
+        """
+        Removes all entries of a user.
+
+        Parameters
+        ----------
+        user_id : Hashable
+            Id of the user whose entries should be removed.
+
+        Returns
+        -------
+        int
+            Number of removed entries.
+        """
+        keys = list(self._user_keys.get(user_id, ()))
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        """Removes all entries (the hit and miss counters are retained)."""
+        self._entries.clear()
+        self._user_keys.clear()
+        self._nbytes = 0
+
+    def _remove(self, key: Tuple) -> None:
+        """Removes an entry (if present)."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._nbytes -= entry[1]
+        user_keys = self._user_keys[key[0]]
+        user_keys.discard(key)
+        if not user_keys:
+            del self._user_keys[key[0]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_max_bytes(self) -> int:
+        """
+        Returns
+        -------
+        int
+            Memory budget of the cache in bytes.
+        """
+        return self._max_bytes
+
+    def get_nbytes(self) -> int:
+        """
+        Returns
+        -------
+        int
+            Total size of the cached entries in bytes.
+        """
+        return self._nbytes
+
+    def get_hits(self) -> int:
+        """
+        Returns
+        -------
+        int
+            Number of lookups which found a cached entry.
+        """
+        return self._hits
+
+    def get_misses(self) -> int:
+        """
+        Returns
+        -------
+        int
+            Number of lookups which did not find a cached entry.
+        """
+        return self._misses
@@ -0,0 +1,185 @@
+import numpy as np
+from .rating_cube import RULE_METRICS
+from typing import Dict, List, Sequence, TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class RuleTable:
+    """
+    Association rules predicting the rating (genres -> rating) compiled
+    into a struct of arrays: genre bitmask of the antecedent of each rule
+    (`antecedents`), rating value of its consequent (`consequents`) and
+    one column for each of `RULE_METRICS`.
+
+    A rule applies to a movie when its antecedent is a subset of the
+    movie's genres, i.e. `(antecedent & ~genre_mask) == 0`, so the rules
+    are matched against many movies at once with bitwise operations over
+    the whole table, and the weighted means of the ratings of the
+    matching rules are matrix products (see `predict`).
+
+    Parameters
+    ----------
+    arrays : Dict[str, numpy.ndarray]
+        Arrays of the table (as returned by `to_arrays`).
+    """
+
+    ARRAYS: Tuple[str, ...] = ('antecedents', 'consequents', *RULE_METRICS)
+    """Names of the arrays comprising the table."""
+
+    _arrays: Dict[str, np.ndarray]
+
+    def __init__(self, arrays: Dict[str, np.ndarray]) -> None:
+        missing = [name for name in self.ARRAYS if name not in arrays]
+        if missing:
+            raise ValueError(f'Missing arrays of the rule table: {", ".join(missing)}.')
+        self._arrays = {name: arrays[name] for name in self.ARRAYS}
+
+    @classmethod
+    def empty(cls) -> "RuleTable":
+        """
+        Returns
+        -------
+        RuleTable
+            Table containing no rules.
+        """
+        arrays = {'antecedents': np.empty(0, dtype=np.uint32), 'consequents': np.empty(0, dtype=np.float32)}
+        arrays.update({metric: np.empty(0) for metric in RULE_METRICS})
+        return cls(arrays)
+
+    @classmethod
+    def from_frame(cls, rules: "pd.DataFrame", genres: List[str]) -> "RuleTable":
+        """
+        Compiles rules mined as a data frame (see `MiningEngine.mine`).
+        Each distinct itemset is encoded only once; rules with antecedents
+        other than genres are skipped, as they never apply to any movie.
+
+        Parameters
+        ----------
+        rules : pandas.DataFrame
+            Rules with columns `antecedents`, `consequents` (frozensets
+            of item names, ratings named `rating_<value>`) and one column
+            for each of `RULE_METRICS`.
+
+        genres : List[str]
+            Names of the genres, in the order of the bits of genre masks.
+
+        Returns
+        -------
+        RuleTable
+            Compiled rules.
+        """
+        bits = {genre: 1 << position for position, genre in enumerate(genres)}
+        # Antecedents with items which are not genres are encoded as -1.
+        codes: Dict[frozenset, int] = {}
+        for itemset in rules['antecedents'].unique():
+            codes[itemset] = sum(bits[item] for item in itemset) if all(item in bits for item in itemset) else -1
+        ratings: Dict[frozenset, float] = {}
+        for itemset in rules['consequents'].unique():
+            ratings[itemset] = float(next(iter(itemset)).split('_')[1])
+
+        antecedents = np.fromiter((codes[itemset] for itemset in rules['antecedents']), dtype=np.int64, count=len(rules))
+        kept = antecedents >= 0
+        arrays = {
+            'antecedents': antecedents[kept].astype(np.uint32),
+            'consequents': np.fromiter((ratings[itemset] for itemset in rules['consequents']), dtype=np.float32, count=len(rules))[kept]
+        }
+        arrays.update({metric: rules[metric].to_numpy(dtype=np.float64)[kept] for metric in RULE_METRICS})
+        return cls(arrays)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Arrays comprising the table.
+        """
+        return dict(self._arrays)
+
+    def __len__(self) -> int:
+        return len(self._arrays['antecedents'])
+
+    def get_nbytes(self) -> int:
+        """
+        Returns
+        -------
+        int
+            Total size of the arrays of the table in bytes.
+        """
+        return sum(array.nbytes for array in self._arrays.values())
+
+    def get_antecedents(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Genre bitmask of the antecedent of each rule.
+        """
+        return self._arrays['antecedents']
+
+    def get_consequents(self) -> np.ndarray:
+        """
+        Returns
+        -------
+        numpy.ndarray
+            Rating of the consequent of each rule.
+        """
+        return self._arrays['consequents']
+
+    def get_weights(self, metrics: Sequence[str]) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        metrics : Sequence[str]
+            Names of metrics (see `RULE_METRICS`).
+
+        Returns
+        -------
+        numpy.ndarray
+            Values of the metrics, with a row for each rule and a column for each metric.
+        """
+        weights = np.empty((len(self), len(metrics)))
+        for column, metric in enumerate(metrics):
+            weights[:, column] = self._arrays[metric]
+        return weights
+
+    def match(self, genre_masks: np.ndarray) -> np.ndarray:
+        """
+        Matches all rules against movies.
+
+        Parameters
+        ----------
+        genre_masks : numpy.ndarray
+            Genre mask of each movie.
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean matrix with a row for each movie and a column for each
+            rule, telling whether the rule applies to the movie.
+        """
+        return (self._arrays['antecedents'][None, :] & ~np.asarray(genre_masks, dtype=np.uint32)[:, None]) == 0
+
+    def predict(self, genre_masks: np.ndarray, weighted_mean_metric: str) -> np.ndarray:
+        """
+        Computes predictions based on the rules for movies, i.e. the means
+        of the ratings of the matching rules weighted by a metric.
+
+        Parameters
+        ----------
+        genre_masks : numpy.ndarray
+            Genre mask of each movie.
+
+        weighted_mean_metric : str
+            Metric used as weights (see `RULE_METRICS`).
+
+        Returns
+        -------
+        numpy.ndarray
+            Prediction for each movie (NaN where no rule applies).
+        """
+        weights = self._arrays[weighted_mean_metric]
+        relevant = self.match(genre_masks)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (relevant @ (self._arrays['consequents'] * weights)) / (relevant @ weights)
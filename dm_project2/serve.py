@@ -0,0 +1,331 @@
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import Future
+from .dataset import PREDICTION_COLUMNS, MovieLensDataset
+from .preprocessing import MovieLensDatasetPreprocessor
+from .predict import Predictor, round_rating
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from typing import Dict, List, Optional, Tuple
+
+
+class LatencyStats:
+    """
+    Thread-safe counters of a prediction server: the number of requests,
+    errors and batches, the throughput, and percentiles of the latency of
+    recent requests.
+
+    Parameters
+    ----------
+    window : int, optional
+        Number of the most recent requests whose latencies are kept for
+        computing percentiles (default 100000).
+    """
+
+    _lock: threading.Lock
+    _latencies: deque
+    _requests: int
+    _errors: int
+    _batches: int
+    _started: float
+
+    def __init__(self, window: int = 100000) -> None:
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._requests = 0
+        self._errors = 0
+        self._batches = 0
+        self._started = time.perf_counter()
+
+    def record_request(self, latency: float, error: bool = False) -> None:
+        """
+        Records a handled request.
+
+        Parameters
+        ----------
+        latency : float
+            Time of handling the request in seconds.
+
+        error : bool, optional
+            Whether handling the request failed.
+        """
+        with self._lock:
+            self._requests += 1
+            self._errors += error
+            self._latencies.append(latency)
+
+    def record_batch(self) -> None:
+        """Records a batch of predictions."""
+        with self._lock:
+            self._batches += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Returns
+        -------
+        Dict[str, float]
+            Current values of the counters: `requests`, `errors`, `batches`,
+            `mean_batch_size`, `throughput` (requests per second since the
+            start), `p50_ms` and `p99_ms` (latency percentiles in milliseconds).
+        """
+        with self._lock:
+            latencies = np.array(self._latencies)
+            requests, errors, batches = self._requests, self._errors, self._batches
+        elapsed = time.perf_counter() - self._started
+        return {
+            'requests': requests,
+            'errors': errors,
+            'batches': batches,
+            'mean_batch_size': requests / batches if batches else 0.0,
+            'throughput': requests / elapsed if elapsed > 0 else 0.0,
+            'p50_ms': float(np.percentile(latencies, 50) * 1000) if len(latencies) else 0.0,
+            'p99_ms': float(np.percentile(latencies, 99) * 1000) if len(latencies) else 0.0
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into batches. Requests are
+    queued, and a single worker thread collects the requests arriving
+    within a short window after the first one (up to a maximal batch size)
+    and predicts them all with one call to `Predictor.predict_many`, which
+    groups them by user. As only the worker thread uses the predictor,
+    it does not need to be thread-safe.
+
+    Parameters
+    ----------
+    predictor : Predictor
+        Fitted predictor.
+
+    window : float, optional
+        Time in seconds for which requests are collected into a batch (default 2 ms).
+
+    max_batch : int, optional
+        Maximal number of requests in a batch (default 1024).
+
+    stats : LatencyStats, optional
+        Counters to which the batches are recorded.
+    """
+
+    _predictor: Predictor
+    _window: float
+    _max_batch: int
+    _stats: Optional[LatencyStats]
+    _queue: "queue.Queue[Optional[Tuple[int, int, Future]]]"
+    _thread: threading.Thread
+
+    def __init__(
+        self,
+        predictor: Predictor,
+        window: float = 0.002,
+        max_batch: int = 1024,
+        stats: Optional[LatencyStats] = None
+    ) -> None:
+        self._predictor = predictor
+        self._window = window
+        self._max_batch = max_batch
+        self._stats = stats
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id: int, movie_id: int) -> Future:
+        """
+        Queues a prediction request.
+
+        Parameters
+        ----------
+        user_id : int
+            Id of the user in the Movie Lens dataset.
+
+        movie_id : int
+            Id of the movie in the Movie Lens dataset.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Future of the prediction (not rounded).
+        """
+        future = Future()
+        self._queue.put((user_id, movie_id, future))
+        return future
+
+    def close(self) -> None:
+        """Stops the worker thread after the queued requests are handled."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        """Collects and predicts batches of requests until closed."""
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = time.perf_counter() + self._window
+            closed = False
+            while len(batch) < self._max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    closed = True
+                    break
+                batch.append(request)
+            self._predict(batch)
+            if closed:
+                return
+
+    def _predict(self, batch: List[Tuple[int, int, Future]]) -> None:
+        """Predicts a batch of requests, isolating the requests which fail."""
+        if self._stats is not None:
+            self._stats.record_batch()
+        try:
+            predictions = self._predictor.predict_many([user_id for user_id, _, _ in batch], [movie_id for _, movie_id, _ in batch])
+        except Exception:
+            # Some of the requests are invalid, so they are predicted one by one.
+            for user_id, movie_id, future in batch:
+                try:
+                    future.set_result(self._predictor.predict(user_id, movie_id))
+                except Exception as error:
+                    future.set_exception(error)
+            return
+        for (_, _, future), prediction in zip(batch, predictions.tolist()):
+            future.set_result(prediction)
+
+
+class PredictionRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handler of HTTP requests to the prediction server:
+    - `GET /predict?user_id=<user_id>&movie_id=<movie_id>` - predicts a rating,
+    - `GET /stats` - provides the counters of the server (see `LatencyStats`).
+    """
+
+    server: "PredictionServer"
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == '/predict':
+            self._predict(parse_qs(url.query))
+        elif url.path == '/stats':
+            self._respond(200, self.server.stats.snapshot())
+        else:
+            self._respond(404, {'error': f'Unknown path: {url.path}'})
+
+    def _predict(self, query: Dict[str, List[str]]) -> None:
+        """Handles a prediction request."""
+        started = time.perf_counter()
+        try:
+            user_id, movie_id = int(query['user_id'][0]), int(query['movie_id'][0])
+            if user_id <= 0 or movie_id <= 0:
+                raise ValueError('Ids should be positive integers.')
+        except (KeyError, ValueError):
+            self.server.stats.record_request(time.perf_counter() - started, error=True)
+            self._respond(400, {'error': 'Parameters user_id and movie_id should be positive integers.'})
+            return
+        try:
+            prediction = self.server.batcher.submit(user_id, movie_id).result()
+        except Exception as error:
+            self.server.stats.record_request(time.perf_counter() - started, error=True)
+            self._respond(400, {'error': str(error)})
+            return
+        if not np.isfinite(prediction):
+            self.server.stats.record_request(time.perf_counter() - started, error=True)
+            self._respond(400, {'error': f'There are no ratings of the user with userId={user_id}.'})
+            return
+        self.server.stats.record_request(time.perf_counter() - started)
+        self._respond(200, {'user_id': user_id, 'movie_id': movie_id, 'prediction': prediction, 'rounded': round_rating(prediction)})
+
+    def _respond(self, status: int, body: dict) -> None:
+        """Sends a JSON response."""
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args) -> None:
+        """Disables logging of each request."""
+
+
+class PredictionServer(ThreadingHTTPServer):
+    """
+    Local HTTP server keeping a fitted predictor in memory and serving
+    predictions, with concurrent requests coalesced into batches
+    (see `MicroBatcher`).
+
+    Parameters
+    ----------
+    address : Tuple[str, int]
+        Host and port on which the server listens (port 0 selects a free port).
+
+    predictor : Predictor
+        Fitted predictor.
+
+    window : float, optional
+        Time in seconds for which requests are collected into a batch.
+
+    max_batch : int, optional
+        Maximal number of requests in a batch.
+    """
+
+    daemon_threads = True
+
+    stats: LatencyStats
+    batcher: MicroBatcher
+
+    def __init__(self, address: Tuple[str, int], predictor: Predictor, window: float = 0.002, max_batch: int = 1024) -> None:
+        super().__init__(address, PredictionRequestHandler)
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(predictor, window, max_batch, self.stats)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.batcher.close()
+
+
+def main(args: List[str]) -> None:
+
+    parser = argparse.ArgumentParser(description='Serves rating predictions over HTTP on localhost.')
+    parser.add_argument('--dataset', default='ml-latest-small', help='name of the dataset (ml-latest-small or ml-latest)')
+    parser.add_argument('--model', help='directory of a saved predictor to be served instead of fitting one')
+    parser.add_argument('--host', default='127.0.0.1', help='host on which the server listens (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='port on which the server listens (default 8000)')
+    parser.add_argument('--window-ms', type=float, default=2.0, help='time for which requests are batched (default 2 ms)')
+    parser.add_argument('--max-batch', type=int, default=1024, help='maximal number of requests in a batch (default 1024)')
+    parser.add_argument('--materialize', type=int, default=0, metavar='N_USERS', help='materialize predictions of the N_USERS most active users (default 0)')
+    args = parser.parse_args(args)
+
+    if args.model is not None:
+        predictor = Predictor.load(args.model)
+    else:
+        dataset = MovieLensDataset(args.dataset, columns=PREDICTION_COLUMNS, categorical=True)
+        predictor = Predictor()
+        predictor.fit(MovieLensDatasetPreprocessor().fit_transform(dataset))
+    if args.materialize > 0:
+        predictor.materialize(n_users=args.materialize)
+
+    server = PredictionServer((args.host, args.port), predictor, args.window_ms / 1000, args.max_batch)
+    host, port = server.server_address[:2]
+    print(f'Serving predictions on http://{host}:{port} (statistics on http://{host}:{port}/stats)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats.snapshot()))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,263 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+
+GENRES: List[str] = [
+    'Action', 'Adventure', 'Animation', 'Children', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Fantasy', 'Film-Noir',
+    'Horror', 'IMAX', 'Musical', 'Mystery', 'Romance', 'Sci-Fi', 'Thriller', 'War', 'Western'
+]
+"""Genres of the Movie Lens dataset."""
+
+GENRE_WEIGHTS: np.ndarray = np.array([12, 8, 3, 4, 18, 7, 4, 22, 5, 1, 6, 1, 2, 4, 9, 5, 10, 2, 1], dtype=np.float64)
+"""Relative frequencies of the genres (roughly as in the Movie Lens dataset)."""
+
+TAGS: List[str] = [
+    'atmospheric', 'funny', 'twist ending', 'based on a book', 'dark comedy', 'visually appealing', 'sci-fi',
+    'thought-provoking', 'slow, but worth it', 'Oscar (Best Picture)', 'quotable "classic"', 'overrated'
+]
+"""Vocabulary of the generated tags (including values which have to be quoted in CSV files)."""
+
+USERS_PER_BLOCK = 1000
+"""
+Number of users whose ratings are generated at once. Each block of users
+has its own random generator, so the output does not depend on how much
+of it is kept in memory at a time.
+"""
+
+
+def dataset_shape(n_ratings: int) -> Tuple[int, int]:
+    """
+    Provides the numbers of users and movies of a synthetic dataset,
+    scaled like in the Movie Lens datasets (about 100 ratings per user and
+    a number of movies growing with the square root of the number of ratings).
+
+    Parameters
+    ----------
+    n_ratings : int
+        Number of ratings.
+
+    Returns
+    -------
+    Tuple[int, int]
+        Numbers of users and movies.
+    """
+    return max(n_ratings // 100, 10), max(int(15 * np.sqrt(n_ratings)), 100)
+
+
+def user_rating_counts(n_ratings: int, n_users: int, n_movies: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draws the number of ratings of each user from a heavy-tailed
+    (log-normal) distribution of activity, with at least 20 ratings per
+    user (as in the Movie Lens datasets) and at most half of the movies.
+
+    Parameters
+    ----------
+    n_ratings : int
+        Total number of ratings.
+
+    n_users : int
+        Number of users.
+
+    n_movies : int
+        Number of movies.
+
+    rng : numpy.random.Generator
+        Random generator.
+
+    Returns
+    -------
+    numpy.ndarray
+        Number of ratings of each user (summing up to `n_ratings`, unless
+        the most active users hit the limit).
+    """
+    base = min(20, n_ratings // n_users)
+    activity = rng.lognormal(0.0, 1.2, n_users)
+    shares = (n_ratings - base * n_users) * activity / activity.sum()
+    counts = base + np.floor(shares).astype(np.int64)
+    # The remaining ratings go to the users with the largest fractional parts.
+    remainder = n_ratings - counts.sum()
+    counts[np.argsort(np.floor(shares) - shares, kind='stable')[:remainder]] += 1
+    return np.minimum(counts, n_movies // 2)
+
+
+def _draw_movies(counts: np.ndarray, cdf: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draws distinct movies for each user of a block, according to the
+    popularity of the movies, by repeatedly drawing with replacement and
+    discarding the repeated pairs.
+
+    Returns the sorted keys `user * n_movies + movie` of the drawn pairs
+    (with users and movies given by their positions).
+    """
+    n_movies = len(cdf)
+    keys = np.empty(0, dtype=np.int64)
+    while True:
+        deficit = counts - np.bincount(keys // n_movies, minlength=len(counts))
+        if not deficit.any():
+            return np.sort(keys)
+        users = np.repeat(np.arange(len(counts), dtype=np.int64), np.where(deficit > 0, deficit + deficit // 2 + 1, 0))
+        movies = np.minimum(np.searchsorted(cdf, rng.random(len(users)), side='right'), n_movies - 1)
+        merged = np.concatenate([keys, users * n_movies + movies])
+        # Distinct pairs in the order of drawing, so the pairs kept so far stay first.
+        _, first = np.unique(merged, return_index=True)
+        merged = merged[np.sort(first)]
+        order = np.argsort(merged // n_movies, kind='stable')
+        merged = merged[order]
+        user_of = merged // n_movies
+        rank = np.arange(len(merged)) - np.searchsorted(user_of, user_of)
+        keys = merged[rank < counts[user_of]]
+
+
+def generate_movies(n_movies: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Generates the `movies` table (with `movieId` as a column).
+
+    Parameters
+    ----------
+    n_movies : int
+        Number of movies.
+
+    rng : numpy.random.Generator
+        Random generator.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Table of movies with columns `movieId`, `title` and `genres`.
+    """
+    movie_ids = np.sort(rng.choice(np.arange(1, 3 * n_movies + 1), n_movies, replace=False))
+    n_genres = rng.choice(5, n_movies, p=[0.01, 0.3, 0.35, 0.22, 0.12])
+    # Genres of each movie are drawn without replacement by the exponential race.
+    race = np.argsort(rng.exponential(size=(n_movies, len(GENRES))) / GENRE_WEIGHTS, axis=1)
+    genres = [
+        '|'.join(GENRES[genre] for genre in sorted(race[i, :k])) if k else '(no genres listed)'
+        for i, k in enumerate(n_genres)
+    ]
+    years = 2023 - np.minimum(rng.exponential(20.0, n_movies).astype(np.int64), 120)
+    titles = [
+        f'Movie {movie_id}, The ({year})' if movie_id % 7 == 0 else f'Movie {movie_id} ({year})'
+        for movie_id, year in zip(movie_ids.tolist(), years.tolist())
+    ]
+    return pd.DataFrame({'movieId': movie_ids, 'title': titles, 'genres': genres})
+
+
+def generate_links(movie_ids: np.ndarray, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Generates the `links` table (with `movieId` as a column).
+
+    Parameters
+    ----------
+    movie_ids : numpy.ndarray
+        Ids of the movies.
+
+    rng : numpy.random.Generator
+        Random generator.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Table of links with columns `movieId`, `imdbId` and `tmdbId` (missing for about 1% of movies).
+    """
+    tmdb_ids = rng.integers(1, 10 ** 6, len(movie_ids)).astype(np.float64)
+    tmdb_ids[rng.random(len(movie_ids)) < 0.01] = np.nan
+    return pd.DataFrame({'movieId': movie_ids, 'imdbId': rng.integers(1, 10 ** 7, len(movie_ids)), 'tmdbId': tmdb_ids})
+
+
+def generate_dataset(output_dir: str, n_ratings: int, seed: int = 0) -> Dict[str, int]:
+    """
+    Generates a synthetic dataset in the Movie Lens format - the files
+    `links.csv`, `movies.csv`, `ratings.csv` and `tags.csv` - which can be
+    loaded with `MovieLensDataset(data_dir=output_dir)`.
+
+    The activity of users is heavy-tailed (see `user_rating_counts`) and
+    the popularity of movies follows Zipf's law, so that both the numbers of
+    ratings per user and per movie are skewed like in the real datasets.
+    A rating is the sum of the global mean, biases of the user and the
+    movie and noise, rounded to a half star. The output is deterministic for
+    a given seed, and the ratings are generated and written block by block
+    of users, so large datasets are generated with bounded memory.
+
+    Parameters
+    ----------
+    output_dir : str
+        Directory in which the files are written (created if needed).
+
+    n_ratings : int
+        Number of ratings.
+
+    seed : int, optional
+        Seed of the random generators (default 0).
+
+    Returns
+    -------
+    Dict[str, int]
+        Numbers of `users`, `movies`, `ratings` and `tags` of the dataset.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n_users, n_movies = dataset_shape(n_ratings)
+    rng = np.random.default_rng([seed, 0])
+
+    movies = generate_movies(n_movies, rng)
+    movie_ids = movies['movieId'].to_numpy()
+    movies.to_csv(os.path.join(output_dir, 'movies.csv'), index=False)
+    generate_links(movie_ids, rng).to_csv(os.path.join(output_dir, 'links.csv'), index=False)
+
+    popularity = 1.0 / (1.0 + rng.permutation(n_movies))
+    weights = 0.9 * popularity / popularity.sum() + 0.1 / n_movies
+    cdf = np.cumsum(weights) / weights.sum()
+    movie_bias = rng.normal(0.0, 0.5, n_movies)
+    counts = user_rating_counts(n_ratings, n_users, n_movies, rng)
+
+    paths = {table: os.path.join(output_dir, f'{table}.csv') for table in ('ratings', 'tags')}
+    # The files are written under temporary names, so a partial dataset is never left behind.
+    files = {table: open(f'{path}.tmp', 'w', newline='') for table, path in paths.items()}
+    n_tags = 0
+    try:
+        for block, start in enumerate(range(0, n_users, USERS_PER_BLOCK)):
+            block_counts = counts[start:start + USERS_PER_BLOCK]
+            block_rng = np.random.default_rng([seed, 1, block])
+            keys = _draw_movies(block_counts, cdf, block_rng)
+            users, movies_index = keys // n_movies, keys % n_movies
+            user_bias = block_rng.normal(0.0, 0.45, len(block_counts))
+            ratings = 3.5 + user_bias[users] + movie_bias[movies_index] + block_rng.normal(0.0, 0.9, len(keys))
+            ratings = np.clip(np.round(ratings * 2) / 2, 0.5, 5.0)
+            first_seen = block_rng.integers(820000000, 1680000000, len(block_counts))
+            timestamps = first_seen[users] + block_rng.exponential(3e6, len(keys)).astype(np.int64)
+            timestamps = np.minimum(timestamps, 1700000000)
+            ratings_block = pd.DataFrame({
+                'userId': start + 1 + users, 'movieId': movie_ids[movies_index], 'rating': ratings, 'timestamp': timestamps
+            })
+            ratings_block.to_csv(files['ratings'], index=False, header=block == 0, float_format='%.1f')
+            tagged = block_rng.random(len(keys)) < 0.03
+            tags_block = ratings_block.loc[tagged, ['userId', 'movieId']].assign(
+                tag=np.array(TAGS, dtype=object)[np.minimum(block_rng.zipf(1.5, tagged.sum()), len(TAGS)) - 1],
+                timestamp=timestamps[tagged] + block_rng.integers(0, 86400, tagged.sum())
+            )
+            tags_block.to_csv(files['tags'], index=False, header=block == 0)
+            n_tags += len(tags_block)
+    finally:
+        for file in files.values():
+            file.close()
+    for path in paths.values():
+        os.replace(f'{path}.tmp', path)
+    return {'users': n_users, 'movies': n_movies, 'ratings': int(counts.sum()), 'tags': n_tags}
+
+
+def main(args: List[str]) -> None:
+
+    parser = argparse.ArgumentParser(description='Generates a synthetic dataset in the Movie Lens format.')
+    parser.add_argument('output_dir', help='directory in which the CSV files are written')
+    parser.add_argument('n_ratings', type=lambda value: int(float(value)), help='number of ratings (e.g. 1e6)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random generators (default 0)')
+    args = parser.parse_args(args)
+
+    counts = generate_dataset(args.output_dir, args.n_ratings, args.seed)
+    print(', '.join(f'{count} {name}' for name, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,24 +1,123 @@
 import sys
-from dataset import MovieLensDataset
-from preprocessing import MovieLensDatasetPreprocessor
-from predict import Predictor
-from baseline import BaselinePredictor
-from sklearn.metrics import mean_squared_error
-from typing import List, Tuple
+import argparse
+import tempfile
+import numpy as np
+from . import instrumentation
+from .dataset import PREDICTION_COLUMNS, MovieLensDataset
+from .preprocessing import MovieLensDatasetPreprocessor
+from .predict import Predictor
+from .baseline import BaselinePredictor
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
 
 
-def main(args: List[str]) -> None:
+_worker_predictor: Predictor = None
+"""Predictor of a worker process (loaded by `_init_worker`)."""
+
+
+def _init_worker(state_dir: str) -> None:
+    """Loads the fitted state of the predictor in a worker process by memory-mapping its arrays."""
+    global _worker_predictor
+    _worker_predictor = Predictor.load(state_dir, mmap=True)
+
+
+def _predict_shard(shard: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    """Predicts ratings of a shard of the held-out sample in a worker process."""
+    user_ids, movie_ids = shard
+    return _worker_predictor.predict_many(user_ids, movie_ids)
+
+
+def shard_by_user(user_ids: np.ndarray, n_shards: int) -> List[np.ndarray]:
+    """
+    Splits pairs into shards of similar sizes, so that all pairs
+    of each user belong to the same shard.
+
+    Parameters
+    ----------
+    user_ids : numpy.ndarray
+        Ids of the users of the pairs.
+
+    n_shards : int
+        Maximal number of shards.
+
+    Returns
+    -------
+    List[numpy.ndarray]
+        Positions of the pairs of each (nonempty) shard.
+    """
+    if len(user_ids) == 0:
+        return []
+    order = np.argsort(user_ids, kind='stable')
+    sorted_users = user_ids[order]
+    # Boundaries of equal shards, moved back to the first pair of the user.
+    targets = np.arange(1, n_shards) * len(order) // n_shards
+    bounds = np.unique(np.searchsorted(sorted_users, sorted_users[targets]))
+    return [shard for shard in np.split(order, bounds) if len(shard)]
+
+
+def predict_parallel(predictor: Predictor, user_ids: np.ndarray, movie_ids: np.ndarray, workers: int) -> np.ndarray:
+    """
+    Predicts ratings with a pool of worker processes. The sample is
+    sharded by user, and the fitted state of the predictor is shared with
+    the workers through memory-mapped files instead of being pickled.
+
+    Parameters
+    ----------
+    predictor : Predictor
+        Fitted predictor.
+
+    user_ids : numpy.ndarray
+        Ids of the users.
 
-    dataset_name = args[0]
-    sample_size = int(args[1])
+    movie_ids : numpy.ndarray
+        Ids of the movies (one for each user id).
 
-    dataset = MovieLensDataset(dataset_name)
+    workers : int
+        Number of worker processes.
 
-    sample: List[Tuple[int, int, float]] = []
+    Returns
+    -------
+    numpy.ndarray
+        Predictions of the ratings, in the order of the pairs.
+    """
+    shards = shard_by_user(user_ids, workers * 4)
+    predictions = np.empty(len(user_ids))
+    with tempfile.TemporaryDirectory() as state_dir:
+        predictor.save(state_dir)
+        with Pool(workers, initializer=_init_worker, initargs=(state_dir,)) as pool:
+            results = pool.map(_predict_shard, [(user_ids[shard], movie_ids[shard]) for shard in shards], chunksize=1)
+    for shard, result in zip(shards, results):
+        predictions[shard] = result
+    return predictions
 
-    for (user_id, movie_id), (rating, _) in dataset.get_ratings().sample(sample_size, random_state=42).iterrows():
-        dataset.delete_rating(user_id, movie_id)
-        sample.append((user_id, movie_id, rating))
+
+def evaluate(dataset: MovieLensDataset, sample_size: int, workers: int = 1, seed: int = 42) -> Dict[str, float]:
+    """
+    Evaluates the predictor and the baseline on a held-out sample of
+    ratings: the sample is removed from the dataset, both predictors are
+    fitted to the rest of it and predict the held-out ratings.
+
+    Parameters
+    ----------
+    dataset : MovieLensDataset
+        Dataset from which the sample is held out.
+
+    sample_size : int
+        Number of held-out ratings.
+
+    workers : int, optional
+        Number of worker processes predicting the ratings (default 1,
+        i.e. the ratings are predicted in the calling process).
+
+    seed : int, optional
+        Seed of the random sample (default 42).
+
+    Returns
+    -------
+    Dict[str, float]
+        Mean squared errors of the predictor (`mse_model`) and the baseline (`mse_baseline`).
+    """
+    user_ids, movie_ids, y_true = dataset.split(sample_size=sample_size, seed=seed)
 
     preprocessor = MovieLensDatasetPreprocessor().fit_transform(dataset)
 
@@ -28,25 +127,50 @@ def main(args: List[str]) -> None:
     baseline_predictor = BaselinePredictor()
     baseline_predictor.fit(dataset)
 
-    y_true: List[float] = []
-    y_pred_model: List[float] = []
-    y_pred_base: List[float] = []
-        
-    for user_id, movie_id, rating in sample:
-        prediction = predictor.predict(user_id, movie_id)
-        baseline_prediction = baseline_predictor.predict(user_id, movie_id)
-        y_true.append(rating)
-        y_pred_model.append(prediction)
-        y_pred_base.append(baseline_prediction)
+    if workers > 1:
+        y_pred_model = predict_parallel(predictor, user_ids, movie_ids, workers)
+    else:
+        y_pred_model = predictor.predict_many(user_ids, movie_ids)
+    y_pred_base = baseline_predictor.predict_many(user_ids, movie_ids)
+
+    return {
+        'mse_model': float(np.mean((y_true - y_pred_model) ** 2)),
+        'mse_baseline': float(np.mean((y_true - y_pred_base) ** 2))
+    }
 
-    mse_model = mean_squared_error(y_true, y_pred_model)
-    mse_baseline = mean_squared_error(y_true, y_pred_base)
 
-    var = dataset.get_ratings()['rating'].var()
+def main(args: List[str]) -> None:
+
+    parser = argparse.ArgumentParser(description='Evaluates the predictor on a held-out sample of ratings.')
+    parser.add_argument('dataset_name', help='name of the dataset (ml-latest-small or ml-latest)')
+    parser.add_argument('sample_size', type=int, help='number of held-out ratings')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes (default 1)')
+    parser.add_argument('--profile', action='store_true', help='print the time spent in each stage of the pipeline')
+    parser.add_argument('--profile-memory', action='store_true', help='measure also the memory allocated in each stage (slow)')
+    parser.add_argument('--profile-output', help='file to which the measurements of the stages are written as JSON')
+    args = parser.parse_args(args)
+
+    collector = None
+    if args.profile or args.profile_memory or args.profile_output is not None:
+        collector = instrumentation.enable(trace_memory=args.profile_memory)
+
+    dataset = MovieLensDataset(args.dataset_name, columns=PREDICTION_COLUMNS, categorical=True)
+
+    errors = evaluate(dataset, args.sample_size, args.workers)
+    mse_model, mse_baseline = errors['mse_model'], errors['mse_baseline']
+
+    var = dataset.get_ratings_store().get_ratings().var(ddof=1, dtype=np.float64)
 
     print(f'Model MSE:    {mse_model : .4f} (standarized: {mse_model / var : .4f})')
     print(f'Baseline MSE: {mse_baseline : .4f} (standarized: {mse_baseline / var : .4f})')
 
+    if collector is not None:
+        instrumentation.disable()
+        if args.profile_output is not None:
+            collector.to_json(args.profile_output)
+        print()
+        print(collector.summary())
+
 
 if __name__ == "__main__":
     main(sys.argv[1:])
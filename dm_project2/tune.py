@@ -0,0 +1,150 @@
+import sys
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from .dataset import PREDICTION_COLUMNS, MovieLensDataset
+from .preprocessing import MovieLensDatasetPreprocessor
+from .predict import Predictor
+from .rating_cube import RULE_METRICS
+from typing import Dict, List, Sequence
+
+
+PARAMETERS = ('threshold_itemsets', 'threshold_rules', 'weighted_mean_metric', 'alpha', 'beta')
+"""Parameters of `Predictor.predict` searched by `grid_search`."""
+
+DEFAULT_GRID: Dict[str, List] = {
+    'threshold_itemsets': [0.01, 0.02, 0.05],
+    'threshold_rules': [0.01, 0.02, 0.05],
+    'weighted_mean_metric': list(RULE_METRICS),
+    'alpha': [0.0, 0.25, 0.5, 0.75, 1.0],
+    'beta': [0.0, 0.25, 0.5, 0.75, 1.0]
+}
+"""Grid of the parameters searched by default."""
+
+
+def grid_search(
+    predictor: Predictor,
+    user_ids: Sequence[int],
+    movie_ids: Sequence[int],
+    ratings: Sequence[float],
+    grid: Dict[str, Sequence] = DEFAULT_GRID,
+    chunk_size: int = 2000
+) -> pd.DataFrame:
+    """
+    Evaluates a fitted predictor on held-out ratings for every combination
+    of the values of the parameters in the grid.
+
+    The predictions for all combinations are computed at once with
+    `Predictor.predict_grid`, so the rules of each user are mined only once,
+    and the whole search costs about as much as a few evaluations of a single
+    combination. The pairs are processed in chunks of bounded size (the
+    rules mined for a user are reused between the chunks by the rule cache
+    of the predictor), so that the memory does not grow with the product
+    of the number of combinations and the number of pairs.
+
+    Parameters
+    ----------
+    predictor : Predictor
+        Fitted predictor.
+
+    user_ids : Sequence[int]
+        Ids of the users of the held-out ratings.
+
+    movie_ids : Sequence[int]
+        Ids of the movies of the held-out ratings (one for each user id).
+
+    ratings : Sequence[float]
+        Held-out ratings.
+
+    grid : Dict[str, Sequence], optional
+        Values of each of `PARAMETERS` (missing parameters take the
+        default values of `Predictor.predict`).
+
+    chunk_size : int, optional
+        Number of pairs predicted at once (default 2000); chunks are
+        extended to the end of the last user, so they may be larger.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Combinations of the parameters (one column for each of
+        `PARAMETERS`) with their mean squared error (column `mse`),
+        ordered from the best one.
+
+    Raises
+    ------
+    ValueError
+        When the grid contains unknown parameters.
+    """
+    unknown = set(grid) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f'Unknown parameters of the grid: {", ".join(sorted(unknown))}.')
+    defaults = {'threshold_itemsets': [0.01], 'threshold_rules': [0.01], 'weighted_mean_metric': ['confidence'], 'alpha': [0.5], 'beta': [0.5]}
+    values = [list(grid.get(parameter, defaults[parameter])) for parameter in PARAMETERS]
+
+    user_ids = np.asarray(user_ids, dtype=np.int64).reshape(-1)
+    movie_ids = np.asarray(movie_ids, dtype=np.int64).reshape(-1)
+    ratings = np.asarray(ratings, dtype=np.float64).reshape(-1)
+    assert len(user_ids) == len(movie_ids) == len(ratings), 'user_ids, movie_ids and ratings should have equal lengths.'
+    assert len(ratings) > 0, 'At least one held-out rating is needed.'
+
+    # Chunks consist of whole users, so that the pairs of a user are predicted together:
+    # each chunk ends at the first boundary between users after `chunk_size` pairs.
+    order = np.argsort(user_ids, kind='stable')
+    boundaries = np.append(np.flatnonzero(np.diff(user_ids[order])) + 1, len(order))
+    squared_errors = np.zeros([len(parameter_values) for parameter_values in values])
+    start = 0
+    while start < len(order):
+        end = boundaries[min(np.searchsorted(boundaries, start + chunk_size), len(boundaries) - 1)]
+        chunk = order[start:end]
+        start = end
+        predictions = predictor.predict_grid(user_ids[chunk], movie_ids[chunk], *values)
+        squared_errors += ((predictions - ratings[chunk]) ** 2).sum(axis=-1)
+
+    results = pd.DataFrame(list(itertools.product(*values)), columns=list(PARAMETERS))
+    results['mse'] = squared_errors.reshape(-1) / len(ratings)
+    return results.sort_values('mse', kind='stable').reset_index(drop=True)
+
+
+def main(args: List[str]) -> None:
+
+    parser = argparse.ArgumentParser(description='Searches a grid of parameters of the predictor on a held-out sample of ratings.')
+    parser.add_argument('dataset_name', help='name of the dataset (ml-latest-small or ml-latest)')
+    parser.add_argument('sample_size', type=int, help='number of held-out ratings')
+    parser.add_argument('--threshold-itemsets', type=float, nargs='+', default=DEFAULT_GRID['threshold_itemsets'], help='values of the minimum support of itemsets')
+    parser.add_argument('--threshold-rules', type=float, nargs='+', default=DEFAULT_GRID['threshold_rules'], help='values of the minimum support of rules')
+    parser.add_argument('--metrics', choices=RULE_METRICS, nargs='+', default=DEFAULT_GRID['weighted_mean_metric'], help='metrics used as weights of rules')
+    parser.add_argument('--alphas', type=float, nargs='+', default=DEFAULT_GRID['alpha'], help='values of alpha')
+    parser.add_argument('--betas', type=float, nargs='+', default=DEFAULT_GRID['beta'], help='values of beta')
+    parser.add_argument('--top', type=int, default=10, help='number of the best combinations printed (default 10)')
+    parser.add_argument('--output', help='file to which the results of all combinations are written as CSV')
+    args = parser.parse_args(args)
+
+    dataset = MovieLensDataset(args.dataset_name, columns=PREDICTION_COLUMNS, categorical=True)
+
+    user_ids, movie_ids, y_true = dataset.split(sample_size=args.sample_size, seed=42)
+
+    predictor = Predictor()
+    predictor.fit(MovieLensDatasetPreprocessor().fit_transform(dataset))
+
+    grid = {
+        'threshold_itemsets': args.threshold_itemsets,
+        'threshold_rules': args.threshold_rules,
+        'weighted_mean_metric': args.metrics,
+        'alpha': args.alphas,
+        'beta': args.betas
+    }
+    results = grid_search(predictor, user_ids, movie_ids, y_true, grid)
+
+    var = dataset.get_ratings_store().get_ratings().var(ddof=1, dtype=np.float64)
+    results['standarized'] = results['mse'] / var
+
+    if args.output is not None:
+        results.to_csv(args.output, index=False)
+    print(f'{len(results)} combinations of parameters evaluated on {len(y_true)} ratings.')
+    print(results.head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,46 @@
+import tempfile
+import unittest
+import numpy as np
+import dm_project2.synthetic as syn
+import dm_project2.dataset as ds
+import dm_project2.benchmark as bm
+import dm_project2.test as ts
+
+
+class TestBenchmark(unittest.TestCase):
+    """Set of test cases for the benchmarks of the pipeline."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp_dir = tempfile.TemporaryDirectory()
+        syn.generate_dataset(cls._tmp_dir.name, 2000)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp_dir.cleanup()
+
+    def test_measure(self):
+        """Check if the function is run once per timed run, with the setup before each run, and once more for the memory."""
+        calls = []
+        result = bm.measure(lambda: calls.append('func'), lambda: calls.append('setup'), repeat=2)
+        self.assertEqual(['setup', 'func'] * 3, calls)
+        self.assertEqual({'seconds', 'seconds_median', 'peak_bytes'}, set(result))
+        self.assertNotIn('peak_bytes', bm.measure(lambda: None, memory=False))
+
+    def test_benchmark_dataset(self):
+        """Check if all stages are measured and the evaluation reports the errors of the holdout of `test.py`."""
+        results = bm.benchmark_dataset(self._tmp_dir.name, list(bm.STAGES), memory=False, n_predictions=20, sample_size=50)
+        self.assertEqual(list(bm.STAGES), list(results))
+        for measurement in results.values():
+            self.assertGreaterEqual(measurement['seconds'], 0)
+        self.assertEqual(2, results['predict']['rows'])
+        self.assertEqual(50, results['evaluation']['rows'])
+        dataset = ds.MovieLensDataset('synthetic', data_dir=self._tmp_dir.name, columns=ds.PREDICTION_COLUMNS, categorical=True)
+        errors = ts.evaluate(dataset, 50)
+        self.assertEqual(errors['mse_model'], results['evaluation']['mse_model'])
+        self.assertEqual(errors['mse_baseline'], results['evaluation']['mse_baseline'])
+        self.assertTrue(np.isfinite(errors['mse_model']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import os
+import tempfile
+import unittest
+import mock
+import numpy as np
+import pandas as pd
+import dm_project2.cache as cache
+
+
+tags_df = pd.DataFrame({
+    'userId': np.array([1, 1, 2], dtype='int32'),
+    'movieId': np.array([1, 2, 1], dtype='int32'),
+    'tag': ['funny', np.nan, 'Zażółć, "gęślą"'],
+    'timestamp': np.array([0, 1, 2], dtype='int32')
+})
+
+tags_dtype = {'userId': 'int32', 'movieId': 'int32', 'timestamp': 'int32'}
+
+
+class TestTableCache(unittest.TestCase):
+    """Set of test cases for the class `TableCache`."""
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._source_path = os.path.join(self._tmp_dir.name, 'tags.csv')
+        tags_df.to_csv(self._source_path, index=False)
+        self._cache = cache.TableCache(os.path.join(self._tmp_dir.name, 'cache'))
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_load_from_source(self):
+        """Check if a table loaded for the first time matches its source file."""
+        df = self._cache.load('tags', self._source_path, tags_dtype)
+        self.assertTrue(tags_df.equals(df))
+
+    def test_load_from_cache(self):
+        """Check if a cached table is loaded without parsing the source file and is identical to it."""
+        self._cache.load('tags', self._source_path, tags_dtype)
+        with mock.patch.object(cache.pd, 'read_csv') as read_csv:
+            df = self._cache.load('tags', self._source_path, tags_dtype)
+            read_csv.assert_not_called()
+        self.assertTrue(tags_df.equals(df))
+
+    def test_invalidation(self):
+        """Check if the cache is rebuilt after the source file changes."""
+        self._cache.load('tags', self._source_path, tags_dtype)
+        tags_df.iloc[:2].to_csv(self._source_path, index=False)
+        df = self._cache.load('tags', self._source_path, tags_dtype)
+        self.assertEqual(2, len(df))
+
+    def test_invalidation_by_dtypes(self):
+        """Check if the cache is rebuilt when the requested dtypes or the parameters of cached arrays change."""
+        self._cache.load('tags', self._source_path, tags_dtype)
+        df = self._cache.load('tags', self._source_path, {**tags_dtype, 'timestamp': 'int64'})
+        self.assertEqual(np.int64, df['timestamp'].dtype)
+        build = mock.Mock(return_value={'values': np.arange(3)})
+        for params in ({'dtype': 'int32'}, {'dtype': 'int32'}, {'dtype': 'int64'}):
+            self._cache.load_arrays('values', self._source_path, build, params=params)
+        self.assertEqual(2, build.call_count)
+
+    def test_load_in_chunks(self):
+        """Check if a table converted in many small chunks is identical to its source file."""
+        chunked_cache = cache.TableCache(os.path.join(self._tmp_dir.name, 'chunked'), chunk_bytes=1)
+        with mock.patch.object(chunked_cache, '_chunk_rows', return_value=1):
+            df = chunked_cache.load('tags', self._source_path, tags_dtype)
+        self.assertTrue(tags_df.equals(df))
+        with mock.patch.object(cache.pd, 'read_csv') as read_csv:
+            self.assertTrue(tags_df.equals(chunked_cache.load('tags', self._source_path, tags_dtype)))
+            read_csv.assert_not_called()
+
+    def test_load_text_missing_in_first_chunk(self):
+        """Check if a text column whose first chunk has only missing values is cached as text."""
+        source_path = os.path.join(self._tmp_dir.name, 'missing.csv')
+        missing_df = tags_df.iloc[[1, 0, 2]].reset_index(drop=True)
+        missing_df.to_csv(source_path, index=False)
+        with mock.patch.object(self._cache, '_chunk_rows', return_value=1):
+            df = self._cache.load('missing', source_path, tags_dtype)
+        self.assertTrue(missing_df.equals(df))
+        with mock.patch.object(cache.pd, 'read_csv') as read_csv:
+            self.assertTrue(missing_df.equals(self._cache.load('missing', source_path, tags_dtype)))
+            read_csv.assert_not_called()
+
+    def test_failed_write_is_cache_miss(self):
+        """Check if a table which cannot be written to the cache is parsed from its source file instead."""
+        with mock.patch.object(cache.TableCache, '_write', side_effect=ValueError('lorem')):
+            df = self._cache.load('tags', self._source_path, tags_dtype)
+        self.assertTrue(tags_df.equals(df))
+        self.assertEqual([], os.listdir(os.path.join(self._cache.get_cache_dir(), 'tags')))
+
+    def test_read_csv_chunks(self):
+        """Check if the chunks parsed from a CSV file make up its table."""
+        with mock.patch.object(cache, 'chunk_rows', return_value=2):
+            chunks = list(cache.read_csv_chunks(self._source_path, tags_dtype, ['userId', 'tag']))
+        self.assertEqual([2, 1], [len(chunk) for chunk in chunks])
+        self.assertTrue(tags_df[['userId', 'tag']].equals(pd.concat(chunks, ignore_index=True)))
+
+    def test_load_empty_table(self):
+        """Check if a table without rows is converted into an empty table with the same columns."""
+        source_path = os.path.join(self._tmp_dir.name, 'empty.csv')
+        tags_df.iloc[:0].to_csv(source_path, index=False)
+        df = self._cache.load('empty', source_path, tags_dtype)
+        self.assertEqual(list(tags_df.columns), list(df.columns))
+        self.assertEqual(0, len(df))
+
+    def test_load_columns(self):
+        """Check if selected columns are loaded, with text columns optionally as categoricals, from the cache and the source."""
+        for _ in range(2):
+            df = self._cache.load('tags', self._source_path, tags_dtype, columns=['tag', 'userId'], categorical=['tag'])
+            self.assertEqual(['userId', 'tag'], list(df.columns))
+            self.assertIsInstance(df['tag'].dtype, pd.CategoricalDtype)
+            self.assertTrue(tags_df['tag'].equals(df['tag'].astype(object)))
+            self.assertTrue(tags_df['userId'].equals(df['userId']))
+        source = cache.read_csv_columns(self._source_path, tags_dtype, ['tag', 'userId'], ['tag'])
+        self.assertTrue(df.equals(source))
+        [version] = os.listdir(os.path.join(self._cache.get_cache_dir(), 'tags'))
+        self.assertRaises(KeyError, cache.TableCache._read, os.path.join(self._cache.get_cache_dir(), 'tags', version), ['lorem'])
+
+    def test_rebuild_keeps_mapped_version(self):
+        """Check if rebuilding cached arrays leaves the version mapped before intact and publishes a new one."""
+        arrays = self._cache.load_arrays('values', self._source_path, lambda: {'values': np.arange(3)})
+        tags_df.iloc[:2].to_csv(self._source_path, index=False)
+        rebuilt = self._cache.load_arrays('values', self._source_path, lambda: {'values': np.arange(5)})
+        self.assertEqual([0, 1, 2], arrays['values'].tolist())
+        self.assertEqual([0, 1, 2, 3, 4], rebuilt['values'].tolist())
+        versions = os.listdir(os.path.join(self._cache.get_cache_dir(), 'values'))
+        self.assertEqual(2, len(versions))
+        self.assertFalse(any(version.startswith('.') for version in versions))
+
+    def test_publish_once(self):
+        """Check if a version published by another process in the meantime is left in place."""
+        build = lambda: {'values': np.arange(3)}
+        self._cache.load_arrays('values', self._source_path, build)
+        [version] = os.listdir(os.path.join(self._cache.get_cache_dir(), 'values'))
+        version_dir = os.path.join(self._cache.get_cache_dir(), 'values', version)
+        inode = os.stat(os.path.join(version_dir, 'values.npy')).st_ino
+        fingerprint = cache.TableCache._read_meta(version_dir)
+        cache.TableCache._publish(version_dir, fingerprint, lambda tmp_dir: cache.TableCache._write_arrays(tmp_dir, build(), fingerprint))
+        self.assertEqual(inode, os.stat(os.path.join(version_dir, 'values.npy')).st_ino)
+        self.assertEqual([version], os.listdir(os.path.join(self._cache.get_cache_dir(), 'values')))
+
+    def test_invalid_version_moved_aside(self):
+        """Check if a damaged version is replaced by a new one without deleting it."""
+        self._cache.load('tags', self._source_path, tags_dtype)
+        [version] = os.listdir(os.path.join(self._cache.get_cache_dir(), 'tags'))
+        os.remove(os.path.join(self._cache.get_cache_dir(), 'tags', version, 'meta.json'))
+        self.assertTrue(tags_df.equals(self._cache.load('tags', self._source_path, tags_dtype)))
+        versions = sorted(os.listdir(os.path.join(self._cache.get_cache_dir(), 'tags')))
+        self.assertEqual(2, len(versions))
+        self.assertTrue(versions[0].startswith('.invalid-'))
+
+    def test_clear(self):
+        """Check if clearing the cache removes all cached tables."""
+        self._cache.load('tags', self._source_path, tags_dtype)
+        self._cache.clear()
+        self.assertFalse(os.path.exists(self._cache.get_cache_dir()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import dm_project2.crossval as cv
+import dm_project2.synthetic as syn
+import dm_project2.dataset as ds
+import dm_project2.preprocessing as pp
+import dm_project2.predict as pr
+import dm_project2.baseline as bl
+
+
+class TestCrossValidation(unittest.TestCase):
+    """Set of test cases for the k-fold cross-validation."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp_dir = tempfile.TemporaryDirectory()
+        syn.generate_dataset(cls._tmp_dir.name, 3000)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp_dir.cleanup()
+
+    def _dataset(self) -> ds.MovieLensDataset:
+        return ds.MovieLensDataset('synthetic', columns=ds.PREDICTION_COLUMNS, data_dir=self._tmp_dir.name)
+
+    def test_assign_folds(self):
+        """Check if ratings are split into folds of equal sizes."""
+        folds = cv.assign_folds(103, 5, seed=0)
+        self.assertEqual([21, 21, 21, 20, 20], np.bincount(folds).tolist())
+        np.testing.assert_array_equal(folds, cv.assign_folds(103, 5, seed=0))
+        sampled = cv.assign_folds(103, 4, sample_size=40, seed=0)
+        self.assertEqual(63, (sampled == -1).sum())
+        self.assertEqual([10] * 4, np.bincount(sampled[sampled >= 0]).tolist())
+        self.assertRaises(ValueError, cv.assign_folds, 103, 1)
+        self.assertRaises(ValueError, cv.assign_folds, 103, 5, 104)
+
+    def test_fold_state_matches_fit(self):
+        """Check if the state derived for a fold is the same as the state fitted to its training part."""
+        dataset = self._dataset()
+        state = cv.encode(dataset)
+        folds = cv.assign_folds(len(state['cv_ratings']), 3, seed=1)
+        arrays, user_ids, movie_ids, ratings = cv.fold_state(state, folds, 1)
+        self.assertEqual((folds == 1).sum(), len(ratings))
+
+        held_out = dataset.get_ratings(copy=False).index.isin(pd.MultiIndex.from_arrays([user_ids, movie_ids]))
+        expected_users, expected_movies, expected_ratings = dataset.split(mask=held_out)
+        expected_order = np.lexsort((expected_movies, expected_users))
+        np.testing.assert_array_equal(expected_ratings[expected_order], ratings[np.lexsort((movie_ids, user_ids))])
+        predictor = pr.Predictor()
+        predictor.fit(pp.MovieLensDatasetPreprocessor().fit_transform(dataset))
+        baseline_predictor = bl.BaselinePredictor()
+        baseline_predictor.fit(dataset)
+
+        fold_predictor = pr.Predictor.from_arrays(arrays)
+        np.testing.assert_allclose(predictor.predict_many(user_ids, movie_ids), fold_predictor.predict_many(user_ids, movie_ids))
+        np.testing.assert_allclose(
+            baseline_predictor.predict_many(user_ids, movie_ids),
+            bl.BaselinePredictor.from_statistics(fold_predictor.get_statistics()).predict_many(user_ids, movie_ids)
+        )
+
+    def test_cross_validate(self):
+        """Check if every sampled rating is held out once and parallel folds give the same results."""
+        dataset = self._dataset()
+        n_ratings = len(dataset.get_ratings(copy=False))
+        results = cv.cross_validate(dataset, n_folds=3, sample_size=300)
+        self.assertEqual([0, 1, 2], results.index.tolist())
+        self.assertEqual(300, results['ratings'].sum())
+        self.assertTrue((results[['model_mse', 'baseline_mse']] > 0).all().all())
+        self.assertEqual(n_ratings, len(dataset.get_ratings(copy=False)))
+        pd.testing.assert_frame_equal(results, cv.cross_validate(dataset, n_folds=3, sample_size=300, workers=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
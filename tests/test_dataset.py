@@ -1,5 +1,8 @@
+import os
+import tempfile
 import unittest
 import mock
+import numpy as np
 import pandas as pd
 import dm_project2.dataset as ds
 
@@ -18,64 +21,273 @@ movies_df = pd.DataFrame({
 }).set_index('movieId')
 
 
-def mock_init(self: ds.MovieLensDataset) -> None:
-    """Mock initialization for the class `MovieLensDataset`."""
-    self._ratings = ratings_df.copy()
-    self._movies = movies_df.copy()
+split_ratings_df = pd.DataFrame({
+    'userId': [1, 1, 1, 2, 2, 3, 3, 3, 3, 4],
+    'movieId': [1, 2, 3, 1, 3, 1, 2, 3, 4, 4],
+    'rating': [1.0, 2.0, 3.0, 4.0, 5.0, 0.5, 1.5, 2.5, 3.5, 4.5],
+    'timestamp': [0] * 10
+}).set_index(['userId', 'movieId'])
+
+
+def write_dataset(path: str, ratings: pd.DataFrame, movies: pd.DataFrame) -> None:
+    """Writes the `ratings` and `movies` tables into a directory as the CSV files of a dataset."""
+    ratings.reset_index().to_csv(os.path.join(path, 'ratings.csv'), index=False)
+    movies.reset_index().to_csv(os.path.join(path, 'movies.csv'), index=False)
 
 
 class TestDataset(unittest.TestCase):
     """Set of test cases for the class `MovieLensDataset`."""
 
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        write_dataset(self._tmp_dir.name, ratings_df, movies_df)
+        self._dataset = ds.MovieLensDataset('lorem', use_cache=False, data_dir=self._tmp_dir.name)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
     def test_get_ratings(self):
         """Check if retrieving the `ratings` data frame works properly."""
-        with mock.patch.object(ds.MovieLensDataset, '__init__', mock_init):
-            dataset = ds.MovieLensDataset()
-            self.assertTrue(ratings_df.equals(dataset.get_ratings()))
+        self.assertTrue(ratings_df.astype({'rating': np.float32, 'timestamp': np.int32}).equals(self._dataset.get_ratings()))
     
     def test_get_movies(self):
         """Check if retrieving the `movies` data frame works properly."""
-        with mock.patch.object(ds.MovieLensDataset, '__init__', mock_init):
-            dataset = ds.MovieLensDataset()
-            self.assertTrue(movies_df.equals(dataset.get_movies()))
+        self.assertTrue(movies_df.equals(self._dataset.get_movies()))
   
+    def test_get_ratings_snapshot(self):
+        """Check if a read-only snapshot of the `ratings` data frame shares memory and cannot be modified."""
+        expected = ratings_df.astype({'rating': np.float32, 'timestamp': np.int32})
+        ratings = self._dataset.get_ratings(copy=False)
+        self.assertTrue(expected.equals(ratings))
+        self.assertTrue(np.shares_memory(ratings['rating'].to_numpy(), self._dataset.get_ratings(copy=False)['rating'].to_numpy()))
+        with self.assertRaises(ValueError):
+            ratings.loc[(1, 1), 'rating'] = 5
+        ratings['extra'] = 0
+        self.assertTrue(expected.equals(self._dataset.get_ratings()))
+
     def test_invalid_dataset(self):
         """Check if an exception is thrown when incorrect dataset name is specified."""
         self.assertRaises(ds.InvalidDatasetException, ds.MovieLensDataset, "lorem ipsum")
+        self.assertRaises(ds.InvalidDatasetException, ds.MovieLensDataset, "lorem ipsum", data_dir="/nonexistent/lorem/ipsum")
     
     def test_get_movie_by_id(self):
         """Check if a movie can be correctly retrieved by an id."""
-        with mock.patch.object(ds.MovieLensDataset, '__init__', mock_init):
-            dataset = ds.MovieLensDataset()
-            movie = dataset.get_movie_by_id(1)
-            self.assertEqual(1, movie.id)
-            self.assertEqual('Lorem', movie.title)
-            self.assertEqual(['Ipsum'], movie.genres)
+        movie = self._dataset.get_movie_by_id(1)
+        self.assertEqual(1, movie.id)
+        self.assertEqual('Lorem', movie.title)
+        self.assertEqual(['Ipsum'], movie.genres)
 
     def test_get_nonexistent_movie(self):
         """Check if attempting to retrieve a nonexistent movie will raise an exception."""
-        with mock.patch.object(ds.MovieLensDataset, '__init__', mock_init):
-            dataset = ds.MovieLensDataset()
-            self.assertRaises(ds.InvalidMovieException, dataset.get_movie_by_id, 2)
+        self.assertRaises(ds.InvalidMovieException, self._dataset.get_movie_by_id, 2)
     
     def test_delete_rating(self):
         """Check if deleting rating works correctly."""
-        with mock.patch.object(ds.MovieLensDataset, '__init__', mock_init):
-            dataset = ds.MovieLensDataset()
-            self.assertTrue(dataset.delete_rating(1, 1))
-            self.assertTrue(dataset._ratings.empty)
+        self.assertTrue(self._dataset.delete_rating(1, 1))
+        self.assertTrue(self._dataset.get_ratings(copy=False).empty)
     
     def test_delete_rating_for_nonexistent_user(self):
         """Check if deleting rating from a user that does not exist will raise an exception."""
-        with mock.patch.object(ds.MovieLensDataset, '__init__', mock_init):
-            dataset = ds.MovieLensDataset()
-            self.assertRaises(ds.InvalidUserException, dataset.delete_rating, 2, 1)
+        self.assertRaises(ds.InvalidUserException, self._dataset.delete_rating, 2, 1)
     
     def test_delete_rating_for_nonexistent_movie(self):
         """Check if deleting rating for a movie that does not exist will raise an exception."""
-        with mock.patch.object(ds.MovieLensDataset, '__init__', mock_init):
-            dataset = ds.MovieLensDataset()
-            self.assertRaises(ds.InvalidMovieException, dataset.delete_rating, 1, 2)
+        self.assertRaises(ds.InvalidMovieException, self._dataset.delete_rating, 1, 2)
+
+
+
+class TestDatasetSplit(unittest.TestCase):
+    """Set of test cases for bulk deletion and splitting of the ratings of `MovieLensDataset`."""
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        movies = pd.DataFrame({'title': list('ABCD'), 'genres': ['Ipsum'] * 4}, index=pd.Index([1, 2, 3, 4], name='movieId'))
+        write_dataset(self._tmp_dir.name, split_ratings_df, movies)
+        self._dataset = ds.MovieLensDataset('lorem', use_cache=False, data_dir=self._tmp_dir.name)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_delete_ratings(self):
+        """Check if deleting many ratings removes exactly the existing ones."""
+        deleted = self._dataset.delete_ratings([1, 2, 3, 1], [2, 2, 4, 2])
+        self.assertEqual([True, False, True, False], deleted.tolist())
+        self.assertEqual(8, len(self._dataset.get_ratings(copy=False)))
+        self.assertNotIn((1, 2), self._dataset.get_ratings(copy=False).index)
+        self.assertNotIn((3, 4), self._dataset.get_ratings(copy=False).index)
+
+    def test_delete_ratings_invalid_ids(self):
+        """Check if deleting ratings of nonexistent users or movies raises an exception and deletes nothing."""
+        self.assertRaises(ds.InvalidUserException, self._dataset.delete_ratings, [1, 5], [1, 1])
+        self.assertRaises(ds.InvalidMovieException, self._dataset.delete_ratings, [1, 1], [1, 7])
+        self.assertEqual(10, len(self._dataset.get_ratings(copy=False)))
+
+    def test_split_matches_sample(self):
+        """Check if a random split holds out the same ratings as `pandas.DataFrame.sample`."""
+        expected = split_ratings_df.sample(4, random_state=42)
+        user_ids, movie_ids, ratings = self._dataset.split(sample_size=4, seed=42)
+        self.assertEqual(list(expected.index), list(zip(user_ids.tolist(), movie_ids.tolist())))
+        self.assertEqual(expected['rating'].tolist(), ratings.tolist())
+        self.assertEqual(6, len(self._dataset.get_ratings(copy=False)))
+        self.assertFalse(self._dataset.get_ratings(copy=False).index.isin(expected.index).any())
+
+    def test_split_fraction_and_mask(self):
+        """Check if the held-out part can be selected by a fraction or by a mask."""
+        self.assertEqual(3, len(self._dataset.split(fraction=0.3, seed=0)[0]))
+        mask = self._dataset.get_ratings(copy=False)['rating'].to_numpy() > 3.0
+        user_ids, movie_ids, ratings = self._dataset.split(mask=mask)
+        self.assertTrue((ratings > 3.0).all())
+        self.assertFalse((self._dataset.get_ratings(copy=False)['rating'] > 3.0).any())
+
+    def test_add_rating(self):
+        """Check if adding a rating keeps the table ordered and replacing a rating changes its value."""
+        self.assertTrue(self._dataset.add_rating(2, 2, 3.5, 100))
+        self.assertTrue(self._dataset.add_rating(5, 1, 1.0))
+        self.assertFalse(self._dataset.add_rating(1, 1, 4.5, 200))
+        ratings = self._dataset.get_ratings(copy=False)
+        self.assertEqual(12, len(ratings))
+        self.assertTrue(ratings.index.is_monotonic_increasing)
+        self.assertEqual([3.5, 100], ratings.loc[(2, 2)].tolist())
+        self.assertEqual([4.5, 200], ratings.loc[(1, 1)].tolist())
+
+    def test_add_rating_invalid(self):
+        """Check if adding a rating of a nonexistent movie or out of the scale raises an exception."""
+        self.assertRaises(ds.InvalidMovieException, self._dataset.add_rating, 1, 7, 3.0)
+        self.assertRaises(ValueError, self._dataset.add_rating, 1, 4, 5.5)
+        self.assertRaises(ValueError, self._dataset.add_rating, 1, 4, 3.2)
+
+    def test_ratings_listeners(self):
+        """Check if listeners are notified about added, replaced and deleted ratings."""
+        events = []
+        listener = lambda *event: events.append(event)
+        self._dataset.add_ratings_listener(listener)
+        self._dataset.add_rating(2, 2, 3.5)
+        self._dataset.add_rating(2, 2, 4.0)
+        self._dataset.delete_rating(2, 2)
+        self._dataset.delete_ratings([1, 4], [1, 4])
+        self._dataset.remove_ratings_listener(listener)
+        self._dataset.add_rating(2, 2, 3.5)
+        self.assertEqual([(2, 2, None, 3.5), (2, 2, 3.5, 4.0), (2, 2, 4.0, None), (1, 1, 1.0, None), (4, 4, 4.5, None)], events)
+
+    def test_changes_without_rebuilding(self):
+        """Check if changes of the ratings are read through the overlay of the store, without deriving a new store."""
+        store = self._dataset.get_ratings_store()
+        with mock.patch.object(ds.RatingsStore, 'from_arrays') as from_arrays, \
+                mock.patch.object(ds.RatingsStore, 'select') as select:
+            self._dataset.add_rating(2, 2, 3.5, 100)
+            self.assertIs(store, self._dataset.get_ratings_store())
+            self.assertEqual(11, len(store))
+            self.assertEqual([1, 2, 3], store.get_user_ratings(2)[0].tolist())
+            self.assertEqual([1, 2, 3], store.get_movie_ratings(2)[0].tolist())
+            self._dataset.add_rating(1, 2, 4.0, 101)
+            self._dataset.delete_rating(1, 3)
+            self._dataset.add_rating(5, 4, 1.0, 102)
+            self._dataset.delete_ratings([2, 5], [2, 4])
+            self._dataset.add_rating(2, 2, 0.5, 103)
+            self.assertEqual(([1, 2], [1.0, 4.0], [0, 101]), tuple(values.tolist() for values in store.get_user_ratings(1)))
+            self.assertEqual(([1, 2, 3], [4.0, 0.5, 1.5]), tuple(values.tolist() for values in store.get_movie_ratings(2)))
+            self.assertEqual(([1, 2, 2, 3], [1, 2, 3, 4], [1.0, 0.5, 5.0, 3.5]), tuple(
+                values.tolist() for values in store.get_rows([0, 3, 4, 8])
+            ))
+            self.assertEqual([True, False, True], store.has_ratings([2, 5, 4]).tolist())
+        self.assertFalse(from_arrays.called)
+        self.assertFalse(select.called)
+        ratings = self._dataset.get_ratings()
+        self.assertEqual([(1, 1), (1, 2), (2, 1), (2, 2), (2, 3), (3, 1), (3, 2), (3, 3), (3, 4), (4, 4)], list(ratings.index))
+        self.assertEqual([4.0, 101], ratings.loc[(1, 2)].tolist())
+        self.assertEqual([0.5, 103], ratings.loc[(2, 2)].tolist())
+        self.assertEqual(np.float32, ratings['rating'].dtype)
+        self.assertRaises(ds.InvalidUserException, self._dataset.delete_rating, 5, 4)
+
+    def test_split_invalid_options(self):
+        """Check if not giving exactly one way of selecting the held-out part raises an exception."""
+        self.assertRaises(ValueError, self._dataset.split)
+        self.assertRaises(ValueError, self._dataset.split, sample_size=2, fraction=0.5)
+        self.assertRaises(ValueError, self._dataset.split, sample_size=11)
+
+
+
+class TestDatasetLoading(unittest.TestCase):
+    """Set of test cases for loading tables of the class `MovieLensDataset`."""
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        split_ratings_df.reset_index().to_csv(os.path.join(self._tmp_dir.name, 'ratings.csv'), index=False)
+        movies = pd.DataFrame({'movieId': [1, 2, 3, 4], 'title': list('ABCD'), 'genres': ['Ipsum', 'Ipsum|Dolor', 'Ipsum', 'Dolor']})
+        movies.to_csv(os.path.join(self._tmp_dir.name, 'movies.csv'), index=False)
+        for table in ('links', 'tags'):
+            with open(os.path.join(self._tmp_dir.name, f'{table}.csv'), 'w') as file:
+                file.write(','.join(ds.TABLE_COLUMNS[table]) + '\n')
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_lazy_loading(self):
+        """Check if tables are loaded on their first use only, separately for each dataset."""
+        dataset = ds.MovieLensDataset('lorem', data_dir=self._tmp_dir.name)
+        self.assertEqual([], dataset.get_loaded_tables())
+        self.assertEqual('B', dataset.get_movie_by_id(2).title)
+        self.assertEqual(['movies'], dataset.get_loaded_tables())
+        self.assertEqual(split_ratings_df['rating'].tolist(), dataset.get_ratings(copy=False)['rating'].tolist())
+        self.assertEqual(['movies', 'ratings'], dataset.get_loaded_tables())
+        other = ds.MovieLensDataset('lorem', data_dir=self._tmp_dir.name, columns={'movies': ['genres']})
+        self.assertEqual([], other.get_loaded_tables())
+        self.assertEqual(['title', 'genres'], list(dataset.get_movies(copy=False).columns))
+        self.assertEqual(['genres'], list(other.get_movies(copy=False).columns))
+
+    def test_columns(self):
+        """Check if only the selected columns (and the required ones) are loaded, with categorical genres."""
+        for use_cache in (True, False):
+            dataset = ds.MovieLensDataset('lorem', use_cache=use_cache, data_dir=self._tmp_dir.name, columns=ds.PREDICTION_COLUMNS, categorical=True)
+            ratings = dataset.get_ratings(copy=False)
+            movies = dataset.get_movies(copy=False)
+            self.assertEqual(['rating'], list(ratings.columns))
+            self.assertEqual(['genres'], list(movies.columns))
+            self.assertIsInstance(movies['genres'].dtype, pd.CategoricalDtype)
+            self.assertEqual(['Ipsum', 'Ipsum|Dolor', 'Ipsum', 'Dolor'], movies['genres'].tolist())
+            self.assertTrue(np.array_equal(np.zeros(10), dataset.get_ratings_store().get_timestamps()))
+            self.assertTrue(dataset.add_rating(4, 1, 2.0))
+            self.assertEqual(2.0, dataset.get_ratings(copy=False).at[(4, 1), 'rating'])
+            self.assertEqual(ds.Movie(2, 'B', ['Ipsum', 'Dolor']), dataset.get_movie_by_id(2))
+            self.assertEqual(['title', 'genres'], list(dataset.get_movies(copy=False).columns))
+            self.assertEqual(['genres'], list(movies.columns))
+        self.assertRaises(ValueError, ds.MovieLensDataset, 'lorem', data_dir=self._tmp_dir.name, columns={'lorem': []})
+        self.assertRaises(ValueError, ds.MovieLensDataset, 'lorem', data_dir=self._tmp_dir.name, columns={'ratings': ['lorem']})
+
+    def test_streamed_store(self):
+        """Check if the store is built from chunks of the CSV file without loading the `ratings` table."""
+        for use_cache in (True, False):
+            dataset = ds.MovieLensDataset('lorem', use_cache=use_cache, data_dir=self._tmp_dir.name)
+            with mock.patch.object(ds.pd, 'read_csv', wraps=pd.read_csv) as read_csv, mock.patch('dm_project2.cache.chunk_rows', return_value=3):
+                store = dataset.get_ratings_store()
+            self.assertTrue(read_csv.called)
+            self.assertEqual([3] * len(read_csv.call_args_list), [call.kwargs['chunksize'] for call in read_csv.call_args_list])
+            self.assertEqual([], dataset.get_loaded_tables())
+            self.assertEqual(split_ratings_df['rating'].tolist(), store.get_ratings().tolist())
+            self.assertTrue(split_ratings_df.astype({'rating': np.float32, 'timestamp': np.int32}).equals(dataset.get_ratings()))
+
+    def test_split_reuses_store(self):
+        """Check if the store after deletions is derived from the loaded store, without the `ratings` table."""
+        dataset = ds.MovieLensDataset('lorem', data_dir=self._tmp_dir.name)
+        dataset.get_ratings_store()
+        dataset.get_movie_index()
+        with mock.patch.object(ds.RatingsStore, 'from_frame') as from_frame, mock.patch.object(ds.pd, 'read_csv') as read_csv:
+            user_ids, movie_ids, _ = dataset.split(sample_size=4, seed=42)
+            dataset.delete_ratings([3, 3], [4, 4])
+            self.assertFalse(dataset.delete_rating(3, 4))
+            store = dataset.get_ratings_store()
+        self.assertFalse(from_frame.called or read_csv.called)
+        self.assertEqual(['movies'], dataset.get_loaded_tables())
+        remaining = split_ratings_df.drop(list(zip(user_ids.tolist(), movie_ids.tolist())) + [(3, 4)], errors='ignore')
+        for name, array in ds.RatingsStore.from_frame(remaining).to_arrays().items():
+            np.testing.assert_array_equal(array, store.to_arrays()[name])
+        self.assertTrue(remaining.astype({'rating': np.float32, 'timestamp': np.int32}).equals(dataset.get_ratings()))
+
+    def test_cached_store_has_timestamps(self):
+        """Check if the cached store of the ratings is complete when timestamps are not selected."""
+        split_ratings_df.assign(timestamp=np.arange(10)).reset_index().to_csv(os.path.join(self._tmp_dir.name, 'ratings.csv'), index=False)
+        dataset = ds.MovieLensDataset('lorem', data_dir=self._tmp_dir.name, columns={'ratings': []})
+        self.assertTrue(np.array_equal(np.arange(10), dataset.get_ratings_store().get_timestamps()))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,82 @@
+import json
+import tempfile
+import unittest
+import numpy as np
+import dm_project2.predict as pr
+import dm_project2.synthetic as syn
+import dm_project2.dataset as ds
+import dm_project2.preprocessing as pp
+import dm_project2.instrumentation as instr
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Set of test cases for the instrumentation of the stages of the pipeline."""
+
+    def tearDown(self):
+        instr.disable()
+
+    def test_disabled(self):
+        """Check if nothing is recorded when the instrumentation is disabled."""
+        self.assertIsNone(instr.get_collector())
+        with instr.stage('lorem') as measured:
+            measured.add_rows(10)
+        self.assertIs(instr.stage('ipsum'), instr.stage('lorem'))
+        self.assertEqual([1, 2, 1], instr.instrumented('lorem', rows=len)(lambda values: values + [1])([1, 2]))
+        collector = instr.enable()
+        self.assertEqual({}, collector.get_stages())
+
+    def test_stages(self):
+        """Check if calls, nested stages and rows are recorded."""
+        collector = instr.enable()
+        double = instr.instrumented('double', rows=len)(lambda values: values * 2)
+        with instr.stage('outer', 5) as measured:
+            measured.add_rows(2)
+            for _ in range(3):
+                double([1, 2])
+        stages = collector.get_stages()
+        self.assertEqual({'outer', 'double'}, set(stages))
+        self.assertEqual(1, stages['outer']['calls'])
+        self.assertEqual(7, stages['outer']['rows'])
+        self.assertEqual(3, stages['double']['calls'])
+        self.assertEqual(12, stages['double']['rows'])
+        self.assertGreaterEqual(stages['outer']['seconds'], stages['double']['seconds'])
+        self.assertNotIn('peak_bytes', stages['outer'])
+        self.assertEqual(stages, json.loads(collector.to_json())['stages'])
+        self.assertIn('double', collector.summary())
+        self.assertIs(collector, instr.disable())
+        with instr.stage('outer'):
+            pass
+        self.assertEqual(1, collector.get_stages()['outer']['calls'])
+
+    def test_memory(self):
+        """Check if the peak memory of a stage includes the allocations of the stages nested in it."""
+        collector = instr.enable(trace_memory=True)
+        with instr.stage('outer'):
+            with instr.stage('inner'):
+                array = np.ones(2 ** 20)
+                del array
+            kept = np.ones(2 ** 17)
+        stages = collector.get_stages()
+        self.assertGreaterEqual(stages['inner']['peak_bytes'], 8 * 2 ** 20)
+        self.assertLess(stages['inner']['net_bytes'], 2 ** 20)
+        self.assertGreaterEqual(stages['outer']['peak_bytes'], stages['inner']['peak_bytes'])
+        self.assertGreaterEqual(stages['outer']['net_bytes'], kept.nbytes)
+
+    def test_predictor(self):
+        """Check if the stages of fitting and prediction are recorded."""
+        with tempfile.TemporaryDirectory() as data_dir:
+            syn.generate_dataset(data_dir, 3000)
+            dataset = ds.MovieLensDataset('synthetic', data_dir=data_dir)
+            ratings = dataset.get_ratings(copy=False).index[:2]
+            collector = instr.enable()
+            predictor = pr.Predictor()
+            predictor.fit(pp.MovieLensDatasetPreprocessor().fit_transform(dataset))
+            predictor.predict_many(ratings.get_level_values('userId'), ratings.get_level_values('movieId'))
+        stages = collector.get_stages()
+        for name in ('predict.fit', 'preprocessing.preprocess_ratings_packed', 'predict.predict_many', 'predict.mine_rules'):
+            self.assertIn(name, stages)
+        self.assertEqual(2, stages['predict.predict_many']['rows'])
+
+
+if __name__ == '__main__':
+    unittest.main()
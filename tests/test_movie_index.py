@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+import pandas as pd
+import dm_project2.movie_index as mi
+import dm_project2.dataset as ds
+
+
+genres = pd.Series(
+    ['Comedy|Action', '(no genres listed)', 'Drama', 'Action|Comedy', np.nan],
+    index=pd.Index(np.array([3, 10, 4, 7, 8], dtype='int32'), name='movieId'),
+    name='genres'
+)
+
+
+class TestMovieIndex(unittest.TestCase):
+    """Set of test cases for the class `MovieIndex`."""
+
+    def setUp(self):
+        self._index = mi.MovieIndex.from_genres(genres)
+
+    def test_from_genres(self):
+        """Check if genres are encoded as bitmasks over the sorted vocabulary, also from categoricals."""
+        self.assertEqual(['Action', 'Comedy', 'Drama'], self._index.get_genres())
+        self.assertEqual([3, 0, 4, 3, 0], self._index.get_genre_masks().tolist())
+        categorical = mi.MovieIndex.from_genres(genres.astype('category'))
+        self.assertEqual(self._index.get_genres(), categorical.get_genres())
+        self.assertTrue(np.array_equal(self._index.get_genre_masks(), categorical.get_genre_masks()))
+        self.assertRaises(ValueError, mi.MovieIndex.from_genres, pd.Series(['|'.join(str(i) for i in range(33))]))
+
+    def test_lookup(self):
+        """Check if movie ids are mapped to rows and genre masks (0 for unknown movies)."""
+        self.assertEqual([0, 3, -1, -1, -1], self._index.positions([3, 7, 5, 11, -1]).tolist())
+        self.assertEqual([3, 4, 0], self._index.masks([7, 4, 100]).tolist())
+        self.assertIn(10, self._index)
+        self.assertNotIn(9, self._index)
+        self.assertEqual(5, len(self._index))
+
+    def test_one_hot(self):
+        """Check if the one-hot encoding is the same as with `str.get_dummies`."""
+        expected = genres.str.get_dummies('|').drop(columns='(no genres listed)')
+        self.assertTrue(expected.equals(self._index.one_hot()))
+
+    def test_from_masks(self):
+        """Check if an index created from its masks is equivalent to the original one."""
+        index = mi.MovieIndex.from_masks(self._index.get_movie_ids(), self._index.get_genre_masks(), self._index.get_genres())
+        for name, array in self._index.to_arrays().items():
+            self.assertTrue(np.array_equal(array, index.to_arrays()[name]))
+        self.assertRaises(ValueError, mi.MovieIndex, {}, [])
+
+    def test_movie(self):
+        """Check if movies have slots instead of a dictionary of attributes and are compared by value."""
+        movie = ds.Movie(1, 'Lorem', ['Ipsum'])
+        self.assertFalse(hasattr(movie, '__dict__'))
+        self.assertEqual(ds.Movie(1, 'Lorem', ['Ipsum']), movie)
+        self.assertNotEqual(ds.Movie(2, 'Lorem', ['Ipsum']), movie)
+        self.assertEqual("Movie(id=1, title='Lorem', genres=['Ipsum'])", repr(movie))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import dm_project2.preprocessing as pp
+import dm_project2.packed_ratings as pk
+
+
+movies_df = pd.DataFrame({
+    'movieId': [1, 2, 3, 4],
+    'title': ['A', 'B', 'C', 'D'],
+    'genres': ['Comedy', 'Comedy|Drama', 'Drama', '(no genres listed)']
+}).set_index('movieId')
+
+ratings_df = pd.DataFrame({
+    'userId': [1, 1, 1, 2, 2, 4],
+    'movieId': [1, 2, 4, 2, 3, 1],
+    'rating': [4.0, 0.5, 3.0, 4.0, 5.0, 0.5],
+    'timestamp': [0] * 6
+}).astype({'userId': np.int32, 'movieId': np.int32}).set_index(['userId', 'movieId'])
+
+
+def write_dataset(path: str, ratings: pd.DataFrame, movies: pd.DataFrame) -> None:
+    """Writes the `ratings` and `movies` tables into a directory as the CSV files of a dataset."""
+    ratings.reset_index().to_csv(os.path.join(path, 'ratings.csv'), index=False)
+    movies.reset_index().to_csv(os.path.join(path, 'movies.csv'), index=False)
+
+
+class TestPackedRatings(unittest.TestCase):
+    """Set of test cases for the class `PackedRatings`."""
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        write_dataset(self._tmp_dir.name, ratings_df, movies_df)
+        dataset = pp.MovieLensDataset('lorem', use_cache=False, data_dir=self._tmp_dir.name)
+        self._preprocessor = pp.MovieLensDatasetPreprocessor().fit_transform(dataset)
+        self._packed = self._preprocessor.preprocess_ratings_packed()
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_masks(self):
+        """Check if each rating is encoded as the bits of its genres and of its rating."""
+        self.assertEqual(['Comedy', 'Drama', 'rating_0.5', 'rating_3.0', 'rating_4.0', 'rating_5.0'], self._packed.get_columns())
+        self.assertEqual([0b10001, 0b00111, 0b01000, 0b10011, 0b100010, 0b00101], self._packed.get_masks().tolist())
+        self.assertEqual([0, 3, 5, 6], self._packed.get_user_offsets().tolist())
+
+    def test_to_frame_matches_preprocess_ratings(self):
+        """Check if the materialized frame is identical to the preprocessed ratings."""
+        pd.testing.assert_frame_equal(self._preprocessor.preprocess_ratings(), self._packed.to_frame())
+
+    def test_user_frame(self):
+        """Check if the frame of a user contains exactly the user's rows."""
+        frame = self._packed.to_frame()
+        pd.testing.assert_frame_equal(frame[frame.index == 2], self._packed.user_frame(2))
+        self.assertEqual(0, len(self._packed.user_frame(3)))
+        self.assertEqual(0, len(self._packed.user_frame(100)))
+
+    def test_update(self):
+        """Check if an updated encoding matches the encoding of the changed ratings."""
+        self._packed.update(1, 0b01, 4.0, None)
+        self._packed.update(1, 0b11, 0.5, 2.0)
+        self._packed.update(3, 0b10, None, 5.0)
+        self.assertEqual(['Comedy', 'Drama', 'rating_0.5', 'rating_2.0', 'rating_3.0', 'rating_4.0', 'rating_5.0'], self._packed.get_columns())
+        self.assertEqual([0b01011, 0b10000], sorted(self._packed.get_user_masks(1).tolist()))
+        self.assertEqual([0b1000010], self._packed.get_user_masks(3).tolist())
+        self.assertEqual([0, 2, 4, 5, 6], self._packed.get_user_offsets().tolist())
+        self.assertEqual([0b10000, 0b01011, 0b100011, 0b1000010, 0b1000010, 0b00101], self._packed.get_masks().tolist())
+
+    def test_too_many_bits(self):
+        """Check if encoding more than 32 genres and ratings raises an exception."""
+        store = pk.RatingsStore.from_frame(ratings_df)
+        masks = np.zeros(len(store.get_movie_ids()), dtype=np.uint32)
+        self.assertRaises(ValueError, pk.PackedRatings.from_store, store, masks, [f'genre_{i}' for i in range(29)])
+
+
+if __name__ == '__main__':
+    unittest.main()
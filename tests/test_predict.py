@@ -0,0 +1,376 @@
+import io
+import os
+import sys
+import json
+import tempfile
+import unittest
+import subprocess
+import mock
+import numpy as np
+import pandas as pd
+import dm_project2.predict as pr
+import dm_project2.baseline as bl
+import dm_project2.dataset as ds
+import dm_project2.preprocessing as pp
+
+
+movies_df = pd.DataFrame({
+    'movieId': [1, 2, 3, 4, 5, 6, 7, 8],
+    'title': ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H'],
+    'genres': [
+        'Comedy', 'Comedy|Drama', 'Drama', 'Action|Drama', 'Action',
+        'Comedy|Romance', 'Romance', '(no genres listed)'
+    ]
+}).set_index('movieId')
+
+ratings_df = pd.DataFrame({
+    'userId': [1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 3],
+    'movieId': [1, 2, 3, 4, 5, 6, 8, 1, 3, 5, 6, 7, 2],
+    'rating': [4.0, 4.5, 3.0, 2.0, 2.5, 4.0, 3.0, 1.0, 5.0, 3.5, 1.5, 2.0, 4.0],
+    'timestamp': [0] * 13
+}).set_index(['userId', 'movieId'])
+
+
+def write_dataset(path: str, ratings: pd.DataFrame, movies: pd.DataFrame) -> None:
+    """Writes the `ratings` and `movies` tables into a directory as the CSV files of a dataset."""
+    ratings.reset_index().to_csv(os.path.join(path, 'ratings.csv'), index=False)
+    movies.reset_index().to_csv(os.path.join(path, 'movies.csv'), index=False)
+
+
+def rules_as_dict(rules: pd.DataFrame) -> dict:
+    """Converts a data frame of rules into a dictionary (ignoring the order of rules)."""
+    return {
+        (antecedents, consequents): tuple(round(rules.iloc[i][metric], 12) for metric in pr.RULE_METRICS)
+        for i, (antecedents, consequents) in enumerate(zip(rules['antecedents'], rules['consequents']))
+    }
+
+
+def table_as_dict(table: pr.RuleTable) -> dict:
+    """Converts a table of rules into a dictionary (ignoring the order of rules)."""
+    arrays = table.to_arrays()
+    return {
+        (antecedent, consequent): tuple(round(float(arrays[metric][i]), 12) for metric in pr.RULE_METRICS)
+        for i, (antecedent, consequent) in enumerate(zip(arrays['antecedents'].tolist(), arrays['consequents'].tolist()))
+    }
+
+
+class TestMiningEngines(unittest.TestCase):
+    """Set of test cases for the association rule mining engines."""
+
+    def test_bitset_engine_matches_mlxtend(self):
+        """Check if the bitset engine mines exactly the same rules as the mlxtend engine."""
+        rng = np.random.default_rng(0)
+        genres = pd.DataFrame(rng.random((200, 6)) < 0.4, columns=[f'genre_{i}' for i in range(6)])
+        ratings = pd.get_dummies(pd.Series(rng.choice([1.0, 3.0, 4.5], 200), name='rating'), prefix='rating')
+        transactions = pd.concat([genres, ratings], axis=1).astype(bool)
+        for min_support, min_threshold in [(0.01, 0.01), (0.05, 0.1), (0.3, 0.0)]:
+            expected = pr.MlxtendEngine().mine(transactions, min_support, min_threshold)
+            actual = pr.BitsetEngine().mine(transactions, min_support, min_threshold)
+            self.assertEqual(rules_as_dict(expected), rules_as_dict(actual))
+            self.assertEqual(list(expected.columns), list(actual.columns))
+
+    def test_bitset_engine_mine_table(self):
+        """Check if rules mined from packed transactions are the compiled rules mined from the frame."""
+        rng = np.random.default_rng(1)
+        genres = [f'genre_{i}' for i in range(5)]
+        rating_values = np.array([1.0, 3.0, 4.5], dtype=np.float32)
+        masks = rng.integers(0, 32, 150).astype(np.uint32) | np.left_shift(np.uint32(32), rng.integers(0, 3, 150).astype(np.uint32))
+        for min_support, min_threshold in [(0.01, 0.01), (0.05, 0.1)]:
+            tables = [
+                pr.MlxtendEngine().mine_table(masks, genres, rating_values, min_support, min_threshold),
+                pr.MiningEngine.mine_table(pr.BitsetEngine(), masks, genres, rating_values, min_support, min_threshold),
+                pr.BitsetEngine().mine_table(masks, genres, rating_values, min_support, min_threshold)
+            ]
+            self.assertGreater(len(tables[0]), 0)
+            expected, *actual = [table_as_dict(table) for table in tables]
+            for rules in actual:
+                self.assertEqual(expected, rules)
+        self.assertEqual(0, len(pr.BitsetEngine().mine_table(masks[:0], genres, rating_values, 0.1, 0.1)))
+
+    def test_bitset_engine_without_transactions(self):
+        """Check if mining an empty set of transactions gives no rules."""
+        transactions = pd.DataFrame(columns=['Comedy', 'rating_1.0'], dtype=bool)
+        self.assertTrue(pr.BitsetEngine().mine(transactions, 0.1, 0.1).empty)
+
+    def test_bitset_engine_invalid_support(self):
+        """Check if a nonpositive minimum support raises an exception (as in mlxtend)."""
+        transactions = pd.DataFrame({'Comedy': [True], 'rating_1.0': [True]})
+        self.assertRaises(ValueError, pr.BitsetEngine().mine, transactions, 0.0, 0.1)
+
+    def test_engine_interface(self):
+        """Check if the interface cannot be instantiated without implementing `mine`."""
+        self.assertRaises(TypeError, pr.MiningEngine)
+
+
+class TestPredictor(unittest.TestCase):
+    """Set of test cases for the class `Predictor`."""
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        write_dataset(self._tmp_dir.name, ratings_df, movies_df)
+        self._dataset = ds.MovieLensDataset('lorem', use_cache=False, data_dir=self._tmp_dir.name)
+        self._predictor = pr.Predictor()
+        self._predictor.fit(pp.MovieLensDatasetPreprocessor().fit_transform(self._dataset))
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_predict_many_matches_predict(self):
+        """Check if batch predictions are identical to single predictions."""
+        user_ids = [1, 2, 1, 3, 2]
+        movie_ids = [7, 2, 5, 6, 8]
+        predictions = self._predictor.predict_many(user_ids, movie_ids, 0.1, 0.1, 'lift', 0.3, 0.6)
+        for user_id, movie_id, prediction in zip(user_ids, movie_ids, predictions):
+            self.assertAlmostEqual(self._predictor.predict(user_id, movie_id, 0.1, 0.1, 'lift', 0.3, 0.6), prediction)
+
+    def test_predict_without_rules(self):
+        """Check if the prediction falls back to averages when no rule applies."""
+        prediction = self._predictor.predict(3, 5, beta=1.0)
+        self.assertAlmostEqual((3.0 + 4.0) / 2, prediction)
+
+    def test_predict_with_reference_engine(self):
+        """Check if predictions are the same regardless of the mining engine."""
+        predictor = pr.Predictor(engine=pr.MlxtendEngine())
+        predictor.fit(pp.MovieLensDatasetPreprocessor().fit_transform(self._dataset))
+        for user_id, movie_id in [(1, 7), (2, 2), (2, 4), (3, 1)]:
+            self.assertAlmostEqual(predictor.predict(user_id, movie_id), self._predictor.predict(user_id, movie_id))
+
+    def test_predict_with_cube(self):
+        """Check if predictions based on the counting cube are the same as with mining."""
+        predictor = pr.Predictor(use_cube=True)
+        predictor.fit(pp.MovieLensDatasetPreprocessor().fit_transform(self._dataset))
+        user_ids, movie_ids = [1, 2, 2, 3, 3, 1], [7, 2, 4, 1, 5, 8]
+        for parameters in [(), (0.1, 0.1, 'lift', 0.3, 0.6), (0.2, 0.05, 'support', 0.5, 1.0)]:
+            np.testing.assert_allclose(
+                self._predictor.predict_many(user_ids, movie_ids, *parameters),
+                predictor.predict_many(user_ids, movie_ids, *parameters)
+            )
+
+    def test_from_arrays(self):
+        """Check if a predictor recreated from the arrays of its fitted state gives the same predictions."""
+        for use_cube in [False, True]:
+            predictor = pr.Predictor(use_cube=use_cube)
+            predictor.fit(pp.MovieLensDatasetPreprocessor().fit_transform(self._dataset))
+            restored = pr.Predictor.from_arrays(predictor.to_arrays())
+            user_ids, movie_ids = [1, 2, 2, 3, 3], [7, 2, 4, 1, 8]
+            np.testing.assert_allclose(predictor.predict_many(user_ids, movie_ids), restored.predict_many(user_ids, movie_ids))
+            self.assertRaises(ds.InvalidMovieException, restored.predict, 1, 100)
+
+    def test_save_and_load(self):
+        """Check if a saved and loaded predictor gives the same predictions."""
+        user_ids, movie_ids = [1, 2, 2, 3, 3], [7, 2, 4, 1, 8]
+        with tempfile.TemporaryDirectory() as path:
+            self._predictor.save(path)
+            for mmap in [True, False]:
+                loaded = pr.Predictor.load(path, mmap=mmap)
+                np.testing.assert_allclose(self._predictor.predict_many(user_ids, movie_ids), loaded.predict_many(user_ids, movie_ids))
+
+    def test_load_without_pandas(self):
+        """Check if a saved predictor is loaded and used without importing pandas."""
+        script = (
+            'import sys, json, dm_project2.predict as pr; '
+            'predictor = pr.Predictor.load(sys.argv[1], mmap=True); '
+            'print(json.dumps([predictor.predict_many([1, 2, 3], [7, 4, 8]).tolist(), "pandas" in sys.modules]))'
+        )
+        with tempfile.TemporaryDirectory() as path:
+            self._predictor.save(path)
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            output = subprocess.run([sys.executable, '-c', script, path], cwd=root, capture_output=True, text=True, check=True).stdout
+        predictions, pandas_imported = json.loads(output)
+        np.testing.assert_allclose(self._predictor.predict_many([1, 2, 3], [7, 4, 8]), predictions)
+        self.assertFalse(pandas_imported)
+
+    def test_load_invalid_artifact(self):
+        """Check if loading a missing artifact or one of another format version raises an exception."""
+        with tempfile.TemporaryDirectory() as path:
+            self.assertRaises(ValueError, pr.Predictor.load, path)
+            self._predictor.save(path)
+            with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+            manifest['format_version'] += 1
+            with open(os.path.join(path, 'manifest.json'), 'w', encoding='utf-8') as file:
+                json.dump(manifest, file)
+            self.assertRaises(ValueError, pr.Predictor.load, path)
+
+    def test_predict_many_empty(self):
+        """Check if predicting an empty batch gives no predictions."""
+        self.assertEqual(0, len(self._predictor.predict_many([], [])))
+
+    def test_rule_cache(self):
+        """Check if rules of a user are mined once and invalidated when the user's ratings change."""
+        cache = self._predictor.get_rule_cache()
+        first = self._predictor.predict(1, 7)
+        self.assertEqual(first, self._predictor.predict(1, 7))
+        self.assertEqual((1, 1), (cache.get_hits(), cache.get_misses()))
+        self._dataset.delete_rating(1, 6)
+        self.assertEqual(0, len(cache))
+
+    def test_incremental_update(self):
+        """Check if a predictor updated after changes of the ratings predicts as one fitted to the changed dataset."""
+        predictor = pr.Predictor(use_cube=True)
+        predictor.fit(pp.MovieLensDatasetPreprocessor().fit_transform(self._dataset))
+        baseline = bl.BaselinePredictor()
+        baseline.fit(self._dataset)
+        self._dataset.delete_rating(1, 6)
+        self._dataset.add_rating(2, 2, 4.5)
+        self._dataset.add_rating(3, 2, 0.5)
+        self._dataset.add_rating(4, 5, 3.0)
+        refitted = pr.Predictor()
+        refitted.fit(pp.MovieLensDatasetPreprocessor().fit_transform(self._dataset))
+        user_ids, movie_ids = [1, 1, 2, 2, 3, 4, 4], [6, 7, 2, 4, 1, 5, 6]
+        expected = refitted.predict_many(user_ids, movie_ids, 0.1, 0.1)
+        np.testing.assert_allclose(expected, self._predictor.predict_many(user_ids, movie_ids, 0.1, 0.1))
+        np.testing.assert_allclose(expected, predictor.predict_many(user_ids, movie_ids, 0.1, 0.1))
+        refitted_baseline = bl.BaselinePredictor()
+        refitted_baseline.fit(self._dataset)
+        np.testing.assert_allclose(refitted_baseline.predict_many(user_ids, movie_ids), baseline.predict_many(user_ids, movie_ids))
+
+    def test_predict_grid_matches_predict_many(self):
+        """Check if predictions for a grid of parameters are identical to predictions for each combination."""
+        user_ids, movie_ids = [1, 2, 1, 3, 2, 1], [7, 2, 5, 6, 8, 3]
+        grid = [[0.1, 0.3], [0.05, 0.2, 0.4], ['confidence', 'lift', 'support'], [0.0, 0.7], [0.2, 1.0]]
+        predictions = self._predictor.predict_grid(user_ids, movie_ids, *grid)
+        self.assertEqual((2, 3, 3, 2, 2, len(user_ids)), predictions.shape)
+        for indices in np.ndindex(*predictions.shape[:-1]):
+            parameters = [values[index] for values, index in zip(grid, indices)]
+            np.testing.assert_allclose(self._predictor.predict_many(user_ids, movie_ids, *parameters), predictions[indices])
+
+    def test_predict_grid_invalid_parameters(self):
+        """Check if invalid values of the parameters of the grid are rejected."""
+        self.assertRaises(AssertionError, self._predictor.predict_grid, [1], [7], [0.1], [0.1], ['confidence'], [0.5, 1.5])
+        self.assertRaises(AssertionError, self._predictor.predict_grid, [1], [7], [0.1], [0.1], ['unknown'])
+        self.assertRaises(AssertionError, self._predictor.predict_grid, [1], [7], [])
+
+    def test_recommend(self):
+        """Check if the recommended movies are the unrated movies with the highest predictions."""
+        for predictor in (self._predictor, pr.Predictor(use_cube=True)):
+            predictor.fit(pp.MovieLensDatasetPreprocessor().fit_transform(self._dataset))
+            movie_ids, predictions = predictor.recommend(2, 2, 0.1, 0.1, 'lift', 0.3, 0.6)
+            unrated = np.array([2, 4, 8])
+            expected = predictor.predict_many([2] * len(unrated), unrated, 0.1, 0.1, 'lift', 0.3, 0.6)
+            order = np.lexsort((unrated, -expected))[:2]
+            np.testing.assert_array_equal(unrated[order], movie_ids)
+            np.testing.assert_allclose(expected[order], predictions)
+
+    def test_recommend_exclude(self):
+        """Check if only the explicitly excluded movies are skipped and all candidates are returned for a large n."""
+        movie_ids, predictions = self._predictor.recommend(3, 100, exclude=[1, 5, 100])
+        self.assertEqual([2, 3, 4, 6, 7, 8], sorted(movie_ids.tolist()))
+        self.assertTrue((np.diff(predictions) <= 0).all())
+        self.assertEqual(0, len(self._predictor.recommend(3, 0)[0]))
+
+    def test_recommend_after_update(self):
+        """Check if recommendations follow changes of the ratings."""
+        self._predictor.recommend(1, 3)
+        self._dataset.add_rating(1, 7, 5.0)
+        self._dataset.add_rating(2, 2, 0.5)
+        movie_ids, predictions = self._predictor.recommend(1, 3)
+        self.assertEqual([], movie_ids.tolist())
+        movie_ids, predictions = self._predictor.recommend(3, 3)
+        np.testing.assert_allclose(self._predictor.predict_many([3] * len(movie_ids), movie_ids), predictions)
+
+    def test_recommend_unknown_user(self):
+        """Check if recommending movies to a user without ratings raises an exception."""
+        self.assertRaises(ds.InvalidUserException, self._predictor.recommend, 100)
+
+    def test_materialize(self):
+        """Check if predictions looked up in the materialized table are the same as computed ones."""
+        user_ids, movie_ids = [1, 2, 1, 3, 2, 1], [7, 2, 5, 6, 8, 3]
+        expected = self._predictor.predict_many(user_ids, movie_ids, 0.1, 0.1)
+        table = self._predictor.materialize(n_users=2, threshold_itemsets=0.1, threshold_rules=0.1)
+        self.assertEqual([1, 2], table.get_user_ids().tolist())
+        with mock.patch.object(self._predictor, '_rules_predictions', wraps=self._predictor._rules_predictions) as computed:
+            np.testing.assert_allclose(expected, self._predictor.predict_many(user_ids, movie_ids, 0.1, 0.1))
+            self.assertEqual(1, computed.call_count)
+            self._predictor.predict_many(user_ids, movie_ids)
+            self.assertEqual(4, computed.call_count)
+
+    def test_materialize_after_update(self):
+        """Check if rows of the table are recomputed after ratings change."""
+        self._predictor.materialize([1, 3], threshold_itemsets=0.1, threshold_rules=0.1)
+        self._dataset.add_rating(1, 7, 5.0)
+        self._dataset.delete_rating(3, 2)
+        self._dataset.add_rating(3, 1, 1.0)
+        self.assertEqual([1, 3], self._predictor.get_prediction_table().get_stale_users())
+        refitted = pr.Predictor()
+        refitted.fit(pp.MovieLensDatasetPreprocessor().fit_transform(self._dataset))
+        user_ids, movie_ids = [1, 1, 3, 3], [2, 6, 4, 5]
+        np.testing.assert_allclose(refitted.predict_many(user_ids, movie_ids, 0.1, 0.1), self._predictor.predict_many(user_ids, movie_ids, 0.1, 0.1))
+        self.assertEqual([], self._predictor.get_prediction_table().get_stale_users())
+
+    def test_materialize_save_and_load(self):
+        """Check if the materialized table is saved with the predictor."""
+        self._predictor.materialize(n_users=3)
+        with tempfile.TemporaryDirectory() as path:
+            self._predictor.save(path)
+            loaded = pr.Predictor.load(path)
+            table = loaded.get_prediction_table()
+            self.assertEqual([1, 2, 3], table.get_user_ids().tolist())
+            np.testing.assert_allclose(self._predictor.predict_many([1, 3], [7, 5]), loaded.predict_many([1, 3], [7, 5]))
+        self._predictor.drop_prediction_table()
+        self.assertIsNone(self._predictor.get_prediction_table())
+
+    def test_predict_invalid_movie(self):
+        """Check if predicting a rating of a nonexistent movie raises an exception."""
+        self.assertRaises(ds.InvalidMovieException, self._predictor.predict_many, [1], [100])
+
+
+class TestBatchPrediction(unittest.TestCase):
+    """Set of test cases for the batch mode of the command line interface."""
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        write_dataset(self._tmp_dir.name, ratings_df, movies_df)
+        self._dataset = ds.MovieLensDataset('lorem', use_cache=False, data_dir=self._tmp_dir.name)
+        self._predictor = pr.Predictor()
+        self._predictor.fit(pp.MovieLensDatasetPreprocessor().fit_transform(self._dataset))
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_parse_pair(self):
+        """Check if pairs are parsed from CSV and JSON lines."""
+        self.assertEqual((1, 7), pr.parse_pair(' 1, 7\n'))
+        self.assertEqual((2, 3), pr.parse_pair('{"user_id": 2, "movie_id": 3, "other": "x"}'))
+        for line in ['1', '1,2,3', 'a,b', '0,1', '{"user_id": 1}', '{"user_id": 1.5, "movie_id": 2}', '{"user_id": true, "movie_id": 2}', '{']:
+            self.assertRaises(ValueError, pr.parse_pair, line)
+
+    def test_read_pairs(self):
+        """Check if the header and empty lines are skipped and invalid lines are reported."""
+        items = list(pr.read_pairs(['userId,movieId\n', '1,7\n', '\n', 'x\n', 'user_id,movie_id\n']))
+        self.assertEqual([2, 4, 5], [number for number, _, _ in items])
+        self.assertEqual((1, 7), items[0][1])
+        self.assertTrue(all(pair is None and error for _, pair, error in items[1:]))
+
+    def test_predict_batch(self):
+        """Check if batch predictions match predictions of the pairs and errors do not stop the batch."""
+        lines = ['1,7', '{"user_id": 2, "movie_id": 100}', '2,2', 'invalid', '4,1', '3,6']
+        output = io.StringIO()
+        counts = pr.predict_batch(self._predictor, lines, pr.BatchWriter(output), chunk_size=4)
+        self.assertEqual({'predicted': 3, 'errors': 3}, counts)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([1, 2, 3, 4, 5, 6], [record['line'] for record in records])
+        for record in (records[0], records[2], records[5]):
+            self.assertAlmostEqual(self._predictor.predict(record['user_id'], record['movie_id']), record['prediction'])
+            self.assertEqual(pr.round_rating(record['prediction']), record['rounded'])
+        for record in (records[1], records[3], records[4]):
+            self.assertIn('error', record)
+            self.assertNotIn('prediction', record)
+
+    def test_predict_batch_csv(self):
+        """Check if the results are written in CSV format."""
+        output = io.StringIO()
+        pr.predict_batch(self._predictor, ['1,7', '1,100'], pr.BatchWriter(output, 'csv'))
+        frame = pd.read_csv(io.StringIO(output.getvalue()))
+        self.assertEqual(list(pr.BatchWriter.COLUMNS), list(frame.columns))
+        self.assertAlmostEqual(self._predictor.predict(1, 7), frame['prediction'][0])
+        self.assertTrue(np.isnan(frame['prediction'][1]))
+        self.assertIn('movieId=100', frame['error'][1])
+
+    def test_batch_writer_invalid_format(self):
+        """Check if an unsupported output format is rejected."""
+        self.assertRaises(ValueError, pr.BatchWriter, io.StringIO(), 'xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
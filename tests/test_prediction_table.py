@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+import dm_project2.prediction_table as pt
+
+
+movie_masks = np.array([0b01, 0b11, 0b01, 0b00, 0b10], dtype=np.uint32)
+
+
+class TestPredictionTable(unittest.TestCase):
+    """Set of test cases for the class `PredictionTable`."""
+
+    def setUp(self):
+        self._table = pt.PredictionTable.create([7, 3], movie_masks, 0.1, 0.2, 'lift')
+        for user_id in self._table.get_stale_users():
+            self._table.set_row(user_id, user_id + self._table.get_signatures() / 10)
+
+    def test_create(self):
+        """Check if the table has a row for each user and a column for each distinct genre mask."""
+        self.assertEqual([3, 7], self._table.get_user_ids().tolist())
+        self.assertEqual([0b00, 0b01, 0b10, 0b11], self._table.get_signatures().tolist())
+        self.assertEqual((0.1, 0.2, 'lift'), self._table.get_parameters())
+        self.assertEqual([], self._table.get_stale_users())
+        self.assertEqual(['user_ids', 'user_lookup', 'signatures', 'movie_signatures', 'predictions', 'thresholds', 'metric'], list(self._table.to_arrays()))
+
+    def test_lookup(self):
+        """Check if predictions are looked up by user and genre mask of the movie."""
+        predictions, covered = self._table.lookup(np.array([3, 7, 5, 100, 3]), np.array([1, 4, 0, 2, -1]))
+        self.assertEqual([True, True, False, False, False], covered.tolist())
+        np.testing.assert_allclose([3.3, 7.2], predictions[:2])
+        self.assertTrue(np.isnan(predictions[2:]).all())
+
+    def test_invalidate(self):
+        """Check if stale rows are not covered until they are recomputed."""
+        self._table.invalidate(7)
+        self._table.invalidate(5)
+        self.assertEqual([7], self._table.get_stale_users())
+        self.assertEqual([True, False], self._table.lookup(np.array([3, 7]), np.array([0, 0]))[1].tolist())
+        self._table.set_row(7, np.full(4, 1.5))
+        predictions, covered = self._table.lookup(np.array([3, 7]), np.array([0, 0]))
+        self.assertTrue(covered.all())
+        self.assertEqual(1.5, predictions[1])
+
+    def test_read_only_arrays(self):
+        """Check if a table of read-only arrays is copied before an update."""
+        arrays = self._table.to_arrays()
+        arrays['predictions'].flags.writeable = False
+        table = pt.PredictionTable(arrays)
+        table.set_row(3, np.zeros(4))
+        self.assertEqual(0.0, table.lookup(np.array([3]), np.array([0]))[0][0])
+        self.assertEqual(3.1, arrays['predictions'][0, 1])
+
+    def test_missing_arrays(self):
+        """Check if a table cannot be created without all of its arrays."""
+        arrays = self._table.to_arrays()
+        del arrays['signatures']
+        self.assertRaises(ValueError, pt.PredictionTable, arrays)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import numpy as np
+import pandas as pd
+import dm_project2.rating_cube as rc
+import dm_project2.predict as pr
+
+
+genres = ['Action', 'Comedy', 'Drama']
+movie_masks = pd.Series([0b010, 0b110, 0b100, 0b101, 0b001, 0b000], index=[1, 2, 3, 4, 5, 6])
+
+ratings_df = pd.DataFrame({
+    'userId': [1, 1, 1, 1, 1, 1, 2, 2, 2],
+    'movieId': [1, 2, 3, 4, 5, 6, 1, 3, 5],
+    'rating': [4.0, 4.0, 3.0, 2.0, 2.5, 4.0, 1.0, 5.0, 3.5],
+    'timestamp': [0] * 9
+}).set_index(['userId', 'movieId'])
+
+
+class TestRatingCube(unittest.TestCase):
+    """Set of test cases for the class `RatingCube`."""
+
+    def setUp(self):
+        store = rc.RatingsStore.from_frame(ratings_df)
+        masks = movie_masks.reindex(store.get_movie_ids()).to_numpy(dtype=np.uint32)
+        self._cube = rc.RatingCube.build(store, masks, genres)
+
+    def test_user_entries(self):
+        """Check if cells of the cube count ratings of each combination of genres and rating."""
+        masks, ratings, counts = self._cube.get_user_entries(1)
+        entries = {(int(mask), float(rating)): int(count) for mask, rating, count in zip(masks, ratings, counts)}
+        self.assertEqual({
+            (0b000, 4.0): 1, (0b001, 2.5): 1, (0b010, 4.0): 1,
+            (0b100, 3.0): 1, (0b101, 2.0): 1, (0b110, 4.0): 1
+        }, entries)
+        self.assertEqual(9, int(self._cube.to_arrays()['counts'].sum()))
+
+    def test_rules_match_mining(self):
+        """Check if rules derived from the cube are the mined rules whose antecedents are subsets of the genres."""
+        user_ratings = ratings_df.loc[1].join(movie_masks.rename('mask'))
+        masks = user_ratings['mask'].to_numpy()
+        transactions = pd.DataFrame({genre: (masks >> bit) & 1 == 1 for bit, genre in enumerate(genres)}, index=user_ratings.index)
+        transactions = pd.concat([transactions, pd.get_dummies(user_ratings['rating'], prefix='rating')], axis=1).astype(bool)
+        for genre_mask in [0b110, 0b101, 0b111]:
+            for min_support, min_threshold in [(0.1, 0.1), (0.2, 0.1), (0.1, 0.3)]:
+                mined = pr.BitsetEngine().mine(transactions, min_support, min_threshold)
+                names = {genre for bit, genre in enumerate(genres) if genre_mask >> bit & 1}
+                mined = mined[mined['antecedents'].apply(lambda x: x <= names).astype(bool)]
+                expected = {
+                    (frozenset(a), float(next(iter(c)).split('_')[1])): tuple(round(rule[m], 12) for m in rc.RULE_METRICS)
+                    for (_, rule), a, c in zip(mined.iterrows(), mined['antecedents'], mined['consequents'])
+                }
+                rules = self._cube.rules(1, genre_mask, min_support, min_threshold)
+                actual = {
+                    (frozenset(g for bit, g in enumerate(genres) if int(a) >> bit & 1), float(c)):
+                        tuple(round(float(rules[m][i]), 12) for m in rc.RULE_METRICS)
+                    for i, (a, c) in enumerate(zip(rules['antecedents'], rules['consequents']))
+                }
+                self.assertEqual(expected, actual)
+
+    def test_update(self):
+        """Check if an updated cube gives the same rules as a cube built from the changed ratings."""
+        changed = ratings_df.drop((1, 2))
+        changed.loc[(1, 4), 'rating'] = 4.0
+        changed.loc[(2, 6), :] = [0.5, 0]
+        store = rc.RatingsStore.from_frame(changed)
+        expected = rc.RatingCube.build(store, movie_masks.reindex(store.get_movie_ids()).to_numpy(dtype=np.uint32), genres)
+        self._cube.update(1, 0b110, 4.0, None)
+        self._cube.update(1, 0b101, 2.0, 4.0)
+        self._cube.update(2, 0b000, None, 0.5)
+        for user_id in [1, 2]:
+            expected_rules, actual_rules = expected.rules(user_id, 0b111, 0.1, 0.1), self._cube.rules(user_id, 0b111, 0.1, 0.1)
+            as_set = lambda rules: set(zip(rules['antecedents'].tolist(), rules['consequents'].tolist(), np.round(rules['lift'], 12).tolist()))
+            self.assertEqual(as_set(expected_rules), as_set(actual_rules))
+        self.assertEqual(len(expected), len(self._cube))
+
+    def test_rules_unknown_user(self):
+        """Check if there are no rules for users without ratings."""
+        self.assertEqual(0, len(self._cube.rules(7, 0b111, 0.1, 0.1)['antecedents']))
+        self.assertEqual(0, len(self._cube.rules(-1, 0b111, 0.1, 0.1)['antecedents']))
+
+    def test_rules_invalid_support(self):
+        """Check if a nonpositive minimum support raises an exception (as in mining)."""
+        self.assertRaises(ValueError, self._cube.rules, 1, 0b111, 0.0, 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import math
+import unittest
+import pandas as pd
+import dm_project2.rating_stats as stats
+
+
+ratings_df = pd.DataFrame({
+    'userId': [1, 1, 1, 3, 3, 7],
+    'movieId': [2, 5, 9, 5, 1, 2],
+    'rating': [4.0, 3.5, 1.0, 5.0, 0.5, 2.0],
+    'timestamp': [10, 11, 12, 13, 14, 15]
+}).set_index(['userId', 'movieId'])
+
+
+class TestRatingStatistics(unittest.TestCase):
+    """Set of test cases for the class `RatingStatistics`."""
+
+    def setUp(self):
+        store = stats.RatingsStore.from_frame(ratings_df)
+        self._statistics = stats.RatingStatistics.from_store(store)
+
+    def test_user_statistics(self):
+        """Check if per-user statistics match the ratings."""
+        self.assertEqual([3, 2, 1], self._statistics.user_count([1, 3, 7]).tolist())
+        self.assertEqual([8.5, 5.5, 2.0], self._statistics.user_sum([1, 3, 7]).tolist())
+        self.assertAlmostEqual(8.5 / 3, float(self._statistics.user_mean(1)))
+
+    def test_movie_statistics(self):
+        """Check if per-movie statistics match the ratings."""
+        self.assertEqual([1, 2, 2, 1], self._statistics.movie_count([1, 2, 5, 9]).tolist())
+        self.assertEqual([0.5, 3.0, 4.25, 1.0], self._statistics.movie_mean([1, 2, 5, 9]).tolist())
+
+    def test_global_statistics(self):
+        """Check if global statistics match the ratings."""
+        self.assertEqual(6, self._statistics.get_global_count())
+        self.assertAlmostEqual(ratings_df['rating'].mean(), self._statistics.get_global_mean())
+
+    def test_unknown_ids(self):
+        """Check if statistics of users and movies without ratings are empty."""
+        self.assertEqual(0, int(self._statistics.user_count(2)))
+        self.assertTrue(math.isnan(float(self._statistics.user_mean(2))))
+        self.assertTrue(math.isnan(float(self._statistics.movie_mean(100))))
+        self.assertTrue(math.isnan(float(self._statistics.movie_mean(-1))))
+
+    def test_update(self):
+        """Check if updated statistics match the statistics of the changed ratings."""
+        self._statistics.update(1, 2, 4.0, None)
+        self._statistics.update(3, 9, None, 2.0)
+        self._statistics.update(7, 2, 2.0, 3.0)
+        self._statistics.update(12, 20, None, 5.0)
+        self.assertEqual([2, 3, 1, 1], self._statistics.user_count([1, 3, 7, 12]).tolist())
+        self.assertEqual([2.25, 7.5 / 3, 3.0, 5.0], self._statistics.user_mean([1, 3, 7, 12]).tolist())
+        self.assertEqual([1, 1, 2, 2, 1], self._statistics.movie_count([1, 2, 5, 9, 20]).tolist())
+        self.assertEqual([0.5, 3.0, 4.25, 1.5, 5.0], self._statistics.movie_mean([1, 2, 5, 9, 20]).tolist())
+        self.assertEqual(7, self._statistics.get_global_count())
+
+
+if __name__ == '__main__':
+    unittest.main()
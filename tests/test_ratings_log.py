@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import dm_project2.ratings_log as rl
+
+
+class TestRatingsLog(unittest.TestCase):
+    """Set of test cases for the class `RatingsLog`."""
+
+    def setUp(self):
+        self._log = rl.RatingsLog(capacity=2)
+        self._log.append(1, 5, 3.5, 10)
+        self._log.append(2, 5, 1.0, 11)
+        self._log.append(1, 5, 4.0, 12)
+        self._log.append(1, 7, 2.0, 13)
+        self._log.append(2, 5, None, 14)
+
+    def test_append(self):
+        """Check if all changes are kept in the order of the log, with NaN for deleted ratings."""
+        self.assertEqual(5, len(self._log))
+        self.assertEqual([1, 2, 1, 1, 2], self._log.get_user_ids().tolist())
+        self.assertEqual([5, 5, 5, 7, 5], self._log.get_movie_ids().tolist())
+        np.testing.assert_array_equal([3.5, 1.0, 4.0, 2.0, np.nan], self._log.get_ratings())
+        self.assertEqual([10, 11, 12, 13, 14], self._log.get_timestamps().tolist())
+
+    def test_latest_changes(self):
+        """Check if only the latest change of each pair is looked up, skipping deleted ratings."""
+        self.assertEqual(2, self._log.get_count())
+        self.assertEqual([2, 3], self._log.get_current().tolist())
+        self.assertEqual([2, 3, -1, -1], self._log.positions([1, 1, 2, 3], [5, 7, 5, 5]).tolist())
+        self.assertEqual([3], self._log.positions([1], [7]).tolist())
+        self.assertEqual([-1], self._log.positions([2], [5]).tolist())
+        self.assertEqual([True, False, False], self._log.has_ratings([1, 2, 3]).tolist())
+        self.assertEqual([False], self._log.has_ratings([2]).tolist())
+        self.assertEqual(([5], [4]), tuple(values.tolist() for values in self._log.get_user_changes(2)))
+        self.assertEqual(([1, 2], [2, 4]), tuple(values.tolist() for values in self._log.get_movie_changes(5)))
+        self.assertEqual(0, len(self._log.get_user_changes(3)[0]))
+
+    def test_empty(self):
+        """Check if nothing is found in an empty log."""
+        log = rl.RatingsLog()
+        self.assertEqual((0, 0), (len(log), log.get_count()))
+        self.assertEqual([-1, -1], log.positions([1, 2], [1, 1]).tolist())
+        self.assertEqual(0, len(log.get_current()))
+
+
+if __name__ == '__main__':
+    unittest.main()
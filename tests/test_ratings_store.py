@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+import pandas as pd
+import dm_project2.ratings_store as rs
+
+
+ratings_df = pd.DataFrame({
+    'userId': [1, 1, 1, 3, 3, 7],
+    'movieId': [2, 5, 9, 5, 1, 2],
+    'rating': [4.0, 3.5, 1.0, 5.0, 0.5, 2.0],
+    'timestamp': [10, 11, 12, 13, 14, 15]
+}).set_index(['userId', 'movieId'])
+
+
+class TestRatingsStore(unittest.TestCase):
+    """Set of test cases for the class `RatingsStore`."""
+
+    def setUp(self):
+        self._store = rs.RatingsStore.from_frame(ratings_df)
+
+    def test_dense_indices(self):
+        """Check if users and movies are assigned dense indices in the order of their ids."""
+        self.assertEqual([1, 3, 7], self._store.get_user_ids().tolist())
+        self.assertEqual([1, 2, 5, 9], self._store.get_movie_ids().tolist())
+        self.assertEqual([0, 1, 2, -1, -1], self._store.user_index([1, 3, 7, 2, 100]).tolist())
+        self.assertEqual(3, int(self._store.movie_index(9)))
+
+    def test_get_user_ratings(self):
+        """Check if ratings of a user are retrieved in the order of movie ids."""
+        movie_ids, ratings, timestamps = self._store.get_user_ratings(3)
+        self.assertEqual([1, 5], movie_ids.tolist())
+        self.assertEqual([0.5, 5.0], ratings.tolist())
+        self.assertEqual([14, 13], timestamps.tolist())
+
+    def test_get_movie_ratings(self):
+        """Check if ratings of a movie are retrieved in the order of user ids."""
+        user_ids, ratings = self._store.get_movie_ratings(2)
+        self.assertEqual([1, 7], user_ids.tolist())
+        self.assertEqual([4.0, 2.0], ratings.tolist())
+
+    def test_unknown_ids(self):
+        """Check if retrieving ratings of unknown users and movies gives empty results."""
+        self.assertEqual(0, len(self._store.get_user_ratings(2)[0]))
+        self.assertEqual(0, len(self._store.get_movie_ratings(100)[0]))
+
+    def test_narrow_dtypes(self):
+        """Check if the store uses narrow dtypes for per-rating arrays."""
+        self.assertEqual(np.int32, self._store.get_rated_movies().dtype)
+        self.assertEqual(np.float32, self._store.get_ratings().dtype)
+        self.assertEqual(np.int32, self._store.get_timestamps().dtype)
+
+    def test_arrays_round_trip(self):
+        """Check if a store recreated from its arrays is identical."""
+        store = rs.RatingsStore(self._store.to_arrays())
+        self.assertEqual(len(self._store), len(store))
+        self.assertEqual([2, 5, 9], store.get_user_ratings(1)[0].tolist())
+
+    def test_from_chunks(self):
+        """Check if a store built from chunks of a table is identical to the store built from the whole table."""
+        chunks = [ratings_df.reset_index().iloc[start:start + 4] for start in (0, 4)]
+        arrays = rs.RatingsStore.from_chunks(chunks).to_arrays()
+        for name, array in self._store.to_arrays().items():
+            self.assertEqual(array.dtype, arrays[name].dtype)
+            np.testing.assert_array_equal(array, arrays[name])
+        self.assertTrue((rs.RatingsStore.from_chunks([chunks[0].drop(columns='timestamp')]).get_timestamps() == 0).all())
+        self.assertEqual(0, len(rs.RatingsStore.from_chunks([])))
+
+    def test_get_pairs(self):
+        """Check if the users and movies of ratings are found by their positions."""
+        user_ids, movie_ids = self._store.get_pairs([5, 0, 3])
+        self.assertEqual([7, 1, 3], user_ids.tolist())
+        self.assertEqual([2, 2, 1], movie_ids.tolist())
+
+    def test_positions(self):
+        """Check if ratings are found by their users and movies, with -1 for pairs without a rating."""
+        self.assertEqual([2, 4, -1, -1, -1], self._store.positions([1, 3, 3, 2, 7], [9, 5, 2, 2, 100]).tolist())
+
+    def test_select(self):
+        """Check if a store of a part of the ratings is identical to the store built from that part of the table."""
+        for keep in ([True, False, True, False, True, False], [False] * 3 + [True] * 3, [True] * 6, [False] * 6):
+            arrays = self._store.select(np.array(keep)).to_arrays()
+            for name, array in rs.RatingsStore.from_frame(ratings_df.sort_index()[keep]).to_arrays().items():
+                self.assertEqual(array.dtype, arrays[name].dtype)
+                np.testing.assert_array_equal(array, arrays[name])
+
+    def test_missing_arrays(self):
+        """Check if creating a store from an incomplete set of arrays raises an exception."""
+        self.assertRaises(ValueError, rs.RatingsStore, {'ratings': np.zeros(1)})
+
+
+if __name__ == '__main__':
+    unittest.main()
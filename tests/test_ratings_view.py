@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+import pandas as pd
+import dm_project2.ratings_store as rs
+import dm_project2.ratings_view as rv
+
+
+class TestRatingsView(unittest.TestCase):
+    """Set of test cases for the class `RatingsView`."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        pairs = np.unique(rng.integers(1, 30, size=(300, 2)), axis=0)
+        self._ratings = pd.DataFrame({
+            'rating': rng.integers(1, 11, size=len(pairs)) / 2,
+            'timestamp': np.arange(len(pairs))
+        }, index=pd.MultiIndex.from_arrays([pairs[:, 0], pairs[:, 1]], names=['userId', 'movieId']))
+        self._view = rv.RatingsView(rs.RatingsStore.from_frame(self._ratings))
+        # Ratings are added (also of new users and movies), replaced and deleted, some of them repeatedly.
+        for step in range(200):
+            user_id, movie_id = (int(value) for value in rng.integers(1, 35, size=2))
+            if step % 3:
+                rating = float(rng.integers(1, 11) / 2)
+                previous = self._view.set_rating(user_id, movie_id, rating, 1000 + step)
+                self.assertEqual(self._rating(user_id, movie_id), previous)
+                self._ratings.loc[(user_id, movie_id), ['rating', 'timestamp']] = [rating, 1000 + step]
+            else:
+                deleted, ratings = self._view.delete(np.array([user_id, user_id]), np.array([movie_id, movie_id]), 0)
+                self.assertEqual([(user_id, movie_id) in self._ratings.index, False], deleted.tolist())
+                if deleted[0]:
+                    self.assertEqual([self._rating(user_id, movie_id)], ratings.tolist())
+                    self._ratings = self._ratings.drop((user_id, movie_id))
+        self._ratings = self._ratings.sort_index()
+        self._expected = rs.RatingsStore.from_frame(self._ratings)
+
+    def _rating(self, user_id: int, movie_id: int):
+        return float(self._ratings.at[(user_id, movie_id), 'rating']) if (user_id, movie_id) in self._ratings.index else None
+
+    def test_reads_through_overlay(self):
+        """Check if the ratings read through the overlay are the ratings of the store built from the changed table."""
+        self.assertEqual(len(self._ratings), len(self._view))
+        positions = np.arange(len(self._ratings))[::-1]
+        for values, expected in zip(self._view.get_rows(positions), self._expected.get_rows(positions)):
+            np.testing.assert_array_equal(expected, values)
+        for entity_id in range(40):
+            for values, expected in zip(self._view.get_user_ratings(entity_id), self._expected.get_user_ratings(entity_id)):
+                np.testing.assert_array_equal(expected, values)
+            for values, expected in zip(self._view.get_movie_ratings(entity_id), self._expected.get_movie_ratings(entity_id)):
+                np.testing.assert_array_equal(expected, values)
+        users = np.arange(40)
+        np.testing.assert_array_equal(self._expected.user_index(users) >= 0, self._view.has_ratings(users))
+        self.assertIsNone(self._view._derived)
+
+    def test_derived_arrays(self):
+        """Check if the arrays of the store derived after changes are the arrays of the store built from the changed table."""
+        arrays = self._view.to_arrays()
+        for name, expected in self._expected.to_arrays().items():
+            self.assertEqual(expected.dtype, arrays[name].dtype)
+            np.testing.assert_array_equal(expected, arrays[name])
+
+    def test_unchanged(self):
+        """Check if a view without changes reads the base store itself."""
+        base = rs.RatingsStore.from_frame(self._ratings)
+        view = rv.RatingsView(base)
+        self.assertIs(base, view.get_base())
+        self.assertIs(base.get_ratings(), view.get_ratings())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import dm_project2.rule_cache as rc
+
+
+class TestRuleCache(unittest.TestCase):
+    """Set of test cases for the class `RuleCache`."""
+
+    def test_hits_and_misses(self):
+        """Check if lookups are counted as hits or misses."""
+        cache = rc.RuleCache(100)
+        self.assertIsNone(cache.get((1, 0.1, 0.1)))
+        cache.put((1, 0.1, 0.1), 'rules', 10)
+        self.assertEqual('rules', cache.get((1, 0.1, 0.1)))
+        self.assertEqual(1, cache.get_hits())
+        self.assertEqual(1, cache.get_misses())
+
+    def test_lru_eviction(self):
+        """Check if the least recently used entries are evicted when the budget is exceeded."""
+        cache = rc.RuleCache(30)
+        cache.put((1,), 'a', 10)
+        cache.put((2,), 'b', 10)
+        cache.put((3,), 'c', 10)
+        cache.get((1,))
+        cache.put((4,), 'd', 10)
+        self.assertIsNone(cache.get((2,)))
+        self.assertEqual('a', cache.get((1,)))
+        self.assertEqual(30, cache.get_nbytes())
+
+    def test_oversized_entry(self):
+        """Check if entries exceeding the whole budget are not cached."""
+        cache = rc.RuleCache(10)
+        cache.put((1,), 'a', 5)
+        cache.put((2,), 'b', 11)
+        self.assertIsNone(cache.get((2,)))
+        self.assertEqual('a', cache.get((1,)))
+
+    def test_invalidate(self):
+        """Check if invalidating a user removes all (and only) the user's entries."""
+        cache = rc.RuleCache(100)
+        cache.put((1, 0.1, 0.1), 'a', 10)
+        cache.put((1, 0.2, 0.1), 'b', 10)
+        cache.put((2, 0.1, 0.1), 'c', 10)
+        self.assertEqual(2, cache.invalidate(1))
+        self.assertEqual(1, len(cache))
+        self.assertEqual(10, cache.get_nbytes())
+        self.assertEqual(0, cache.invalidate(1))
+
+    def test_disabled(self):
+        """Check if a cache with no budget stores nothing."""
+        cache = rc.RuleCache(0)
+        cache.put((1,), 'a', 1)
+        self.assertEqual(0, len(cache))
+        self.assertRaises(ValueError, rc.RuleCache, -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+import pandas as pd
+import dm_project2.rule_table as rt
+
+
+genres = ['Action', 'Comedy', 'Drama']
+
+rules_df = pd.DataFrame({
+    'antecedents': [frozenset(['Comedy']), frozenset(['Action', 'Drama']), frozenset(['rating_1.0']), frozenset(['Comedy'])],
+    'consequents': [frozenset(['rating_4.5']), frozenset(['rating_2.0']), frozenset(['rating_4.5']), frozenset(['rating_2.0'])],
+    'antecedent support': [0.5, 0.25, 0.25, 0.5],
+    'consequent support': [0.5, 0.5, 0.5, 0.5],
+    'support': [0.25, 0.25, 0.1, 0.1],
+    'confidence': [0.5, 1.0, 0.4, 0.2],
+    'lift': [1.0, 2.0, 0.8, 0.4]
+})
+
+
+class TestRuleTable(unittest.TestCase):
+    """Set of test cases for the class `RuleTable`."""
+
+    def setUp(self):
+        self._table = rt.RuleTable.from_frame(rules_df, genres)
+
+    def test_from_frame(self):
+        """Check if rules are compiled into genre masks and ratings, skipping antecedents other than genres."""
+        self.assertEqual(3, len(self._table))
+        self.assertEqual([0b010, 0b101, 0b010], self._table.get_antecedents().tolist())
+        self.assertEqual([4.5, 2.0, 2.0], self._table.get_consequents().tolist())
+        self.assertEqual(np.uint32, self._table.get_antecedents().dtype)
+        self.assertEqual(np.float32, self._table.get_consequents().dtype)
+        np.testing.assert_array_equal([[0.25, 0.5], [0.25, 1.0], [0.1, 0.2]], self._table.get_weights(['support', 'confidence']))
+        self.assertEqual(['antecedents', 'consequents', *rt.RULE_METRICS], list(self._table.to_arrays()))
+
+    def test_predict(self):
+        """Check if predictions are the means of the matching rules weighted by the metric."""
+        genre_masks = np.array([0b010, 0b111, 0b101, 0b001], dtype=np.uint32)
+        self.assertEqual(
+            [[True, False, True], [True, True, True], [False, True, False], [False, False, False]],
+            self._table.match(genre_masks).tolist()
+        )
+        predictions = self._table.predict(genre_masks, 'confidence')
+        np.testing.assert_allclose([(4.5 * 0.5 + 2.0 * 0.2) / 0.7, (4.5 * 0.5 + 2.0 * 1.2) / 1.7, 2.0], predictions[:3])
+        self.assertTrue(np.isnan(predictions[3]))
+
+    def test_empty(self):
+        """Check if no movie has a prediction based on an empty table."""
+        table = rt.RuleTable.empty()
+        self.assertEqual(0, len(table))
+        self.assertEqual(0, len(rt.RuleTable.from_frame(rules_df.iloc[:0], genres)))
+        self.assertTrue(np.isnan(table.predict(np.array([0b01, 0b11], dtype=np.uint32), 'lift')).all())
+
+    def test_missing_arrays(self):
+        """Check if a table cannot be created without all of its arrays."""
+        arrays = self._table.to_arrays()
+        del arrays['lift']
+        self.assertRaises(ValueError, rt.RuleTable, arrays)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import threading
+import unittest
+import numpy as np
+import dm_project2.serve as sv
+import dm_project2.client as cl
+import dm_project2.loadgen as lg
+
+
+class FakePredictor:
+    """
+    Predictor returning the sum of the ids, which fails for movies with ids
+    greater than 100 and has no ratings of users with ids greater than 100.
+    """
+
+    def __init__(self) -> None:
+        self.batches = []
+
+    def predict_many(self, user_ids, movie_ids) -> np.ndarray:
+        self.batches.append(len(user_ids))
+        if max(movie_ids) > 100:
+            raise ValueError('There is no such movie.')
+        return np.where(np.array(user_ids) > 100, np.nan, np.array(user_ids, dtype=float) + np.array(movie_ids))
+
+    def predict(self, user_id: int, movie_id: int) -> float:
+        return float(self.predict_many([user_id], [movie_id])[0])
+
+
+class TestMicroBatcher(unittest.TestCase):
+    """Set of test cases for the class `MicroBatcher`."""
+
+    def test_batching(self):
+        """Check if concurrent requests are predicted in batches with correct results."""
+        predictor = FakePredictor()
+        batcher = sv.MicroBatcher(predictor, window=0.05)
+        futures = [batcher.submit(user_id, 10) for user_id in range(1, 41)]
+        self.assertEqual([user_id + 10.0 for user_id in range(1, 41)], [future.result(5) for future in futures])
+        batcher.close()
+        self.assertEqual(40, sum(predictor.batches))
+        self.assertLess(len(predictor.batches), 40)
+
+    def test_invalid_request(self):
+        """Check if an invalid request fails without failing other requests of its batch."""
+        batcher = sv.MicroBatcher(FakePredictor(), window=0.05)
+        valid, invalid = batcher.submit(1, 2), batcher.submit(1, 200)
+        self.assertEqual(3.0, valid.result(5))
+        self.assertRaises(ValueError, invalid.result, 5)
+        batcher.close()
+
+
+class TestLatencyStats(unittest.TestCase):
+    """Set of test cases for the class `LatencyStats`."""
+
+    def test_snapshot(self):
+        """Check if the counters and the percentiles match the recorded requests."""
+        stats = sv.LatencyStats()
+        for latency in range(1, 101):
+            stats.record_request(latency / 1000, error=latency > 98)
+        stats.record_batch()
+        stats.record_batch()
+        snapshot = stats.snapshot()
+        self.assertEqual((100, 2, 2, 50.0), (snapshot['requests'], snapshot['errors'], snapshot['batches'], snapshot['mean_batch_size']))
+        self.assertAlmostEqual(50.5, snapshot['p50_ms'])
+        self.assertAlmostEqual(99.01, snapshot['p99_ms'])
+
+
+class TestPredictionServer(unittest.TestCase):
+    """Set of test cases for the class `PredictionServer`."""
+
+    def test_predict(self):
+        """Check if predictions are served over HTTP and invalid requests are rejected."""
+        server = sv.PredictionServer(('127.0.0.1', 0), FakePredictor())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        client = cl.PredictionClient(*server.server_address[:2])
+        try:
+            self.assertEqual(12.0, client.predict(2, 10))
+            self.assertRaises(ValueError, client.predict, 2, 200)
+            self.assertRaises(ValueError, client.predict, -1, 10)
+            with self.assertRaisesRegex(ValueError, 'There are no ratings of the user with userId=200.'):
+                client.predict(200, 10)
+            self.assertEqual(13.0, client.predict(3, 10))
+            stats = client.stats()
+            self.assertEqual((5, 3), (stats['requests'], stats['errors']))
+        finally:
+            client.close()
+            server.shutdown()
+            server.server_close()
+
+    def test_client_connection_errors(self):
+        """Check if a load generating client counts failed connections as errors and goes on."""
+        server = sv.PredictionServer(('127.0.0.1', 0), FakePredictor())
+        address = server.server_address[:2]
+        server.server_close()
+        latencies, errors = [], []
+        lg.run_client(*address, [(1, 2), (3, 4)], latencies, errors)
+        self.assertEqual((2, 2), (len(latencies), len(errors)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import dm_project2.synthetic as syn
+import dm_project2.dataset as ds
+import dm_project2.benchmark as bm
+
+
+class TestSynthetic(unittest.TestCase):
+    """Set of test cases for the generator of synthetic datasets."""
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_deterministic(self):
+        """Check if datasets generated with the same seed are identical, and differ for other seeds."""
+        paths = [os.path.join(self._tmp_dir.name, name) for name in ('a', 'b', 'c')]
+        for path, seed in zip(paths, (0, 0, 1)):
+            syn.generate_dataset(path, 3000, seed)
+        for table in ('links', 'movies', 'ratings', 'tags'):
+            with open(os.path.join(paths[0], f'{table}.csv'), 'rb') as a, open(os.path.join(paths[1], f'{table}.csv'), 'rb') as b:
+                self.assertEqual(a.read(), b.read())
+        with open(os.path.join(paths[0], 'ratings.csv'), 'rb') as a, open(os.path.join(paths[2], 'ratings.csv'), 'rb') as c:
+            self.assertNotEqual(a.read(), c.read())
+
+    def test_load(self):
+        """Check if a generated dataset is loaded like a Movie Lens dataset."""
+        counts = syn.generate_dataset(self._tmp_dir.name, 5000)
+        dataset = ds.MovieLensDataset('synthetic', data_dir=self._tmp_dir.name)
+        ratings = dataset.get_ratings(copy=False)
+        self.assertEqual(5000, counts['ratings'])
+        self.assertEqual(5000, len(ratings))
+        self.assertTrue(ratings.index.is_unique)
+        self.assertTrue(ratings.index.is_monotonic_increasing)
+        self.assertTrue(ratings.index.get_level_values('movieId').isin(dataset.get_movies(copy=False).index).all())
+        self.assertTrue(np.isin(ratings['rating'].unique(), np.arange(1, 11) / 2).all())
+        self.assertGreaterEqual(ratings.groupby(level='userId').size().min(), 20)
+        self.assertEqual(counts['tags'], len(dataset.get_tags(copy=False)))
+        self.assertTrue(os.path.isdir(os.path.join(self._tmp_dir.name, 'cache')))
+
+    def test_user_rating_counts(self):
+        """Check if the numbers of ratings of users sum up to the total and are skewed."""
+        counts = syn.user_rating_counts(100000, 1000, 5000, np.random.default_rng(0))
+        self.assertEqual(100000, counts.sum())
+        self.assertGreaterEqual(counts.min(), 20)
+        self.assertGreater(counts.max(), 5 * np.median(counts))
+
+
+class TestBenchmark(unittest.TestCase):
+    """Set of test cases for the benchmarks."""
+
+    def test_compare_results(self):
+        """Check if results of two runs are compared stage by stage."""
+        def results(seconds, peak_bytes):
+            return {'format_version': bm.BENCHMARK_FORMAT_VERSION, 'results': [
+                {'scale': 1000, 'seed': 0, 'stages': {'fit': {'seconds': seconds, 'peak_bytes': peak_bytes, 'rows': 1000}}}
+            ]}
+        rows = bm.compare_results(results(2.0, 100), results(0.5, 50))
+        self.assertEqual(1, len(rows))
+        self.assertEqual('fit', rows[0]['stage'])
+        self.assertAlmostEqual(4.0, rows[0]['speedup'])
+        self.assertAlmostEqual(0.5, rows[0]['memory_ratio'])
+        with self.assertRaises(ValueError):
+            bm.compare_results({'format_version': 0, 'results': []}, results(0.5, 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
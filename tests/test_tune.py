@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+import mock
+import numpy as np
+import pandas as pd
+import dm_project2.tune as tn
+import dm_project2.predict as pr
+import dm_project2.dataset as ds
+import dm_project2.preprocessing as pp
+
+
+movies_df = pd.DataFrame({
+    'movieId': [1, 2, 3, 4, 5, 6, 7],
+    'title': ['A', 'B', 'C', 'D', 'E', 'F', 'G'],
+    'genres': ['Comedy', 'Comedy|Drama', 'Drama', 'Action|Drama', 'Action', 'Comedy|Romance', 'Romance']
+}).set_index('movieId')
+
+ratings_df = pd.DataFrame({
+    'userId': [1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 3, 3, 3],
+    'movieId': [1, 2, 3, 4, 5, 6, 1, 3, 5, 6, 7, 2, 4, 7],
+    'rating': [4.0, 4.5, 3.0, 2.0, 2.5, 4.0, 1.0, 5.0, 3.5, 1.5, 2.0, 4.0, 3.0, 5.0],
+    'timestamp': [0] * 14
+}).set_index(['userId', 'movieId'])
+
+
+def write_dataset(path: str, ratings: pd.DataFrame, movies: pd.DataFrame) -> None:
+    """Writes the `ratings` and `movies` tables into a directory as the CSV files of a dataset."""
+    ratings.reset_index().to_csv(os.path.join(path, 'ratings.csv'), index=False)
+    movies.reset_index().to_csv(os.path.join(path, 'movies.csv'), index=False)
+
+
+class TestGridSearch(unittest.TestCase):
+    """Set of test cases for the function `grid_search`."""
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        write_dataset(self._tmp_dir.name, ratings_df, movies_df)
+        self._dataset = ds.MovieLensDataset('lorem', use_cache=False, data_dir=self._tmp_dir.name)
+        self._predictor = pr.Predictor()
+        self._predictor.fit(pp.MovieLensDatasetPreprocessor().fit_transform(self._dataset))
+        self._user_ids, self._movie_ids = [1, 2, 3, 1, 2], [7, 2, 5, 6, 4]
+        self._ratings = [3.0, 4.5, 2.0, 4.0, 1.0]
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_grid_search_matches_predictions(self):
+        """Check if the errors of all combinations match the errors of predictions for each of them."""
+        grid = {'threshold_itemsets': [0.1, 0.3], 'weighted_mean_metric': ['confidence', 'lift'], 'alpha': [0.2, 0.8], 'beta': [0.0, 0.5, 1.0]}
+        results = tn.grid_search(self._predictor, self._user_ids, self._movie_ids, self._ratings, grid, chunk_size=2)
+        self.assertEqual(2 * 2 * 2 * 3, len(results))
+        self.assertEqual([*tn.PARAMETERS, 'mse'], list(results.columns))
+        self.assertTrue((np.diff(results['mse']) >= 0).all())
+        self.assertTrue((results['threshold_rules'] == 0.01).all())
+        for row in results.itertuples(index=False):
+            predictions = self._predictor.predict_many(
+                self._user_ids, self._movie_ids, row.threshold_itemsets, row.threshold_rules, row.weighted_mean_metric, row.alpha, row.beta
+            )
+            self.assertAlmostEqual(np.mean((predictions - np.array(self._ratings)) ** 2), row.mse)
+
+    def test_grid_search_chunks_whole_users(self):
+        """Check if the pairs of a user are never split between chunks."""
+        with mock.patch.object(pr.Predictor, 'predict_grid', autospec=True, side_effect=pr.Predictor.predict_grid) as predict_grid:
+            tn.grid_search(self._predictor, self._user_ids, self._movie_ids, self._ratings, {'alpha': [0.5]}, chunk_size=1)
+        self.assertEqual([[1, 1], [2, 2], [3]], [call.args[1].tolist() for call in predict_grid.call_args_list])
+
+    def test_grid_search_unknown_parameter(self):
+        """Check if a grid with an unknown parameter is rejected."""
+        self.assertRaises(ValueError, tn.grid_search, self._predictor, self._user_ids, self._movie_ids, self._ratings, {'gamma': [0.5]})
+
+
+if __name__ == '__main__':
+    unittest.main()